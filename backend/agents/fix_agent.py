@@ -1,27 +1,51 @@
 """
 AI Layer 3: Fix Agent
-PRIMARY: Sends broken code to AI and receives a fully fixed version back.
+PRIMARY: Sends broken code to AI and receives SEARCH/REPLACE patch hunks back,
+         which are applied locally (services/patching.py) with fuzzy matching.
+         Large files are scoped to the enclosing function/class of each error
+         (services/code_context.py), so prompts don't grow with the file.
          The real fixed code is written to the file — not just a comment.
+         Patches that a later test run confirms are memoized in
+         services/fix_cache.py, so the same bug in the same code is fixed
+         again without an AI call.
 
 FALLBACK (no API key): Writes a rich comment block so a human/AI dev can fix it.
 
-Safety: 30% diff limit, bug-type allowlist enforced.
+Safety: 30% changed-lines diff limit, bug-type allowlist enforced.
 """
 
 import re
 import json
 import textwrap
 import logging
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from config import settings
 from services.ai_client import call_ai, sanitize_bug_type
+from services.code_context import ScopedContext, build_context
+from services.fix_cache import error_fingerprint, fix_key, get_fix_cache
+from services.patching import PatchError, apply_patch, diff_hunks, format_patch, parse_patch
+from services.symbol_index import SymbolIndex
+from utils.file_diff import calculate_file_diff_percentage
 
 logger = logging.getLogger(__name__)
 
 MAX_DIFF_PERCENT = 0.30
 CONTEXT_LINES    = 5
 COMMENT_WIDTH    = 66
+PATCH_TOKENS_PER_ERROR = 1024
+
+PATCH_FORMAT = (
+    "Respond ONLY with SEARCH/REPLACE blocks, never the whole file:\n"
+    "<<<<<<< SEARCH\n"
+    "exact lines copied from the file, with enough context to be unique\n"
+    "=======\n"
+    "the replacement lines\n"
+    ">>>>>>> REPLACE\n"
+    "Use one block per separate change.\n"
+)
+DESCRIPTION_LINE = re.compile(r"^DESCRIPTION\[(\d+)\]:[ \t]*(.+)$", re.MULTILINE)
+ANNOTATION_BLOCK = re.compile(r'\n+#={10,}.*?\[AI-AGENT FIX REQUIRED.*?\n#={10,}\n', re.DOTALL)
 
 
 class FixAgent:
@@ -36,86 +60,249 @@ class FixAgent:
         api_key: str = None,
     ) -> Tuple[str, str, bool]:
         """Attempts to fix the broken file by rewriting code or appending instructions."""
-        bug_type = sanitize_bug_type(error.get("type", "LOGIC"))
-        file     = error.get("file", "unknown")
-        line     = error.get("line", 0)
+        new_content, outcomes = self.apply_fixes(error.get("file", "unknown"), [error], file_content, test_logs, api_key)
+        return new_content, outcomes[0]["commit_msg"], outcomes[0]["ai_fixed"]
 
+    def apply_fixes(
+        self,
+        file: str,
+        errors: List[Dict],
+        file_content: str,
+        test_logs: str,
+        api_key: str = None,
+        symbol_index: SymbolIndex = None,
+    ) -> Tuple[str, List[Dict]]:
+        """
+        Fixes every error in one file with a single AI patch.
+        Returns (new_content, outcomes); each outcome is {error, commit_msg, ai_fixed,
+        cache_store, cache_hit}.
+        Errors the AI could not fix are annotated on top of the rewrite.
+        `symbol_index` adds signatures of symbols from other files to the prompt.
+        """
         # Pre-process: Strip any existing AI-AGENT comment blocks from previous failed iterations
         # to prevent the file from bloating with infinite comments.
-        cleaned_content = re.sub(r'\n+#={10,}.*?\[AI-AGENT FIX REQUIRED.*?\n#={10,}\n', '', file_content, flags=re.DOTALL)
-        
+        cleaned_content = ANNOTATION_BLOCK.sub('', file_content)
+        content = cleaned_content
+        fixed: Dict[int, str] = {}   # error index -> description
+
         # Priority: 1. Passed key (user) -> 2. Settings key (system)
         key = api_key or settings.AI_FIX_KEY
+        cache_store, cache_hits = None, {}
         if key:
-            logger.info(f"FixAgent: Attempting AI rewrite for {file}...")
-            fixed_code, desc = self._ai_rewrite(error, cleaned_content, test_logs, key)
-            
+            fixed_code, descriptions, cache_store, cache_hits = self._fix_with_cache(
+                file, errors, cleaned_content, test_logs, key, symbol_index
+            )
             if fixed_code:
-                if self.check_diff_limit(cleaned_content, fixed_code):
-                    commit_msg = f"{bug_type} error in {file} line {line} → Fixed: {desc}"
-                    return fixed_code, commit_msg, True
-                else:
-                    logger.warning("FixAgent: AI fix rejected (diff limit). Falling back to annotation.")
+                content, fixed = fixed_code, descriptions
+
+        outcomes = []
+        for i, error in enumerate(errors):
+            bug_type = sanitize_bug_type(error.get("type", "LOGIC"))
+            line     = error.get("line", 0)
+            if i in fixed:
+                commit_msg = f"{bug_type} error in {file} line {line} → Fixed: {fixed[i]}"
             else:
-                logger.error("FixAgent: AI returned no content. Falling back to annotation.")
+                # Fallback: append a rich comment block
+                content += self._build_comment_block(error, content, test_logs)
+                commit_msg = f"{bug_type} error in {file} line {line} → Annotated: {self._deterministic_desc_short(error)}"
+            outcomes.append({
+                "error": error,
+                "commit_msg": commit_msg,
+                "ai_fixed": i in fixed,
+                # For services/fix_cache.PendingFixes: stored or invalidated once the next test run shows the result
+                "cache_store": cache_store if i in fixed and i not in cache_hits else None,
+                "cache_hit": cache_hits.get(i) if i in fixed else None,
+            })
+        return content, outcomes
 
-        # Fallback: append a rich comment block
-        comment = self._build_comment_block(error, cleaned_content, test_logs)
-        new_content = cleaned_content + comment
-        short_desc = self._deterministic_desc_short(error)
-        commit_msg = f"{bug_type} error in {file} line {line} → Annotated: {short_desc}"
-        return new_content, commit_msg, False
+    def batch_commit_message(self, file: str, outcomes: List[Dict]) -> str:
+        """One commit per file: the single fix's message, or a summary with one line per fix."""
+        if len(outcomes) == 1:
+            return outcomes[0]["commit_msg"]
+        fixed = sum(1 for o in outcomes if o["ai_fixed"])
+        lines = "\n".join(f"- {o['commit_msg']}" for o in outcomes)
+        return f"{len(outcomes)} errors in {file} → Fixed {fixed}, annotated {len(outcomes) - fixed}\n\n{lines}"
 
     def check_diff_limit(self, original: str, modified: str) -> bool:
-        """Safety gate: reject rewrites that change too much of the file."""
-        orig_len = len(original)
-        if orig_len == 0: return True
+        """
+        Safety gate: reject rewrites that change too many lines of the file.
+        Annotation blocks don't count, so annotating the errors a partial batch
+        left unfixed can't push a valid AI fix over the limit.
+        """
+        original = ANNOTATION_BLOCK.sub('', original)
+        modified = ANNOTATION_BLOCK.sub('', modified)
+        if not original: return True
 
         # For very small files (e.g. calculator.py), even a 2-line change is > 50%.
         # We allow up to 90% changes for files under 1KB.
-        limit = 0.90 if orig_len < 1000 else MAX_DIFF_PERCENT
-        ratio = abs(len(modified) - orig_len) / orig_len
+        limit = 0.90 if len(original) < 1000 else MAX_DIFF_PERCENT
+        ratio = calculate_file_diff_percentage(original, modified) / 100
 
         if ratio > limit:
-            logger.warning(f"FixAgent: Rejected — diff ratio {ratio:.1%} exceeds {limit:.0%}")
+            logger.warning(f"FixAgent: Rejected — {ratio:.1%} of lines changed, limit {limit:.0%}")
             return False
         return True
 
+    def _fix_with_cache(
+        self, file: str, errors: List[Dict], file_content: str, test_logs: str, api_key: str,
+        symbol_index: SymbolIndex = None,
+    ) -> Tuple[Optional[str], Dict[int, str], Optional[Tuple], Dict[int, str]]:
+        """
+        Applies cached patches for errors seen before, then asks the AI about the rest.
+        Returns (fixed_code, {error index: description}, cache_store, {error index: cache key}).
+        fixed_code is None if nothing changed or the result fails the diff limit.
+        Nothing is written to the cache here: `cache_store` is the (key, patch,
+        descriptions) entry for the AI patch, stored only once a test run confirms it.
+        """
+        cache = get_fix_cache()
+        content = file_content
+        descriptions: Dict[int, str] = {}
+        pending = list(range(len(errors)))
+        to_store = None
+        hits: Dict[int, str] = {}
+
+        if cache:
+            # The whole batch first, then error by error
+            groups = [pending] + ([[i] for i in pending] if len(pending) > 1 else [])
+            for group in groups:
+                if not all(i in pending for i in group):
+                    continue
+                key = fix_key([errors[i] for i in group], content)
+                hit = cache.get(key)
+                if not hit:
+                    continue
+                fingerprints = {i: error_fingerprint(errors[i], content) for i in group}
+                try:
+                    content = apply_patch(content, parse_patch(hit["patch"]), fuzzy=False)
+                except PatchError:
+                    cache.record_stale()
+                    continue
+                descriptions.update({
+                    i: hit["descriptions"][fp] for i, fp in fingerprints.items() if fp in hit["descriptions"]
+                })
+                hits.update({i: key for i in group})
+                pending = [i for i in pending if i not in group]
+            if len(pending) < len(errors):
+                logger.info(f"FixAgent: Fix cache hit for {len(errors) - len(pending)}/{len(errors)} errors in {file}")
+
+        if pending:
+            logger.info(f"FixAgent: Attempting AI rewrite for {file} ({len(pending)} errors)...")
+            asked = [errors[i] for i in pending]
+            if len(asked) == 1:
+                fixed_code, desc = self._ai_rewrite(asked[0], content, test_logs, api_key, symbol_index)
+                reported = {0: desc} if fixed_code else {}
+            else:
+                fixed_code, reported = self._ai_rewrite_batch(file, asked, content, api_key, symbol_index)
+            if fixed_code:
+                if cache and reported:
+                    by_fingerprint = {error_fingerprint(asked[j], content): d for j, d in reported.items()}
+                    to_store = (fix_key(asked, content), format_patch(diff_hunks(content, fixed_code)), by_fingerprint)
+                content = fixed_code
+                descriptions.update({pending[j]: d for j, d in reported.items()})
+            else:
+                logger.error("FixAgent: AI returned no content. Falling back to annotation.")
+
+        if content == file_content:
+            return None, {}, None, {}
+        # Cached and fresh patches alike go through the diff gate
+        if not self.check_diff_limit(file_content, content):
+            logger.warning("FixAgent: AI fix rejected (diff limit). Falling back to annotation.")
+            return None, {}, None, {}
+        return content, descriptions, to_store, hits
+
     def _ai_rewrite(
-        self, error: Dict, file_content: str, test_logs: str, api_key: str
+        self, error: Dict, file_content: str, test_logs: str, api_key: str, symbol_index: SymbolIndex = None
     ) -> Tuple[Optional[str], str]:
         """
-        Sends broken file to AI for repair.
+        Asks the AI for a patch to the broken file and applies it locally.
         Optimized to use a single AI call to minimize rate-limit (429) triggers.
         """
         bug_type = error.get("type", "LOGIC")
         line_num = error.get("line", 0)
         message  = error.get("message", "")
-        context  = self._extract_context(file_content, line_num)
+        scope    = build_context(error.get("file", ""), file_content, [line_num], symbol_index)
 
         prompt = (
-            "You are a code repair agent. Fix this bug and explain the fix.\n"
-            "Respond ONLY with a JSON object in this format:\n"
-            '{"fixed_code": "FULL_CONTENT_HERE", "description": "SHORT_DESC_HERE"}\n\n'
+            "You are a code repair agent. Fix this bug with a minimal edit and explain the fix.\n"
+            f"{PATCH_FORMAT}"
+            "Finish with one line: DESCRIPTION[0]: SHORT_DESC_HERE\n\n"
             f"ERROR: {bug_type} at line {line_num}: {message}\n"
-            f"FILE: {error.get('file', 'unknown')}\n"
-            f"CONTEXT:\n{context}\n\n"
-            f"FULL FILE CONTENT:\n{file_content}"
+            f"FILE: {error.get('file', 'unknown')}\n\n"
+            f"{scope.render()}"
         )
 
-        raw = call_ai(api_key, prompt)
-        if not raw: return None, ""
+        fixed_code, descriptions = self._request_patch(prompt, scope, api_key, 1)
+        if not fixed_code: return None, ""
+        return fixed_code, descriptions.get(0) or f"fix {bug_type}"
+
+    def _ai_rewrite_batch(
+        self, file: str, errors: List[Dict], file_content: str, api_key: str, symbol_index: SymbolIndex = None
+    ) -> Tuple[Optional[str], Dict[int, str]]:
+        """One AI call for every error in a file. Returns (fixed_code, {error index: description})."""
+        listing = "\n".join(
+            f"[{i}] {e.get('type', 'LOGIC')} at line {e.get('line', 0)}: {e.get('message', '')}"
+            for i, e in enumerate(errors)
+        )
+        scope = build_context(file, file_content, [e.get("line", 0) for e in errors], symbol_index)
+        prompt = (
+            "You are a code repair agent. Fix ALL of the bugs below in one pass with minimal edits and explain each fix.\n"
+            f"{PATCH_FORMAT}"
+            "Finish with one line per error index: DESCRIPTION[index]: SHORT_DESC_HERE\n"
+            "Write DESCRIPTION[index]: UNFIXED for any error you could not fix.\n\n"
+            f"FILE: {file}\n"
+            f"ERRORS:\n{listing}\n\n"
+            f"{scope.render()}"
+        )
+
+        fixed_code, reported = self._request_patch(prompt, scope, api_key, len(errors))
+        if not fixed_code: return None, {}
+        # Unreported errors count as fixed only when the AI reported nothing at all
+        if not reported:
+            reported = {i: f"fix {e.get('type', 'LOGIC')}" for i, e in enumerate(errors)}
+        return fixed_code, {i: d for i, d in reported.items() if i < len(errors) and d}
+
+    def _request_patch(
+        self, prompt: str, scope: ScopedContext, api_key: str, error_count: int
+    ) -> Tuple[Optional[str], Dict[int, Optional[str]]]:
+        """
+        Calls the AI and applies the returned hunks inside the code units of `scope`.
+        Returns (fixed_code, {error index: description}); UNFIXED indices map to None.
+        A JSON {"fixed_code": ...} reply from the old protocol is still accepted
+        when the whole file was sent.
+        """
+        raw = call_ai(api_key, prompt, max_output_tokens=min(4096, PATCH_TOKENS_PER_ERROR * error_count))
+        if not raw: return None, {}
+
+        descriptions: Dict[int, Optional[str]] = {
+            int(m.group(1)): (None if m.group(2).strip().upper() == "UNFIXED" else m.group(2).strip())
+            for m in DESCRIPTION_LINE.finditer(raw)
+        }
+        hunks = parse_patch(raw)
+        if hunks:
+            try:
+                patched = scope.apply(hunks)
+            except PatchError as e:
+                logger.warning(f"FixAgent: AI patch rejected ({e}).")
+                return None, {}
+            if patched == scope.content:
+                logger.warning("FixAgent: AI patch made no changes.")
+                return None, {}
+            logger.info(f"FixAgent: Applied {len(hunks)} patch hunk(s).")
+            return patched, descriptions
 
         try:
-            # Clean possible markdown wrap before parsing
-            json_str = self._strip_markdown_fences(raw)
-            data = json.loads(json_str)
-            return data.get("fixed_code"), data.get("description", f"fix {bug_type}")
-        except:
-            logger.warning("FixAgent: AI did not return JSON. Attempting raw text recovery.")
-            # If AI ignores JSON instructions, it usually returns just the file content
-            fixed_code = self._strip_markdown_fences(raw)
-            return fixed_code, f"fixed {bug_type} anomaly"
+            data = json.loads(self._strip_markdown_fences(raw))
+        except Exception:
+            logger.warning("FixAgent: AI returned neither a patch nor JSON.")
+            return None, {}
+        if not isinstance(data, dict) or not data.get("fixed_code") or not scope.whole_file:
+            return None, {}
+        if data.get("description"):
+            descriptions.setdefault(0, data["description"])
+        for f in data.get("fixes", []):
+            if str(f.get("index", "")).isdigit():
+                descriptions[int(f["index"])] = (f.get("description") or "fix applied") if f.get("fixed", True) else None
+        return data["fixed_code"], descriptions
 
     def _strip_markdown_fences(self, text: str) -> str:
         """Robust stripping of markdown fences and surrounding fluff."""
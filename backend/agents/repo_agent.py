@@ -50,6 +50,8 @@ class RepoAgent:
             "has_docker": False,
             "docker_image": "node:18-slim",
             "test_command": "sh -c 'echo No test framework detected && exit 1'",
+            "install_command": "",
+            "dependency_files": [],
             "ci_config": None,
             "total_files": 0,
         }
@@ -71,6 +73,8 @@ class RepoAgent:
                     info["project_root"] = rel_root
                     info["docker_image"] = "gradle:7.6-jdk17"
                     info["test_command"] = "sh -c 'chmod +x gradlew && ./gradlew test'"
+                    info["install_command"] = ""
+                    info["dependency_files"] = [file, "gradle.properties", "settings.gradle", "settings.gradle.kts"]
                     info["test_framework"] = "junit"
 
                 elif f_lower == "pom.xml" and info["language"] not in ("java_gradle",):
@@ -78,6 +82,8 @@ class RepoAgent:
                     info["project_root"] = rel_root
                     info["docker_image"] = "maven:3.9-eclipse-temurin-17"
                     info["test_command"] = "mvn test -q"
+                    info["install_command"] = ""
+                    info["dependency_files"] = [file]
                     info["test_framework"] = "junit"
 
                 elif f_lower in ("requirements.txt", "setup.py", "pyproject.toml") \
@@ -85,14 +91,18 @@ class RepoAgent:
                     info["language"] = "python"
                     info["project_root"] = rel_root
                     info["docker_image"] = "python:3.12-slim"
-                    info["test_command"] = "sh -c 'pip install -r requirements.txt -q && pip install pytest -q && pytest -v --tb=long'"
+                    info["install_command"] = "pip install -r requirements.txt -q && pip install pytest -q"
+                    info["test_command"] = "pytest -v --tb=long"
+                    info["dependency_files"] = ["requirements.txt", "setup.py", "pyproject.toml"]
 
                 elif f_lower == "package.json" \
                         and info["language"] not in ("java_gradle", "java_maven", "python"):
                     info["language"] = "javascript"
                     info["project_root"] = rel_root
                     info["docker_image"] = "node:18-slim"
-                    info["test_command"] = "sh -c 'npm ci --silent && npm test'"
+                    info["install_command"] = "npm ci --silent"
+                    info["test_command"] = "npm test"
+                    info["dependency_files"] = ["package-lock.json", "package.json"]
 
                 # Java detection by extension (when no build file found)
                 elif f_lower.endswith(".java") and info["language"] == "unknown":
@@ -100,6 +110,8 @@ class RepoAgent:
                     info["project_root"] = rel_root
                     info["docker_image"] = "gradle:7.6-jdk17"
                     info["test_command"] = "sh -c 'chmod +x gradlew && ./gradlew test'"
+                    info["install_command"] = ""
+                    info["dependency_files"] = []
                     info["test_framework"] = "junit"
 
                 # JS/TS detection by extension (when no package.json found)
@@ -134,7 +146,9 @@ class RepoAgent:
             f"You are a CI/CD repository analyzer. Given this filesystem analysis:\n"
             f"{json.dumps(fs_info, indent=2)}\n\n"
             f"Return ONLY a JSON object with keys: language, test_framework, "
-            f"docker_image, test_command. Use only known, safe values."
+            f"docker_image, install_command, test_command. install_command installs "
+            f"dependencies (it is cached per lockfile); test_command only runs the tests. "
+            f"Use only known, safe values."
         )
         raw = call_ai(api_key, prompt)
         if not raw:
@@ -0,0 +1,138 @@
+"""
+Benchmark: pooled AI client vs. a fresh connection per call.
+Starts a local stand-in for the Gemini generateContent endpoint that sleeps
+--handshake-ms on every new connection, to model the TCP+TLS setup
+a real call pays, and --server-ms on every request. It then reports per-call
+latency for:
+
+    fresh    requests.post per call (the old call_ai)
+    pooled   call_ai over the shared keep-alive session
+    async    call_ai_async over the pooled httpx client, --concurrency at once
+
+    python bench_ai_client.py
+    python bench_ai_client.py --calls 200 --handshake-ms 40 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+REPLY = {"candidates": [{"content": {"parts": [{"text": '{"ok": true}'}]}}]}
+
+
+def stand_in_server(handshake_ms: float, server_ms: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive
+        disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+        def setup(self):
+            time.sleep(handshake_ms / 1000)
+            super().setup()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(server_ms / 1000)
+            body = json.dumps(REPLY).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fresh_call(base: str, prompt: str):
+    # The pre-pooling call_ai: one connection per request
+    resp = requests.post(
+        f"{base}/models/bench:generateContent",
+        json={"contents": [{"parts": [{"text": prompt}]}]},
+        headers={"x-goog-api-key": "bench", "Connection": "close"},
+        timeout=30,
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+def timed(fn, calls: int):
+    samples = []
+    for i in range(calls):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def timed_async(call_ai_async, calls: int, concurrency: int):
+    gate = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one(i):
+        async with gate:
+            started = time.perf_counter()
+            await call_ai_async("bench", f"prompt {i}")
+            samples.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return samples
+
+
+def report(name: str, samples, wall: float):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{name:>8} {statistics.mean(ordered) * 1000:>9.1f} {statistics.median(ordered) * 1000:>9.1f} "
+          f"{p95 * 1000:>9.1f} {wall:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--handshake-ms", type=float, default=25.0, help="simulated per-connection setup cost")
+    parser.add_argument("--server-ms", type=float, default=5.0, help="simulated per-request server time")
+    parser.add_argument("--concurrency", type=int, default=4, help="in-flight requests for the async run")
+    args = parser.parse_args()
+
+    server = stand_in_server(args.handshake_ms, args.server_ms)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["GEMINI_API_BASE"] = base
+    os.environ["GEMINI_MODEL"] = "bench"
+    os.environ["AI_MAX_CONCURRENCY_PER_KEY"] = str(args.concurrency)
+    # Measure the transport, not the per-key rate budget
+    os.environ["AI_RPM_PER_KEY"] = os.environ["AI_TPM_PER_KEY"] = str(10 ** 9)
+
+    # Imported after the environment points at the stand-in server
+    from services.ai_client import call_ai, call_ai_async, httpx
+
+    print(f"{'client':>8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'wall s':>8}")
+    for name, fn in (
+        ("fresh", lambda i: fresh_call(base, f"prompt {i}")),
+        ("pooled", lambda i: call_ai("bench", f"prompt {i}")),
+    ):
+        started = time.perf_counter()
+        samples = timed(fn, args.calls)
+        report(name, samples, time.perf_counter() - started)
+
+    if httpx is not None:
+        started = time.perf_counter()
+        samples = asyncio.run(timed_async(call_ai_async, args.calls, args.concurrency))
+        report("async", samples, time.perf_counter() - started)
+    else:
+        print("   async  skipped (httpx not installed)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: single-pass log parser vs. the legacy multi-scan regex parser.
+Generates synthetic pytest / jest / gradle output of the requested sizes and
+reports throughput and peak memory for each parser.
+
+    python bench_log_parser.py                 # 10, 50, 100 MB
+    python bench_log_parser.py --sizes 1 10 --legacy-max 10
+"""
+
+import argparse
+import random
+import re
+import time
+import tracemalloc
+
+from services.log_parser import classify_error, parse_text
+
+PYTEST_FAILURE = """\
+________________________________ test_case_{n} _________________________________
+
+    def test_case_{n}():
+>       assert compute_{n}(2, 3) == 5
+E       assert -1 == 5
+E        +  where -1 = compute_{n}(2, 3)
+
+tests/test_mod_{m}.py:{line}: AssertionError
+"""
+PY_TRACEBACK = """\
+Traceback (most recent call last):
+  File "/app/pkg/mod_{m}.py", line {line}, in <module>
+    import missing_{n}
+ImportError: No module named 'missing_{n}'
+"""
+JEST_FAILURE = """\
+ FAIL  src/widget_{m}.test.js
+  ● Widget › renders {n}
+    TypeError: Cannot read properties of undefined (reading 'x')
+      at render (src/widget_{m}.js:{line}:13)
+      at Object.<anonymous> (node_modules/jest-circus/build/run.js:{line}:7)
+"""
+GRADLE_FAILURE = "> Task :module{m}:test FAILED\n"
+NOISE = "tests/test_mod_{m}.py::test_case_{n} PASSED                                    [ {p}%]\n"
+
+
+def synthetic_log(size_mb: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    target = size_mb * 1024 * 1024
+    parts, size, n = [], 0, 0
+    while size < target:
+        n += 1
+        roll = rng.random()
+        if roll < 0.02:
+            block = PYTEST_FAILURE
+        elif roll < 0.025:
+            block = PY_TRACEBACK
+        elif roll < 0.03:
+            block = JEST_FAILURE
+        elif roll < 0.031:
+            block = GRADLE_FAILURE
+        else:
+            block = NOISE
+        text = block.format(n=n, m=n % 97, line=rng.randint(1, 400), p=n % 100)
+        parts.append(text)
+        size += len(text)
+    return "".join(parts)
+
+
+def legacy_regex_parse(logs: str):
+    """The pre-log_parser ErrorAgent._regex_parse, kept for comparison."""
+    errors = []
+    for m in re.finditer(
+        r'File "([^"]+)", line (\d+)(?:, in .*)?\n(?:.*)\n(?:.*)'
+        r'((?:SyntaxError|IndentationError|ImportError|ModuleNotFoundError|TypeError|NameError): .*)',
+        logs,
+    ):
+        errors.append({"file": m.group(1), "line": int(m.group(2)),
+                       "type": classify_error(m.group(3)), "message": m.group(3).strip()})
+    for m in re.finditer(r'([./\w-]+\.(?:js|ts|jsx|tsx)):(\d+):\d+', logs):
+        errors.append({"file": m.group(1), "line": int(m.group(2)), "type": "SYNTAX",
+                       "message": "JS/TS syntax or compilation error detected"})
+    if "AssertionError" in logs or "assert" in logs:
+        for m in re.finditer(r'([^:\n\s]+\.py):(\d+): Assertion\w*Error', logs):
+            block_start = max(0, logs.rfind("___", 0, m.start()))
+            block = logs[block_start:m.end() + 200]
+            assert_match = re.search(r'assert (.+)', block)
+            where_match = re.search(r'\+\s+where .+ = (\w+)\(', block)
+            message = f"Assertion failed: {assert_match.group(0).strip() if assert_match else ''}"
+            if where_match:
+                message += f" (source function: {where_match.group(1)})"
+            errors.append({"file": m.group(1).strip(), "line": int(m.group(2)), "type": "LOGIC", "message": message})
+    if "BUILD FAILURE" in logs or "FAILED" in logs:
+        for m in re.finditer(r'> Task :(\S+) FAILED', logs):
+            errors.append({"file": m.group(1), "line": 0, "type": "LOGIC",
+                           "message": f"Gradle task failed: :{m.group(1)}"})
+    return errors
+
+
+def measure(fn, logs: str):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn(logs)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100], help="log sizes in MB")
+    parser.add_argument("--legacy-max", type=int, default=100, help="skip the legacy parser above this size (MB)")
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'parser':>8} {'seconds':>9} {'MB/s':>8} {'peak MB':>9} {'errors':>8}")
+    for size in args.sizes:
+        logs = synthetic_log(size)
+        runs = [("single", parse_text)]
+        if size <= args.legacy_max:
+            runs.append(("legacy", legacy_regex_parse))
+        for name, fn in runs:
+            result, elapsed, peak = measure(fn, logs)
+            print(f"{size:>4}MB {name:>8} {elapsed:>9.2f} {size / elapsed:>8.1f} {peak / 2**20:>9.1f} {len(result):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load .env from root or backend
@@ -30,7 +31,109 @@ class Settings:
     def AI_VERIFY_KEY(self): return get_ai_key("AI_VERIFY_KEY")
     @property
     def GITHUB_TOKEN(self): return os.getenv("GITHUB_TOKEN", "")
-    
+    @property
+    def GEMINI_API_BASE(self): return os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+    @property
+    def GEMINI_MODEL(self): return os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+    @property
+    def AI_CONNECT_TIMEOUT(self): return float(os.getenv("AI_CONNECT_TIMEOUT", "5"))
+    @property
+    def AI_READ_TIMEOUT(self): return float(os.getenv("AI_READ_TIMEOUT", "30"))
+    @property
+    def AI_POOL_SIZE(self): return int(os.getenv("AI_POOL_SIZE", "10"))
+    @property
+    def AI_HTTP2(self): return os.getenv("AI_HTTP2", "0") not in ("0", "false", "False")
+    @property
+    def AI_MAX_CONCURRENCY_PER_KEY(self): return int(os.getenv("AI_MAX_CONCURRENCY_PER_KEY", "2"))
+    @property
+    def AI_RPM_PER_KEY(self): return int(os.getenv("AI_RPM_PER_KEY", "15"))
+    @property
+    def AI_TPM_PER_KEY(self): return int(os.getenv("AI_TPM_PER_KEY", "1000000"))
+    @property
+    def AI_RATE_WAIT_MAX(self): return float(os.getenv("AI_RATE_WAIT_MAX", "120"))
+    @property
+    def AI_MAX_RETRIES(self): return int(os.getenv("AI_MAX_RETRIES", "3"))
+    @property
+    def AI_BACKOFF_BASE(self): return float(os.getenv("AI_BACKOFF_BASE", "1"))
+    @property
+    def AI_BACKOFF_MAX(self): return float(os.getenv("AI_BACKOFF_MAX", "60"))
+    @property
+    def FIX_CONCURRENCY(self): return int(os.getenv("FIX_CONCURRENCY", "4"))
+    @property
+    def SYMBOL_INDEX_WORKERS(self): return int(os.getenv("SYMBOL_INDEX_WORKERS", "0"))   # 0 = one per CPU
+    @property
+    def AI_LOG_TOKEN_BUDGET(self): return int(os.getenv("AI_LOG_TOKEN_BUDGET", "1500"))
+
+    # ── Job Scheduling ──
+    @property
+    def MAX_CONCURRENT_JOBS(self): return int(os.getenv("MAX_CONCURRENT_JOBS", "2"))
+    @property
+    def JOB_QUEUE_SIZE(self): return int(os.getenv("JOB_QUEUE_SIZE", "20"))
+    @property
+    def JOB_PRIORITY_MAX(self): return int(os.getenv("JOB_PRIORITY_MAX", "9"))   # client priorities clamp to 0..max
+
+    # ── Persistence ──
+    @property
+    def DATA_DIR(self): return os.getenv("FIXORA_DATA_DIR") or os.path.join(tempfile.gettempdir(), "fixora")
+    @property
+    def JOB_STORE(self): return os.getenv("JOB_STORE", "sqlite").lower()
+    @property
+    def JOB_DB_PATH(self): return os.getenv("JOB_DB_PATH") or os.path.join(self.DATA_DIR, "jobs.db")
+    @property
+    def JOB_TTL_SECONDS(self): return int(os.getenv("JOB_TTL_SECONDS", "86400"))
+    @property
+    def LOG_DIR(self): return os.getenv("LOG_DIR") or os.path.join(self.DATA_DIR, "logs")
+    @property
+    def LOG_MEMORY_LIMIT(self): return int(os.getenv("LOG_MEMORY_LIMIT", str(256 * 1024)))
+    @property
+    def STATUS_LOG_TAIL(self): return int(os.getenv("STATUS_LOG_TAIL", str(64 * 1024)))
+    @property
+    def FIX_CACHE(self): return os.getenv("FIX_CACHE", "1") not in ("0", "false", "False")
+    @property
+    def FIX_CACHE_PATH(self): return os.getenv("FIX_CACHE_PATH") or os.path.join(self.DATA_DIR, "fix_cache.db")
+    @property
+    def FIX_CACHE_MAX_ENTRIES(self): return int(os.getenv("FIX_CACHE_MAX_ENTRIES", "5000"))
+    @property
+    def FIX_CACHE_TTL_SECONDS(self): return int(os.getenv("FIX_CACHE_TTL_SECONDS", str(30 * 86400)))
+
+    # ── Git ──
+    @property
+    def GIT_MIRROR_CACHE(self): return os.getenv("GIT_MIRROR_CACHE", "1") not in ("0", "false", "False")
+    @property
+    def GIT_MIRROR_DIR(self): return os.getenv("GIT_MIRROR_DIR") or os.path.join(self.DATA_DIR, "mirrors")
+    @property
+    def GIT_MIRROR_MAX_BYTES(self): return int(os.getenv("GIT_MIRROR_MAX_BYTES", str(5 * 1024 ** 3)))
+    @property
+    def GIT_CLONE_DEPTH(self): return int(os.getenv("GIT_CLONE_DEPTH", "0"))
+    @property
+    def GIT_CLONE_FILTER(self): return os.getenv("GIT_CLONE_FILTER", "")
+
+    @property
+    def WORKSPACE_POOL(self): return os.getenv("WORKSPACE_POOL", "1") not in ("0", "false", "False")
+    @property
+    def WORKSPACE_POOL_PER_REPO(self): return int(os.getenv("WORKSPACE_POOL_PER_REPO", "2"))
+    @property
+    def WORKSPACE_POOL_MAX(self): return int(os.getenv("WORKSPACE_POOL_MAX", "20"))
+    @property
+    def WORKSPACE_KEEP_DIRS(self):
+        return [d.strip() for d in os.getenv("WORKSPACE_KEEP_DIRS", "node_modules,.gradle,.venv").split(",") if d.strip()]
+
+    # ── Test Execution ──
+    @property
+    def DOCKER_POOL_SIZE(self): return int(os.getenv("DOCKER_POOL_SIZE", "2"))
+    @property
+    def DOCKER_POOL_MAX_IDLE(self): return float(os.getenv("DOCKER_POOL_MAX_IDLE", "600"))
+    @property
+    def DOCKER_POOL_MAX_TOTAL(self): return int(os.getenv("DOCKER_POOL_MAX_TOTAL", "8"))
+    @property
+    def TEST_SHARDS(self): return int(os.getenv("TEST_SHARDS", "0"))   # 0/1 = run the suite unsharded
+    @property
+    def LOCAL_OUTPUT_HEAD(self): return int(os.getenv("LOCAL_OUTPUT_HEAD", str(256 * 1024)))
+    @property
+    def LOCAL_OUTPUT_TAIL(self): return int(os.getenv("LOCAL_OUTPUT_TAIL", str(768 * 1024)))
+    @property
+    def TEST_TIMINGS_DIR(self): return os.getenv("TEST_TIMINGS_DIR") or os.path.join(self.DATA_DIR, "timings")
+
     app_name: str = "Fixora"
 
 settings = Settings()
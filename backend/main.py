@@ -1,9 +1,22 @@
 import uuid
 import logging
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from models.schemas import RunAgentRequest, RunStatusResponse
+from fastapi.responses import StreamingResponse
+from config import settings
+from models.schemas import LogChunkResponse, RunAgentRequest, RunStatusResponse
 from services.iteration_controller import IterationController
+from services.job_scheduler import JobScheduler, QueueFullError
+from services.job_events import stream_job_events
+from services.fix_cache import get_fix_cache
+from services.rate_limiter import get_rate_limiter
+from services.symbol_index import shutdown_parse_pool, start_parse_pool
+from services.job_store import create_job_store
+from services.status_snapshots import StatusSnapshotCache, snapshot_etag, wait_for_job_version
+from services.log_buffer import READ_LIMIT_DEFAULT, delete_job_log, get_job_log, open_job_log
 
 # Configure Logging
 logging.basicConfig(
@@ -12,7 +25,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Fixora Autonomous CI/CD Healing Agent")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Forked before any job thread exists (see services/symbol_index.py)
+    start_parse_pool()
+    yield
+    shutdown_parse_pool()
+
+app = FastAPI(title="Fixora Autonomous CI/CD Healing Agent", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,8 +41,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-# In-memory session storage
-jobs = {}
+# Job state storage (SQLite by default, survives restarts)
+job_store = create_job_store()
+
+# Dedicated worker pool — keeps repair jobs off the API's request threadpool
+scheduler = JobScheduler(settings.MAX_CONCURRENT_JOBS, settings.JOB_QUEUE_SIZE, job_store=job_store)
+
+# Serialized /run-status bodies, cached per job version
+status_cache = StatusSnapshotCache()
 
 @app.get("/")
 async def root():
@@ -43,11 +69,11 @@ async def run_agent_options():
     return {"message": "OK"}
 
 @app.post("/run-agent")
-async def run_agent(request: RunAgentRequest, background_tasks: BackgroundTasks):
+async def run_agent(request: RunAgentRequest):
     job_id = str(uuid.uuid4())
     
     # Initialize job state
-    jobs[job_id] = {
+    job = {
         "job_id": job_id,
         "repo_url": request.repo_url,
         "branch_name": "",
@@ -60,33 +86,114 @@ async def run_agent(request: RunAgentRequest, background_tasks: BackgroundTasks)
         "score": 0.0,
         "fixes": [],
         "timeline": [],
-        "raw_logs": "System initialized...\n"
     }
+    open_job_log(job_id).append("System initialized...\n")
+    
+    # The controller (and its agents) is only built once a worker picks the job up
+    task = partial(_run_job, job_id, request, job)
+    # Clients can defer their own jobs but never jump ahead of the default priority
+    priority = min(max(request.priority or 0, 0), settings.JOB_PRIORITY_MAX)
+
+    try:
+        position = scheduler.submit(job_id, job, task, priority=priority)
+    except QueueFullError as e:
+        delete_job_log(job_id)
+        raise HTTPException(
+            status_code=429,
+            detail={"message": "Job queue is full. Retry later.", "queue_position": e.queue_size + 1},
+            headers={"Retry-After": "30"},
+        )
     
-    controller = IterationController(job_id)
-    background_tasks.add_task(
-        controller.run_loop, 
-        request.repo_url, 
-        request.team_name, 
-        request.leader_name, 
-        request.retry_limit, 
-        jobs[job_id],
+    return {"job_id": job_id, "queue_position": position}
+
+def _run_job(job_id: str, request: RunAgentRequest, job: dict):
+    controller = IterationController(job_id, job_store=job_store)
+    controller.run_loop(
+        request.repo_url,
+        request.team_name,
+        request.leader_name,
+        request.retry_limit,
+        job,
         api_key=request.api_key,
         github_token=request.github_token
     )
-    
-    return {"job_id": job_id}
 
 @app.get("/run-status/{job_id}", response_model=RunStatusResponse)
-async def get_status(job_id: str):
-    if job_id not in jobs:
+async def get_status(
+    job_id: str,
+    wait_for_version: Optional[int] = None,
+    timeout: float = 25.0,
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Returns the job snapshot. Supports `If-None-Match` (304 when unchanged) and
+    `?wait_for_version=N` long-polling until the job's version exceeds N.
+    """
+    if wait_for_version is not None:
+        job = await wait_for_job_version(job_store, job_id, wait_for_version, timeout)
+    else:
+        job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    log = get_job_log(job_id)
+    log_size = log.size
+    etag = snapshot_etag(job, log_size)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    queue_position = scheduler.queue_position(job_id) if job["status"] == "QUEUED" else None
+    if queue_position is not None:
+        # Queue position moves without a version bump, so it is part of the ETag
+        etag = f'{etag[:-1]}-q{queue_position}"'
+        headers["ETag"] = etag
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+
+    body = status_cache.get_or_render(job_id, etag, lambda: {
+        **job,
+        "raw_logs": log.tail(settings.STATUS_LOG_TAIL),
+        "log_size": log_size,
+        "queue_position": queue_position,
+    })
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/run-status/{job_id}/logs", response_model=LogChunkResponse)
+async def get_logs(job_id: str, offset: int = 0, limit: int = READ_LIMIT_DEFAULT):
+    """Incremental log reads: pass the previous `next_offset` to receive only new bytes."""
+    if job_store.get(job_id) is None:
         raise HTTPException(status_code=404, detail="Job not found")
-    return jobs[job_id]
+    log = get_job_log(job_id)
+    text, next_offset = log.read(offset, limit)
+    return {"job_id": job_id, "offset": offset, "next_offset": next_offset, "size": log.size, "text": text}
+
+@app.get("/run-events/{job_id}")
+async def run_events(job_id: str, log_offset: int = 0):
+    """Server-Sent Events stream of status, timeline, fix and log deltas for a job."""
+    if job_store.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        stream_job_events(job_id, job_store, log_offset=log_offset),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/scheduler-stats")
+async def scheduler_stats():
+    return scheduler.stats()
+
+@app.get("/metrics")
+async def metrics():
+    cache = get_fix_cache()
+    return {
+        "scheduler": scheduler.stats(),
+        "fix_cache": cache.stats() if cache else {"enabled": False},
+        "ai_rate_limiter": get_rate_limiter().stats(),
+    }
 
 if __name__ == "__main__":
     import uvicorn
     import os
     # Read the PORT environment variable injected by Railway, defaulting to 8000
     port = int(os.environ.get("PORT", 8000))
-    # Production configuration: non-reload
+    # Production configuration: non-reload, single worker. The scheduler's queue
+    # and concurrency limits live in this process, so they must not be split.
     uvicorn.run("main:app", host="0.0.0.0", port=port, reload=False, workers=1)
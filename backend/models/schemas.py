@@ -13,6 +13,7 @@ class RunAgentRequest(BaseModel):
     retry_limit: Optional[int] = Field(5, description="Maximum number of repair iterations")
     api_key: Optional[str] = Field(None, description="Optional Gemini API Key provided by user")
     github_token: Optional[str] = Field(None, description="Optional GitHub Personal Access Token")
+    priority: Optional[int] = Field(0, description="Scheduling priority (lower runs first); clamped to 0..JOB_PRIORITY_MAX, so 0 is the most urgent")
 
 class FixResult(BaseModel):
     file: str
@@ -40,7 +41,17 @@ class RunStatusResponse(BaseModel):
     fixes: List[FixResult]
     timeline: List[TimelineEvent]
     notification: Optional[dict] = None
+    queue_position: Optional[int] = None
     raw_logs: str
+    log_size: int = 0
+    version: int = 0
+
+class LogChunkResponse(BaseModel):
+    job_id: str
+    offset: int
+    next_offset: int
+    size: int
+    text: str
 
 # ── AI Output Validation Schemas ─────────────────────────────────────────────
 
@@ -4,60 +4,269 @@ Used by all 4 AI agent layers.
 
 Falls back gracefully to None if the API call fails, so the
 deterministic fallback logic in each agent can take over.
-Keys are NEVER logged or exposed.
+Keys are NEVER logged or exposed; they travel in a header, not the URL.
+Concurrent callers share per-key request, token and concurrency budgets
+(services/rate_limiter.py), and 429/5xx responses are retried with backoff,
+so parallel jobs slow down instead of losing their AI calls.
+
+Connections are pooled and kept alive: `call_ai` uses one shared
+requests.Session, and `call_ai_async` one httpx.AsyncClient per event loop.
+With AI_HTTP2=1 and httpx[http2] installed, the async client speaks HTTP/2,
+and `call_ai` becomes a sync facade over it on a background loop. Connect
+and read timeouts are separate (AI_CONNECT_TIMEOUT / AI_READ_TIMEOUT).
+GEMINI_API_BASE points the client at a stand-in server (see bench_ai_client.py).
 """
 
+import asyncio
 import requests
 import logging
 import json
+import threading
+import time
+import weakref
+from typing import Dict, Optional, Tuple
+
+from requests.adapters import HTTPAdapter
+
+from config import settings
+from services.log_condenser import estimate_tokens
+from services.rate_limiter import RateLimitTimeout, get_rate_limiter
+
+try:
+    import httpx
+except ImportError:  # optional: async/HTTP/2 transport
+    httpx = None
+
+try:
+    import h2  # noqa: F401 — httpx needs it for http2=True
+    HTTP2_AVAILABLE = httpx is not None
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 ALLOWED_BUG_TYPES = {"LINTING", "SYNTAX", "LOGIC", "TYPE_ERROR", "IMPORT", "INDENTATION"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
-# Google Gemini API
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-def call_ai(api_key: str, prompt: str, timeout: int = 30) -> str | None:
+_session: Optional[requests.Session] = None
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_client_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_http2_warned = False
+
+
+def call_ai(api_key: str, prompt: str, timeout: Optional[float] = None, max_output_tokens: int = 4096) -> str | None:
     """
     Makes a single call to Google Gemini API.
     Returns the response text, or None on any failure.
+    `timeout` is the read timeout (default AI_READ_TIMEOUT); `max_output_tokens`
+    caps the reply; patch-style prompts ask for less.
+    Waits for the key's rate budget and retries 429/5xx and connection errors
+    with backoff (services/rate_limiter.py).
     Keys are never printed or included in exceptions.
     """
     if not api_key or api_key.startswith("your_"):
         return None
+    if _use_http2():
+        future = asyncio.run_coroutine_threadsafe(
+            call_ai_async(api_key, prompt, timeout, max_output_tokens), _background_loop()
+        )
+        return future.result()
+
+    url, headers, payload = _request(api_key, prompt, max_output_tokens)
+    limiter = get_rate_limiter()
+    estimate = _token_estimate(prompt, max_output_tokens)
+    attempts = settings.AI_MAX_RETRIES + 1
+    for attempt in range(attempts):
+        retry = attempt + 1 < attempts
+        try:
+            with limiter.acquire(api_key, estimate) as reservation:
+                resp = _shared_session().post(url, json=payload, headers=headers, timeout=_timeouts(timeout))
+                if resp.status_code in RETRY_STATUSES and retry:
+                    reservation.settle(0)
+                    delay = _backoff(limiter, api_key, attempt, resp.status_code, resp.headers.get("Retry-After"))
+                else:
+                    resp.raise_for_status()
+                    data = resp.json()
+                    reservation.settle(_usage_tokens(data))
+                    return _response_text(data)
+
+        except RateLimitTimeout as e:
+            logger.error(f"AI call skipped: {e}")
+            return None
+        except requests.exceptions.Timeout:
+            logger.error("AI call timed out.")
+            return None
+        except requests.exceptions.ConnectionError as e:
+            if not retry:
+                logger.error(f"AI call failed: {type(e).__name__}")
+                return None
+            delay = _backoff(limiter, api_key, attempt, type(e).__name__)
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else "unknown"
+            logger.error(f"AI HTTP error: {status}")
+            return None
+        except (KeyError, IndexError) as e:
+            logger.error(f"AI response parsing failed: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"AI call failed: {type(e).__name__}: {str(e)[:100]}")
+            return None
+        time.sleep(delay)
+
+    return None
+
+
+async def call_ai_async(
+    api_key: str, prompt: str, timeout: Optional[float] = None, max_output_tokens: int = 4096
+) -> str | None:
+    """Async `call_ai` on a pooled httpx client (HTTP/2 when enabled); runs `call_ai` in a thread without httpx."""
+    if not api_key or api_key.startswith("your_"):
+        return None
+    if httpx is None:
+        return await asyncio.to_thread(call_ai, api_key, prompt, timeout, max_output_tokens)
+
+    url, headers, payload = _request(api_key, prompt, max_output_tokens)
+    limiter = get_rate_limiter()
+    estimate = _token_estimate(prompt, max_output_tokens)
+    attempts = settings.AI_MAX_RETRIES + 1
+    for attempt in range(attempts):
+        retry = attempt + 1 < attempts
+        try:
+            reservation = await asyncio.to_thread(limiter.acquire, api_key, estimate)
+            try:
+                client = _shared_async_client(timeout)
+                resp = await client.post(url, json=payload, headers=headers, timeout=_httpx_timeout(timeout))
+                if resp.status_code in RETRY_STATUSES and retry:
+                    reservation.settle(0)
+                    delay = _backoff(limiter, api_key, attempt, resp.status_code, resp.headers.get("Retry-After"))
+                else:
+                    resp.raise_for_status()
+                    data = resp.json()
+                    reservation.settle(_usage_tokens(data))
+                    return _response_text(data)
+            finally:
+                reservation.release()
+
+        except RateLimitTimeout as e:
+            logger.error(f"AI call skipped: {e}")
+            return None
+        except httpx.TimeoutException:
+            logger.error("AI call timed out.")
+            return None
+        except httpx.TransportError as e:
+            if not retry:
+                logger.error(f"AI call failed: {type(e).__name__}")
+                return None
+            delay = _backoff(limiter, api_key, attempt, type(e).__name__)
+        except httpx.HTTPStatusError as e:
+            logger.error(f"AI HTTP error: {e.response.status_code}")
+            return None
+        except (KeyError, IndexError) as e:
+            logger.error(f"AI response parsing failed: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"AI call failed: {type(e).__name__}: {str(e)[:100]}")
+            return None
+        await asyncio.sleep(delay)
+
+    return None
+
 
-    url = f"{GEMINI_API_URL}?key={api_key}"
+# ── Transport ────────────────────────────────────────────────────────────────
+
+def _request(api_key: str, prompt: str, max_output_tokens: int) -> Tuple[str, Dict[str, str], Dict]:
+    url = f"{settings.GEMINI_API_BASE.rstrip('/')}/models/{settings.GEMINI_MODEL}:generateContent"
+    headers = {"x-goog-api-key": api_key}
     payload = {
         "contents": [{
             "parts": [{"text": prompt}]
         }],
         "generationConfig": {
             "temperature": 0.2,
-            "maxOutputTokens": 4096,
+            "maxOutputTokens": max_output_tokens,
         }
     }
+    return url, headers, payload
 
-    try:
-        resp = requests.post(url, json=payload, timeout=timeout)
-        resp.raise_for_status()
-        data = resp.json()
-
-        # Extract text from Gemini response
-        text = data["candidates"][0]["content"]["parts"][0]["text"]
-        logger.info(f"AI call succeeded ({len(text)} chars returned)")
-        return text.strip()
-
-    except requests.exceptions.Timeout:
-        logger.error("AI call timed out.")
-    except requests.exceptions.HTTPError as e:
-        status = e.response.status_code if e.response else "unknown"
-        logger.error(f"AI HTTP error: {status}")
-    except (KeyError, IndexError) as e:
-        logger.error(f"AI response parsing failed: {e}")
-    except Exception as e:
-        logger.error(f"AI call failed: {type(e).__name__}: {str(e)[:100]}")
 
-    return None
+def _token_estimate(prompt: str, max_output_tokens: int) -> int:
+    # Reserve the prompt plus a typical reply; settled with usageMetadata afterwards
+    return estimate_tokens(prompt) + max_output_tokens // 4
+
+
+def _usage_tokens(data: Dict) -> Optional[int]:
+    usage = data.get("usageMetadata") or {}
+    total = usage.get("totalTokenCount")
+    return int(total) if isinstance(total, (int, float)) else None
+
+
+def _backoff(limiter, api_key: str, attempt: int, reason, retry_after: Optional[str] = None) -> float:
+    delay = limiter.backoff(api_key, attempt, retry_after, rate_limited=reason == 429)
+    logger.warning(f"AI call got {reason}; retrying in {delay:.1f}s (retry {attempt + 1}/{settings.AI_MAX_RETRIES})")
+    return delay
+
+
+def _response_text(data: Dict) -> str:
+    # Extract text from Gemini response
+    text = data["candidates"][0]["content"]["parts"][0]["text"]
+    logger.info(f"AI call succeeded ({len(text)} chars returned)")
+    return text.strip()
+
+
+def _timeouts(read_timeout: Optional[float]) -> Tuple[float, float]:
+    return settings.AI_CONNECT_TIMEOUT, read_timeout or settings.AI_READ_TIMEOUT
+
+
+def _httpx_timeout(read_timeout: Optional[float]):
+    connect, read = _timeouts(read_timeout)
+    return httpx.Timeout(read, connect=connect)
+
+
+def _use_http2() -> bool:
+    global _http2_warned
+    if settings.AI_HTTP2 and not HTTP2_AVAILABLE:
+        if not _http2_warned:
+            logger.warning("AI_HTTP2 is set but httpx[http2] is not installed; using HTTP/1.1")
+            _http2_warned = True
+        return False
+    return settings.AI_HTTP2
+
+
+def _shared_session() -> requests.Session:
+    global _session
+    with _client_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.AI_POOL_SIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _shared_async_client(read_timeout: Optional[float]):
+    """One client per event loop: httpx connections can't be shared across loops."""
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                http2=settings.AI_HTTP2 and HTTP2_AVAILABLE,
+                timeout=_httpx_timeout(read_timeout),
+                limits=httpx.Limits(max_connections=settings.AI_POOL_SIZE, max_keepalive_connections=settings.AI_POOL_SIZE),
+            )
+            _async_clients[loop] = client
+        return client
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _client_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="fixora-ai-client", daemon=True).start()
+        return _loop
 
 
 def sanitize_bug_type(raw_type: str) -> str:
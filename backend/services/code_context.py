@@ -0,0 +1,354 @@
+"""
+Code Context — scope fix prompts to the code unit around each failure.
+`FixAgent` used to send the full file with every prompt, so on a 3,000-line
+module the prompt size and AI latency grew with the file. `build_context`
+finds the enclosing unit of each failing line instead:
+
+  python   the innermost function or class (decorators included) from `ast`;
+           files that don't parse use an indentation scan for `def`/`class`
+  js/java  the innermost brace block whose header looks like a function,
+           method or class. A small tokenizer skips strings and comments
+           when matching braces
+  other    a window of WINDOW_LINES either side of the line
+
+Units longer than MAX_UNIT_LINES shrink to that window, and overlapping units
+merge. The prompt also carries the signatures of same-file symbols the
+units reference (imports, functions, classes, methods). `ScopedContext.apply`
+patches only inside the units and splices them back into the file. Files of
+at most WHOLE_FILE_LINES lines are still sent whole.
+"""
+
+import ast
+import os
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from services.patching import MATCH_TIERS, Hunk, PatchError, apply_patch, count_matches
+
+WHOLE_FILE_LINES = 200
+MAX_UNIT_LINES = 300
+WINDOW_LINES = 30
+MAX_SIGNATURES = 20
+
+BRACE_LANGUAGES = {".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs", ".java", ".kt", ".scala", ".go", ".cs", ".c", ".cpp", ".h"}
+PY_DEF = re.compile(r"^(\s*)(?:async\s+def|def|class)\s+(\w+)")
+CONTROL_HEADER = re.compile(r"^\s*(?:\}\s*)?(?:if|for|while|switch|catch|try|do|else|finally|with|synchronized|return)\b")
+FUNCTION_HEADER = re.compile(r"\bfunction\b|=>|\b(?:class|interface|enum)\s+\w+|\)\s*(?:throws\s+[\w.,\s]+)?\s*$")
+HEADER_NAME = re.compile(r"\b(?:function|class|interface|enum)\s*\*?\s*(\w+)|(\w+)\s*(?:=\s*(?:async\s*)?\(|\()")
+BRACE_DECLARATION = re.compile(
+    r"^[ \t]*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(\w+)\s*\([^)]*\)"
+    r"|^[ \t]*(?:(?:public|private|protected|static|final|abstract|export|default)\s+)*(?:class|interface|enum)\s+(\w+)[^{\n]*"
+    r"|^[ \t]*(?:(?:public|private|protected|static|final|abstract|synchronized|async)\s+)+[\w<>\[\],.? ]+?\s+(\w+)\s*\([^)\n]*\)"
+    r"|^[ \t]*(?:export\s+)?(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s*)?(?:function\b[^{\n]*|\([^)\n]*\)\s*=>|\w+\s*=>)",
+    re.MULTILINE,
+)
+IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+
+
+class CodeUnit:
+    """Lines `start`..`end` of a file, 1-based and inclusive."""
+
+    def __init__(self, start: int, end: int, kind: str, name: str = ""):
+        self.start = start
+        self.end = end
+        self.kind = kind
+        self.name = name
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind} {self.name}".strip()
+
+
+class ScopedContext:
+    def __init__(self, content: str, units: List[CodeUnit], signatures: List[str]):
+        self.content = content
+        self.lines = content.splitlines()
+        self.units = units
+        self.signatures = signatures
+
+    @property
+    def whole_file(self) -> bool:
+        return len(self.units) == 1 and self.units[0].kind == "file"
+
+    def unit_text(self, unit: CodeUnit) -> str:
+        return "\n".join(self.lines[unit.start - 1:unit.end]) + "\n"
+
+    def render(self) -> str:
+        """The code section of a fix prompt."""
+        if self.whole_file:
+            return f"FULL FILE CONTENT:\n{self.content}"
+        parts = []
+        for unit in self.units:
+            parts.append(
+                f"CODE UNIT: {unit.label} (lines {unit.start}-{unit.end} of {len(self.lines)}). "
+                f"Edit only inside this unit.\n{self.unit_text(unit)}"
+            )
+        if self.signatures:
+            parts.append("REFERENCED SIGNATURES (read-only):\n" + "\n".join(self.signatures))
+        return "\n".join(parts)
+
+    def apply(self, hunks: List[Hunk]) -> str:
+        """
+        Applies each hunk inside the one unit it matches and splices the units back into the file.
+        Units are compared tier by tier, so an exact match in one unit wins over a fuzzy
+        match in another; a hunk that matches two units at the same tier is rejected.
+        """
+        texts = [self.unit_text(u) for u in self.units]
+        for i, hunk in enumerate(hunks):
+            if not any(l.strip() for l in hunk.search):
+                texts[0] = apply_patch(texts[0], [hunk])   # pure insertion
+                continue
+            matched = []
+            for tier in range(MATCH_TIERS):
+                matched = [u for u, text in enumerate(texts) if count_matches(text, hunk, tier)]
+                if matched:
+                    break
+            if not matched:
+                raise PatchError(f"hunk {i + 1} does not match any code unit")
+            if len(matched) > 1:
+                raise PatchError(f"hunk {i + 1} matches {len(matched)} code units")
+            texts[matched[0]] = apply_patch(texts[matched[0]], [hunk])
+        lines = list(self.lines)
+        for unit, text in sorted(zip(self.units, texts), key=lambda p: p[0].start, reverse=True):
+            lines[unit.start - 1:unit.end] = text.splitlines()
+        patched = "\n".join(lines)
+        return patched + "\n" if self.content.endswith("\n") else patched
+
+
+def build_context(path: str, content: str, lines: List[int], symbol_index=None) -> ScopedContext:
+    """
+    Builds the prompt scope for failures at `lines` (1-based) of `path`.
+    With a `symbol_index` (services/symbol_index.py), referenced Python symbols
+    defined in other files contribute their signatures too.
+    """
+    total = len(content.splitlines())
+    if total <= WHOLE_FILE_LINES or not any(0 < l <= total for l in lines):
+        return ScopedContext(content, [CodeUnit(1, max(total, 1), "file")], [])
+
+    ext = os.path.splitext(path)[1].lower()
+    tree = _parse_python(content) if ext == ".py" else None
+    units = []
+    for line in sorted({l for l in lines if 0 < l <= total}):
+        if tree is not None:
+            unit = _python_unit(tree, line)
+        elif ext == ".py":
+            unit = _indented_unit(content.splitlines(), line)
+        elif ext in BRACE_LANGUAGES:
+            unit = _brace_unit(content, line)
+        else:
+            unit = None
+        units.append(_bounded(unit, line, total))
+
+    units = _merge(units)
+    if tree is not None:
+        signatures = _python_signatures(tree, content, units, path, symbol_index)
+    else:
+        signatures = _declaration_signatures(content, units)
+    return ScopedContext(content, units, signatures)
+
+
+# ── Unit finders ─────────────────────────────────────────────────────────────
+
+def _parse_python(content: str) -> Optional[ast.AST]:
+    try:
+        return ast.parse(content)
+    except (SyntaxError, ValueError):
+        return None
+
+
+def _node_span(node: ast.AST) -> Tuple[int, int]:
+    start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+    return start, node.end_lineno
+
+
+def _python_unit(tree: ast.AST, line: int) -> Optional[CodeUnit]:
+    best = None
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            start, end = _node_span(node)
+            if start <= line <= end and (best is None or end - start < best.end - best.start):
+                kind = "class" if isinstance(node, ast.ClassDef) else "function"
+                best = CodeUnit(start, end, kind, node.name)
+    return best
+
+
+def _indented_unit(lines: List[str], line: int) -> Optional[CodeUnit]:
+    """Indentation scan for Python that doesn't parse (e.g. the syntax error being fixed)."""
+    target = lines[line - 1]
+    target_indent = len(target) - len(target.lstrip())
+    for i in range(line - 1, -1, -1):
+        m = PY_DEF.match(lines[i])
+        if not m:
+            continue
+        indent = len(m.group(1))
+        if i == line - 1 or indent < target_indent:
+            end = i + 1
+            for j in range(i + 1, len(lines)):
+                text = lines[j]
+                if text.strip() and len(text) - len(text.lstrip()) <= indent:
+                    break
+                if text.strip():
+                    end = j + 1
+            kind = "class" if m.group(0).lstrip().startswith("class") else "function"
+            return CodeUnit(i + 1, end, kind, m.group(2))
+    return None
+
+
+def _brace_unit(content: str, line: int) -> Optional[CodeUnit]:
+    lines = content.splitlines()
+    containing = [b for b in _brace_blocks(content) if b[0] <= line <= b[2]]
+    # Innermost first
+    for header_start, open_line, close_line in sorted(containing, key=lambda b: b[2] - b[0]):
+        header = " ".join(lines[header_start - 1:open_line]).split("{")[0]
+        if CONTROL_HEADER.match(header) or not FUNCTION_HEADER.search(header):
+            continue
+        m = HEADER_NAME.search(header)
+        name = (m.group(1) or m.group(2)) if m else ""
+        kind = "class" if re.search(r"\b(?:class|interface|enum)\s", header) else "function"
+        return CodeUnit(header_start, close_line, kind, name)
+    return None
+
+
+def _brace_blocks(content: str) -> List[Tuple[int, int, int]]:
+    """(header start line, open line, close line) of every brace pair, ignoring strings and comments."""
+    blocks: List[Tuple[int, int, int]] = []
+    stack: List[Tuple[int, int]] = []
+    line, i, n = 1, 0, len(content)
+    header_start = None   # line of the first token after the last `;`, `{` or `}`
+    while i < n:
+        c = content[i]
+        if c == "\n":
+            line += 1
+        elif content.startswith("//", i):
+            i = content.find("\n", i)
+            if i < 0:
+                break
+            continue
+        elif content.startswith("/*", i):
+            end = content.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            line += content.count("\n", i, end)
+            i = end
+            continue
+        elif c in "\"'`":
+            j = i + 1
+            while j < n and content[j] != c:
+                if content[j] == "\\":
+                    j += 1
+                elif content[j] == "\n" and c != "`":
+                    break   # unterminated literal; resync at the newline
+                j += 1
+            line += content.count("\n", i, min(j + 1, n))
+            i = j + 1
+            if header_start is None:
+                header_start = line
+            continue
+        elif c == "{":
+            stack.append((header_start or line, line))
+            header_start = None
+        elif c == "}":
+            if stack:
+                start, open_line = stack.pop()
+                blocks.append((start, open_line, line))
+            header_start = None
+        elif c == ";":
+            header_start = None
+        elif not c.isspace() and header_start is None:
+            header_start = line
+        i += 1
+    return blocks
+
+
+def _bounded(unit: Optional[CodeUnit], line: int, total: int) -> CodeUnit:
+    """The unit itself, or a window around `line` when there is none or it is too long."""
+    if unit is not None and unit.end - unit.start + 1 <= MAX_UNIT_LINES:
+        return unit
+    low, high = (unit.start, unit.end) if unit is not None else (1, total)
+    start = max(low, line - WINDOW_LINES)
+    end = min(high, line + WINDOW_LINES)
+    return CodeUnit(start, end, "lines", unit.name if unit is not None else "")
+
+
+def _merge(units: List[CodeUnit]) -> List[CodeUnit]:
+    merged: List[CodeUnit] = []
+    for unit in sorted(units, key=lambda u: u.start):
+        if merged and unit.start <= merged[-1].end + 1:
+            last = merged[-1]
+            if unit.end > last.end:
+                merged[-1] = CodeUnit(last.start, unit.end, "lines", last.name)
+        else:
+            merged.append(unit)
+    return merged
+
+
+# ── Referenced signatures ────────────────────────────────────────────────────
+
+def _python_signatures(tree: ast.AST, content: str, units: List[CodeUnit], path: str, symbol_index) -> List[str]:
+    lines = content.splitlines()
+    referenced: Set[str] = set()
+    for node in ast.walk(tree):
+        if getattr(node, "lineno", 0) and any(u.start <= node.lineno <= u.end for u in units):
+            if isinstance(node, ast.Name):
+                referenced.add(node.id)
+            elif isinstance(node, ast.Attribute):
+                referenced.add(node.attr)
+
+    signatures: List[str] = []
+    local: Set[str] = set()
+    for node, owner in _python_definitions(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            bound = {(a.asname or a.name).split(".")[0] for a in node.names}
+            if bound & referenced and not any(u.start <= node.lineno <= u.end for u in units):
+                signatures.append(lines[node.lineno - 1].strip())
+            continue
+        local.add(node.name)
+        if node.name in referenced and not any(u.start <= node.lineno <= u.end for u in units):
+            signatures.append(f"{python_signature(node, owner)}   # line {node.lineno}")
+
+    if symbol_index is not None:
+        for name in sorted(referenced - local):
+            symbol = symbol_index.definition(name)
+            if symbol is not None and symbol.file != path:
+                signatures.append(f"{symbol.signature}   # {symbol.file}:{symbol.start}")
+    return signatures[:MAX_SIGNATURES]
+
+
+def _python_definitions(tree: ast.AST):
+    """Module-level imports and definitions, plus methods of module-level classes."""
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            yield node, ""
+        if isinstance(node, ast.ClassDef):
+            for child in node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    yield child, node.name
+
+
+def python_signature(node: ast.AST, owner: str) -> str:
+    if isinstance(node, ast.ClassDef):
+        bases = ", ".join(ast.unparse(b) for b in node.bases)
+        return f"class {node.name}({bases})" if bases else f"class {node.name}"
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    name = f"{owner}.{node.name}" if owner else node.name
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {name}({ast.unparse(node.args)}){returns}"
+
+
+def _declaration_signatures(content: str, units: List[CodeUnit]) -> List[str]:
+    lines = content.splitlines()
+    referenced: Set[str] = set()
+    for unit in units:
+        referenced.update(IDENTIFIER.findall("\n".join(lines[unit.start - 1:unit.end])))
+
+    signatures: List[str] = []
+    seen: Dict[str, bool] = {}
+    for m in BRACE_DECLARATION.finditer(content):
+        name = next((g for g in m.groups() if g), "")
+        line = content.count("\n", 0, m.start()) + 1
+        if not name or name in seen or name not in referenced or any(u.start <= line <= u.end for u in units):
+            continue
+        seen[name] = True
+        signatures.append(f"{m.group(0).strip().rstrip('{').strip()}   // line {line}")
+        if len(signatures) >= MAX_SIGNATURES:
+            break
+    return signatures
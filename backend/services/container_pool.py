@@ -0,0 +1,202 @@
+"""
+Container Pool — long-lived, pre-started containers reused across iterations.
+`DockerExecutor.execute` used to pay `containers.run` → `wait` → `remove` (and
+the image's boot time) for every iteration. Pooled containers idle on
+`tail -f /dev/null` with the workspace already mounted, and each iteration runs
+through `exec`, so iteration latency becomes test time.
+
+Containers are keyed by (scope, image, volumes, working_dir), where the
+scope is the job. A container serves every iteration of one job and is
+never handed to another, because /tmp, tool caches and anything installed
+outside the dependency volumes live in its writable layer. `discard()`
+removes a job's containers when it ends. Each key keeps at most
+DOCKER_POOL_SIZE idle containers, and the pool at most DOCKER_POOL_MAX_TOTAL
+across keys, evicting the least recently used. A container is health-checked
+before it is leased and removed after DOCKER_POOL_MAX_IDLE seconds idle.
+Timed-out execs kill their container instead of returning it to the pool.
+"""
+
+import atexit
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IDLE_COMMAND = ["tail", "-f", "/dev/null"]
+POOL_LABEL = "fixora.pool"
+JANITOR_INTERVAL = 30.0
+
+
+def pool_key(image: str, volumes: dict, working_dir: str, scope: str = "") -> str:
+    return json.dumps([scope, image, volumes or {}, working_dir], sort_keys=True)
+
+
+class ContainerPool:
+    def __init__(self, client, size_per_key: int, max_idle_seconds: float, max_total: int):
+        self.client = client
+        self.size_per_key = size_per_key
+        self.max_total = max_total
+        self.max_idle_seconds = max_idle_seconds
+        self._idle: Dict[str, List[Tuple[object, float]]] = {}
+        self._lock = threading.Lock()
+        self._janitor = threading.Thread(target=self._janitor_loop, name="fixora-container-janitor", daemon=True)
+        self._janitor.start()
+        atexit.register(self.shutdown)
+
+    def acquire(self, image: str, volumes: dict, working_dir: str, scope: str = ""):
+        """Returns a healthy running container for the key, starting one if none is idle."""
+        key = pool_key(image, volumes, working_dir, scope)
+        while True:
+            with self._lock:
+                idle = self._idle.get(key, [])
+                container = idle.pop()[0] if idle else None
+            if container is None:
+                break
+            if self._healthy(container):
+                return container
+            self._remove(container)
+
+        logger.info(f"ContainerPool: Starting warm container for {image}")
+        return self.client.containers.run(
+            image,
+            command=IDLE_COMMAND,
+            volumes=volumes,
+            working_dir=working_dir,
+            detach=True,
+            labels={POOL_LABEL: "1"},
+        )
+
+    def release(self, image: str, volumes: dict, working_dir: str, container, reusable: bool = True, scope: str = ""):
+        key = pool_key(image, volumes, working_dir, scope)
+        evicted = [container]
+        if reusable:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.size_per_key:
+                    idle.append((container, time.time()))
+                    evicted = self._over_capacity()
+        for old in evicted:
+            self._remove(old)
+
+    def exec(
+        self,
+        container,
+        command,
+        working_dir: str,
+        timeout: int,
+        environment: dict = None,
+        on_chunk: Callable[[bytes], bool] = None,
+    ) -> Tuple[int, bool]:
+        """
+        Runs `command` inside the container. Returns (exit_code, timed_out).
+        Output is only streamed to `on_chunk`, never buffered here; when it
+        returns True the run is aborted. On timeout or abort the container is
+        killed, since exec cannot be cancelled on its own, so the caller must
+        not reuse it.
+        """
+        api = self.client.api
+        exec_id = api.exec_create(
+            container.id, command, workdir=working_dir, environment=environment, stdout=True, stderr=True
+        )["Id"]
+        timed_out = threading.Event()
+
+        def kill():
+            try:
+                container.kill()
+            except Exception:
+                pass
+
+        def on_timeout():
+            timed_out.set()
+            kill()
+
+        watchdog = threading.Timer(timeout, on_timeout)
+        watchdog.daemon = True
+        watchdog.start()
+        aborted = False
+        try:
+            for chunk in api.exec_start(exec_id, stream=True):
+                if on_chunk and on_chunk(chunk):
+                    aborted = True
+                    kill()
+                    break
+        finally:
+            watchdog.cancel()
+
+        if timed_out.is_set() or aborted:
+            return -1, timed_out.is_set()
+        exit_code = api.exec_inspect(exec_id).get("ExitCode")
+        return (exit_code if exit_code is not None else -1), False
+
+    def discard(self, scope: str):
+        """Removes the idle containers leased under `scope` (a finished job)."""
+        with self._lock:
+            keys = [k for k in self._idle if json.loads(k)[0] == scope]
+            containers = [c for k in keys for c, _ in self._idle.pop(k)]
+        for container in containers:
+            self._remove(container)
+
+    def shutdown(self):
+        with self._lock:
+            containers = [c for idle in self._idle.values() for c, _ in idle]
+            self._idle.clear()
+        for container in containers:
+            self._remove(container)
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _healthy(self, container) -> bool:
+        try:
+            container.reload()
+            return container.status == "running"
+        except Exception:
+            return False
+
+    def _over_capacity(self) -> List[object]:
+        """Pops the least recently used idle containers beyond max_total. Caller holds the lock."""
+        evicted = []
+        while sum(len(idle) for idle in self._idle.values()) > self.max_total:
+            key = min((k for k, idle in self._idle.items() if idle), key=lambda k: self._idle[k][0][1])
+            evicted.append(self._idle[key].pop(0)[0])
+            if not self._idle[key]:
+                del self._idle[key]
+        return evicted
+
+    def _remove(self, container):
+        try:
+            container.remove(force=True)
+        except Exception:
+            pass
+
+    def _janitor_loop(self):
+        while True:
+            time.sleep(JANITOR_INTERVAL)
+            cutoff = time.time() - self.max_idle_seconds
+            expired = []
+            with self._lock:
+                for key, idle in list(self._idle.items()):
+                    keep = [(c, t) for c, t in idle if t >= cutoff]
+                    expired.extend(c for c, t in idle if t < cutoff)
+                    if keep:
+                        self._idle[key] = keep
+                    else:
+                        del self._idle[key]
+            for container in expired:
+                logger.info("ContainerPool: Removing idle container")
+                self._remove(container)
+
+
+_pool: Optional[ContainerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_container_pool(client, size_per_key: int, max_idle_seconds: float, max_total: int) -> ContainerPool:
+    """Process-wide pool shared by every DockerExecutor."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ContainerPool(client, size_per_key, max_idle_seconds, max_total)
+        return _pool
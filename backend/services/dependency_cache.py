@@ -0,0 +1,109 @@
+"""
+Dependency Cache — install dependencies once per lockfile version.
+`RepoAgent` reports an `install_command` separately from the `test_command`,
+plus the stack's dependency files. This module hashes those files (plus the
+image and install command) and builds a single shell command that runs the
+install only when no marker exists for that hash, then runs the tests.
+
+Where installed dependencies live:
+  python  — PYTHONUSERBASE inside a per-hash named volume (`/deps`)
+  node    — the workspace's node_modules (kept by the workspace pool),
+            with the npm download cache in a shared named volume
+  gradle  — GRADLE_USER_HOME inside a per-hash named volume
+  maven   — ~/.m2 inside a per-hash named volume
+On the local executor the marker lives under DATA_DIR/deps/<key>, so a host
+install also runs once per lockfile version.
+"""
+
+import hashlib
+import logging
+import os
+import shlex
+from typing import Dict
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTAINER_DEPS_DIR = "/deps"
+MARKER_NAME = ".fixora-installed"
+
+
+def unwrap_shell(command: str) -> str:
+    """Turns `sh -c '<script>'` back into `<script>`; other commands are returned as-is."""
+    command = (command or "").strip()
+    if command.startswith("sh -c "):
+        parts = shlex.split(command)
+        if len(parts) == 3:
+            return parts[2]
+    return command
+
+
+class DependencyCache:
+    def plan(self, stack_info: Dict, repo_path: str) -> Dict:
+        """
+        Returns the execution plan for one test run:
+        command, docker_volumes, docker_env, local_env and the cache key.
+        """
+        test_cmd = unwrap_shell(stack_info.get("test_command", "pytest"))
+        install_cmd = unwrap_shell(stack_info.get("install_command", ""))
+        language = stack_info.get("language", "unknown")
+        image = stack_info.get("docker_image", "")
+
+        digest = self._hash(repo_path, stack_info, image, install_cmd)
+        key = f"{language}-{digest}"
+        local_deps = os.path.join(settings.DATA_DIR, "deps", key)
+
+        docker_volumes: Dict = {}
+        docker_env: Dict[str, str] = {"FIXORA_DEPS": CONTAINER_DEPS_DIR}
+        local_env: Dict[str, str] = {"FIXORA_DEPS": local_deps}
+        marker = f"$FIXORA_DEPS/{MARKER_NAME}"
+        pre_test = ""
+
+        if language == "python":
+            docker_volumes[f"fixora-deps-{key}"] = {"bind": CONTAINER_DEPS_DIR, "mode": "rw"}
+            docker_env.update({"PYTHONUSERBASE": f"{CONTAINER_DEPS_DIR}/pyuser", "PIP_USER": "1"})
+            pre_test = 'export PATH="${PYTHONUSERBASE:-$HOME/.local}/bin:$PATH" && '
+        elif language == "javascript":
+            docker_volumes["fixora-npm-cache"] = {"bind": "/root/.npm", "mode": "rw"}
+            marker = f"node_modules/.fixora-deps-{digest}"
+        elif language == "java_gradle":
+            docker_volumes[f"fixora-deps-{key}"] = {"bind": CONTAINER_DEPS_DIR, "mode": "rw"}
+            docker_env["GRADLE_USER_HOME"] = f"{CONTAINER_DEPS_DIR}/gradle"
+        elif language == "java_maven":
+            docker_volumes[f"fixora-deps-{key}"] = {"bind": "/root/.m2", "mode": "rw"}
+            docker_env["FIXORA_DEPS"] = "/root/.m2"
+
+        if install_cmd:
+            script = (
+                f'mkdir -p "$FIXORA_DEPS" && '
+                f'if [ ! -f "{marker}" ]; then echo "Installing dependencies ({key})..." && '
+                f'{{ {install_cmd} ; }} && mkdir -p "$(dirname "{marker}")" && touch "{marker}"; fi && '
+                f"{pre_test}{test_cmd}"
+            )
+        else:
+            script = f"{pre_test}{test_cmd}"
+
+        return {
+            "key": key,
+            "command": f"sh -c {shlex.quote(script)}",
+            "docker_volumes": docker_volumes,
+            "docker_env": docker_env,
+            "local_env": local_env,
+        }
+
+    def _hash(self, repo_path: str, stack_info: Dict, image: str, install_cmd: str) -> str:
+        h = hashlib.sha256()
+        h.update(image.encode("utf-8"))
+        h.update(b"\0")
+        h.update(install_cmd.encode("utf-8"))
+        root = os.path.join(repo_path, stack_info.get("project_root", "."))
+        for name in stack_info.get("dependency_files", []):
+            path = os.path.join(root, name)
+            if not os.path.isfile(path):
+                continue
+            h.update(b"\0" + name.encode("utf-8") + b"\0")
+            with open(path, "rb") as fh:
+                for block in iter(lambda: fh.read(65536), b""):
+                    h.update(block)
+        return h.hexdigest()[:16]
@@ -3,11 +3,26 @@ Docker Executor — runs test commands inside isolated containers.
 Returns a result dict with: success, exit_code, logs, infra_error.
 `infra_error=True` means Docker itself failed (not the tests), allowing
 the caller to distinguish infra failures from genuine test passes/failures.
+With DOCKER_POOL_SIZE > 0, commands run via `exec` in warm pooled containers.
+
+Output is streamed on every path (pooled exec, one-off container, local
+process via `LocalRunner`) through an `OutputMonitor`: chunks reach `on_output` as they arrive,
+and once a stop predicate fires the run is killed early. An early abort sets
+`aborted_reason` and reports success=False.
 """
 
 import docker
 import logging
+import os
+import shlex
+import threading
 import time
+from typing import Callable, List
+
+from config import settings
+from services.container_pool import get_container_pool
+from services.early_stop import OutputMonitor, StopPredicate
+from services.local_runner import get_local_runner
 
 logger = logging.getLogger(__name__)
 
@@ -27,36 +42,62 @@ class DockerExecutor:
         volumes: dict,
         working_dir: str,
         timeout: int = 300,
+        environment: dict = None,
+        local_environment: dict = None,
+        on_output: Callable[[str], None] = None,
+        stop_predicates: List[StopPredicate] = None,
+        pool_scope: str = "",
     ) -> dict:
-        """Runs tests in Docker if available, otherwise falls back to local subprocess."""
+        """
+        Runs tests in Docker if available, otherwise falls back to local subprocess.
+        `environment` applies inside containers, `local_environment` to the local fallback.
+        `on_output` receives output as it streams; `stop_predicates` may abort the run early.
+        Pooled containers are only reused within `pool_scope` (the job id).
+        """
         
         # ── Option A: Docker Execution ──
+        if self.client and settings.DOCKER_POOL_SIZE > 0:
+            monitor = OutputMonitor(on_output, stop_predicates)
+            result = self._execute_pooled(image, command, volumes, working_dir, timeout, environment, monitor, pool_scope)
+            if result:
+                return result
+
         if self.client:
             container = None
+            monitor = OutputMonitor(on_output, stop_predicates)
             try:
                 logger.info(f"Docker: Running {image} with command: {command}")
                 
                 # Command normalization for Docker SDK
-                docker_command = ["sh", "-c", command[6:-1]] if command.startswith("sh -c ") else command
+                docker_command = self._normalize_command(command)
                 
                 container = self.client.containers.run(
                     image,
                     command=docker_command,
                     volumes=volumes,
                     working_dir=working_dir,
+                    environment=environment,
                     detach=True,
                 )
 
-                status = container.wait(timeout=timeout)
-                exit_code = status["StatusCode"]
-                logs = container.logs().decode("utf-8", errors="replace")
+                timed_out = threading.Event()
+                watchdog = threading.Timer(timeout, lambda: (timed_out.set(), self._kill(container)))
+                watchdog.daemon = True
+                watchdog.start()
+                try:
+                    for chunk in container.logs(stream=True, follow=True):
+                        if monitor.feed(chunk):
+                            self._kill(container)
+                            break
+                finally:
+                    watchdog.cancel()
 
-                return {
-                    "success": exit_code == 0,
-                    "exit_code": exit_code,
-                    "logs": logs,
-                    "infra_error": False,
-                }
+                if timed_out.is_set():
+                    return self._result(-1, monitor, note=f"\nExecution timed out after {timeout}s")
+                if monitor.should_stop:
+                    return self._result(-1, monitor)
+                status = container.wait(timeout=30)
+                return self._result(status["StatusCode"], monitor)
             except Exception as e:
                 logger.warning(f"Docker execution failed: {e}. Attempting local fallback...")
             finally:
@@ -65,9 +106,6 @@ class DockerExecutor:
                     except: pass
 
         # ── Option B: Local Fallback (For platforms like Railway) ──
-        import subprocess
-        import os
-        
         # Determine the correct local working directory from volume mappings
         local_cwd = working_dir
         if volumes:
@@ -77,27 +115,88 @@ class DockerExecutor:
                     break
 
         logger.info(f"LocalExecutor: Running command in host path -> {local_cwd}...")
+        # The local runner keeps logs bounded itself, so the monitor only streams
+        monitor = OutputMonitor(on_output, stop_predicates, capture=False)
         try:
-            # We run the command directly on the host OS
-            process = subprocess.run(
+            # We run the command directly on the host OS, stderr interleaved with stdout
+            run = get_local_runner().run(
                 command,
-                shell=True,
                 cwd=local_cwd,
-                capture_output=True,
-                text=True,
-                timeout=timeout
+                env={**os.environ, **(local_environment or {})},
+                timeout=timeout,
+                on_chunk=monitor.feed,
             )
-            
-            return {
-                "success": process.returncode == 0,
-                "exit_code": process.returncode,
-                "logs": process.stdout + "\n" + process.stderr,
-                "infra_error": False,
-            }
+            result = self._result(run["exit_code"], monitor, logs=run["logs"])
+            result.update({k: run[k] for k in ("peak_rss_bytes", "cpu_seconds", "output_bytes")})
+            return result
         except Exception as e:
             return {
                 "success": False,
                 "logs": f"Local execution failed: {str(e)}",
                 "exit_code": -1,
                 "infra_error": True,
+                "aborted_reason": None,
             }
+
+    def release_scope(self, scope: str):
+        """Removes the pooled containers of a finished job."""
+        if self.client and settings.DOCKER_POOL_SIZE > 0:
+            self._pool().discard(scope)
+
+    def _pool(self):
+        return get_container_pool(
+            self.client, settings.DOCKER_POOL_SIZE, settings.DOCKER_POOL_MAX_IDLE, settings.DOCKER_POOL_MAX_TOTAL
+        )
+
+    def _result(self, exit_code: int, monitor: OutputMonitor, note: str = "", logs: str = None) -> dict:
+        if note:
+            monitor.feed(note)
+        captured = monitor.finish()
+        logs = captured if logs is None else logs
+        aborted_reason = monitor.reason if monitor.should_stop else None
+        if aborted_reason:
+            logger.info(f"Executor: Stopped early ({aborted_reason})")
+            logs += f"\n[fixora] Run stopped early: {aborted_reason}\n"
+        return {
+            "success": exit_code == 0 and not aborted_reason,
+            "exit_code": exit_code,
+            "logs": logs,
+            "infra_error": False,
+            "aborted_reason": aborted_reason,
+        }
+
+    def _kill(self, container):
+        try:
+            container.kill()
+        except Exception:
+            pass
+
+    def _normalize_command(self, command: str):
+        """Unwraps `sh -c '...'` into the argv list form the Docker SDK expects."""
+        return shlex.split(command) if command.startswith("sh -c ") else command
+
+    def _execute_pooled(
+        self, image: str, command: str, volumes: dict, working_dir: str, timeout: int,
+        environment: dict = None, monitor: OutputMonitor = None, scope: str = "",
+    ) -> dict | None:
+        """Runs the command via exec in a warm container. Returns None to fall back to a one-off container."""
+        pool = self._pool()
+        monitor = monitor or OutputMonitor()
+        container = None
+        try:
+            container = pool.acquire(image, volumes, working_dir, scope)
+            logger.info(f"Docker (pooled): Running {image} with command: {command}")
+            exit_code, timed_out = pool.exec(
+                container, self._normalize_command(command), working_dir, timeout,
+                environment=environment, on_chunk=monitor.feed,
+            )
+            pool.release(
+                image, volumes, working_dir, container, reusable=not (timed_out or monitor.should_stop), scope=scope
+            )
+            note = f"\nExecution timed out after {timeout}s" if timed_out else ""
+            return self._result(exit_code, monitor, note=note)
+        except Exception as e:
+            logger.warning(f"Docker pooled execution failed: {e}. Using a one-off container...")
+            if container is not None:
+                pool.release(image, volumes, working_dir, container, reusable=False, scope=scope)
+            return None
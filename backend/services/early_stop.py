@@ -0,0 +1,127 @@
+"""
+Early Stop — streaming output capture with pluggable abort predicates.
+Executors feed raw output chunks into an `OutputMonitor` while the tests run.
+The monitor forwards each chunk to `on_output` (the job's log buffer) and
+checks every complete line against the stop predicates. A predicate returns
+a reason string when a line already guarantees failure (for example a
+compile or collection error). The monitor then keeps EARLY_STOP_GRACE_LINES
+more lines, so the traceback is still captured for the parser, and asks the
+executor to kill the run.
+"""
+
+import codecs
+import re
+from typing import Callable, Dict, List, Optional
+
+StopPredicate = Callable[[str], Optional[str]]
+
+EARLY_STOP_GRACE_LINES = 60
+
+
+def _pattern_predicate(reason: str, pattern: str) -> StopPredicate:
+    compiled = re.compile(pattern)
+
+    def predicate(line: str) -> Optional[str]:
+        return reason if compiled.search(line) else None
+
+    predicate.__name__ = reason.lower().replace(" ", "_")
+    return predicate
+
+
+# ── Built-in predicates ──────────────────────────────────────────────────────
+
+# Collection-phase markers only: an `E   SyntaxError` line can also be a runtime
+# error in the FAILURES section, and killing the run there loses the reports.
+collection_error_seen = _pattern_predicate(
+    "Collection error seen",
+    r"^(?:_{3,} )?ERROR collecting |ImportError while importing test module",
+)
+java_compile_error_seen = _pattern_predicate(
+    "Compilation error seen",
+    r"Execution failed for task ':\S*compile\w*Java'|^\[ERROR\] COMPILATION ERROR|^\[ERROR\] Failed to execute goal .*compil",
+)
+# Only a top-level crash: "Test suite failed to run" (and ts-jest's `error TS`
+# diagnostics inside it) concern a single suite while jest runs the others.
+js_syntax_error_seen = _pattern_predicate(
+    "Syntax error seen",
+    r"^SyntaxError: ",
+)
+install_failed = _pattern_predicate(
+    "Dependency install failed",
+    r"^ERROR: (?:Could not find a version|No matching distribution)|^npm ERR! code E(?:RESOLVE|NOTARGET|404)",
+)
+
+_STACK_PREDICATES: Dict[str, List[StopPredicate]] = {
+    "python": [collection_error_seen, install_failed],
+    "javascript": [js_syntax_error_seen, install_failed],
+    "java_gradle": [java_compile_error_seen],
+    "java_maven": [java_compile_error_seen],
+}
+
+
+def predicates_for(stack_info: Dict) -> List[StopPredicate]:
+    """Default early-stop predicates for a detected stack."""
+    return list(_STACK_PREDICATES.get(stack_info.get("language", ""), []))
+
+
+class OutputMonitor:
+    def __init__(
+        self,
+        on_output: Callable[[str], None] = None,
+        predicates: List[StopPredicate] = None,
+        grace_lines: int = EARLY_STOP_GRACE_LINES,
+        capture: bool = True,
+    ):
+        self.on_output = on_output
+        self.capture = capture
+        self.predicates = predicates or []
+        self.grace_lines = grace_lines
+        self.reason: Optional[str] = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._chunks: List[str] = []
+        self._partial = ""
+        self._remaining: Optional[int] = None
+
+    def feed(self, data) -> bool:
+        """Consumes a chunk of output. Returns True once the run should be stopped."""
+        text = self._decoder.decode(data) if isinstance(data, bytes) else data
+        return self._consume(text)
+
+    def finish(self) -> str:
+        """Flushes buffered output and returns everything captured (empty when capture=False)."""
+        self._consume(self._decoder.decode(b"", final=True))
+        if self._partial:
+            self._check_line(self._partial)
+            self._partial = ""
+        return "".join(self._chunks)
+
+    @property
+    def should_stop(self) -> bool:
+        return self._remaining is not None and self._remaining <= 0
+
+    def _consume(self, text: str) -> bool:
+        if not text:
+            return self.should_stop
+        if self.capture:
+            self._chunks.append(text)
+        if self.on_output:
+            try:
+                self.on_output(text)
+            except Exception:
+                pass
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._check_line(line)
+        return self.should_stop
+
+    def _check_line(self, line: str):
+        if self._remaining is not None:
+            self._remaining -= 1
+            return
+        for predicate in self.predicates:
+            reason = predicate(line)
+            if reason:
+                self.reason = reason
+                self._remaining = self.grace_lines
+                return
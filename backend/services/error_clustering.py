@@ -0,0 +1,81 @@
+"""
+Error Clustering — collapse duplicate failures into root causes before fixing.
+When one broken helper makes 40 tests fail, the parser reports 40 errors
+that all point at the same source function. `cluster_errors` groups errors
+by a normalized signature:
+
+  (resolved source file, bug type, message template, innermost frame)
+
+The message template has numbers, quoted literals, hex addresses and paths
+masked. The innermost frame is the source function named by the assertion
+hint when there is one, and otherwise the error's line in the resolved
+file. The controller fixes one representative per cluster, so LLM calls and
+commits scale with root causes instead of symptoms.
+"""
+
+import os
+import re
+from typing import Callable, Dict, List, Tuple
+
+_MASKS = [
+    (re.compile(r"0x[0-9a-fA-F]+"), "<addr>"),
+    (re.compile(r"'[^'\n]*'|\"[^\"\n]*\""), "<str>"),
+    (re.compile(r"(?:[\w.-]*/)+[\w.-]+"), "<path>"),
+    (re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])"), "<num>"),
+    (re.compile(r"\s+"), " "),
+]
+SOURCE_FUNCTION = re.compile(r"source function: (\w+)")
+
+
+def message_template(message: str) -> str:
+    template = SOURCE_FUNCTION.sub("", message or "")
+    for pattern, replacement in _MASKS:
+        template = pattern.sub(replacement, template)
+    return template.strip()
+
+
+def _same_file(error_file: str, target_file: str) -> bool:
+    """True when the raw error path (e.g. /app/src/m.py or a local absolute path) names the target."""
+    if not error_file or not target_file:
+        return False
+    error_file = os.path.normpath(error_file)
+    target_file = os.path.normpath(target_file)
+    return error_file == target_file or error_file.endswith(os.sep + target_file)
+
+
+def signature(error: Dict, target_file: str) -> Tuple[str, str, str, str]:
+    source_func = SOURCE_FUNCTION.search(error.get("message", ""))
+    if source_func:
+        frame = f"def {source_func.group(1)}"
+    elif _same_file(error.get("file", ""), target_file):
+        frame = f"line {error.get('line', 0)}"
+    else:
+        frame = ""   # resolved away from a test file; the target itself is the frame
+    return (target_file, str(error.get("type", "")).upper(), message_template(error.get("message", "")), frame)
+
+
+class ErrorCluster:
+    def __init__(self, representative: Dict, target_file: str):
+        self.representative = representative
+        self.target_file = target_file
+        self.members: List[Dict] = [representative]
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+
+def cluster_errors(errors: List[Dict], resolve_target: Callable[[Dict], str]) -> List[ErrorCluster]:
+    """
+    Groups errors by signature, keeping first-seen order. `resolve_target(error)`
+    maps an error to the repository file a fix should touch.
+    """
+    clusters: Dict[Tuple[str, str, str, str], ErrorCluster] = {}
+    for error in errors:
+        target = resolve_target(error)
+        key = signature(error, target)
+        if key in clusters:
+            clusters[key].members.append(error)
+        else:
+            clusters[key] = ErrorCluster(error, target)
+    return list(clusters.values())
@@ -0,0 +1,241 @@
+"""
+Fix Cache — content-addressed memoization of AI fixes across jobs.
+Forks and templates share the same bugs, so the same broken code keeps
+producing the same error. `FixAgent` looks up each error here before calling
+the AI. An AI patch is only stored once the next test run no longer reports
+the errors it fixed and shows no new error in its file (`PendingFixes`); a
+replayed patch that fails either check is invalidated.
+
+The key hashes the normalized error (bug type plus the message template from
+services/error_clustering) and the lines around the error, i.e. REGION_LINES
+either side of it, or the whole file when the line is unknown. The file path
+and line number are left out, so a renamed or shifted copy of the code still
+hits. The value is the patch as SEARCH/REPLACE text. It is applied with
+exact matching only, so a hit on code that has drifted is simply a miss.
+
+Entries live in a WAL-mode SQLite database under DATA_DIR. Entries older
+than FIX_CACHE_TTL_SECONDS expire. Beyond FIX_CACHE_MAX_ENTRIES, the least
+recently used entries are evicted. Hit/miss counters are per process and
+are exposed on `/metrics`.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from config import settings
+from services.error_clustering import message_template
+
+logger = logging.getLogger(__name__)
+
+KEY_VERSION = "v1"
+REGION_LINES = 5
+
+
+def error_fingerprint(error: Dict, content: str) -> str:
+    """Normalized error plus a hash of the code around it."""
+    lines = content.splitlines()
+    line = error.get("line", 0) or 0
+    if 0 < line <= len(lines):
+        region = lines[max(0, line - 1 - REGION_LINES):line + REGION_LINES]
+    else:
+        region = lines
+    region_hash = hashlib.sha256("\n".join(l.rstrip() for l in region).encode("utf-8")).hexdigest()
+    return f"{str(error.get('type', 'LOGIC')).upper()}|{message_template(error.get('message', ''))}|{region_hash}"
+
+
+def fix_key(errors: List[Dict], content: str) -> str:
+    """Cache key for fixing `errors` (one or a batch) in a file with this content."""
+    # Order-independent, so a batch hits whatever order the errors were reported in
+    parts = sorted(error_fingerprint(e, content) for e in errors)
+    return hashlib.sha256((KEY_VERSION + "\n" + "\n".join(parts)).encode("utf-8")).hexdigest()
+
+
+class FixCache:
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS fixes (
+            key          TEXT PRIMARY KEY,
+            patch        TEXT NOT NULL,
+            descriptions TEXT NOT NULL,
+            created_at   REAL NOT NULL,
+            last_used    REAL NOT NULL,
+            hits         INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_fixes_last_used  ON fixes(last_used);
+        CREATE INDEX IF NOT EXISTS idx_fixes_created_at ON fixes(created_at);
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "hits": 0, "misses": 0, "stale": 0, "stores": 0, "unconfirmed": 0, "invalidated": 0, "evictions": 0,
+        }
+        with self._conn() as conn:
+            conn.executescript(self.SCHEMA)
+        logger.info(f"FixCache: Using SQLite database at {path}")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Returns {patch, descriptions by fingerprint} for a live entry, or None. Bumps its LRU timestamp."""
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT patch, descriptions, created_at FROM fixes WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl_seconds > 0 and row[2] < now - self.ttl_seconds):
+            self._count("misses")
+            return None
+        with conn:
+            conn.execute("UPDATE fixes SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        self._count("hits")
+        return {"patch": row[0], "descriptions": json.loads(row[1])}
+
+    def put(self, key: str, patch: str, descriptions: Dict[str, str]):
+        """`descriptions` maps error fingerprints to fix descriptions."""
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO fixes (key, patch, descriptions, created_at, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                (key, patch, json.dumps(descriptions), now, now),
+            )
+        self._count("stores")
+        self.evict()
+
+    def record_stale(self):
+        """A hit whose patch no longer applied cleanly; the caller fell back to the AI."""
+        self._count("stale")
+
+    def record_unconfirmed(self):
+        """An AI patch that the next test run didn't confirm (error still there, or a new one in its file); not stored."""
+        self._count("unconfirmed")
+
+    def invalidate(self, key: str):
+        """Drops an entry whose replayed patch the next test run didn't confirm."""
+        conn = self._conn()
+        with conn:
+            removed = conn.execute("DELETE FROM fixes WHERE key = ?", (key,)).rowcount
+        if removed:
+            self._count("invalidated")
+
+    def evict(self) -> int:
+        """Drops expired entries, then the least recently used beyond max_entries."""
+        conn = self._conn()
+        with conn:
+            removed = 0
+            if self.ttl_seconds > 0:
+                removed += conn.execute(
+                    "DELETE FROM fixes WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                ).rowcount
+            if self.max_entries > 0:
+                removed += conn.execute(
+                    "DELETE FROM fixes WHERE key IN "
+                    "(SELECT key FROM fixes ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+        if removed:
+            self._count("evictions", removed)
+        return removed
+
+    def stats(self) -> Dict:
+        entries = self._conn().execute("SELECT COUNT(*) FROM fixes").fetchone()[0]
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["entries"] = entries
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+
+def error_signature(error: Dict) -> str:
+    """Identifies an error across test runs: line numbers and paths move when code is patched."""
+    return f"{str(error.get('type', 'LOGIC')).upper()}|{message_template(error.get('message', ''))}"
+
+
+class PendingFixes:
+    """
+    Cache writes held back until a test run shows their outcome. The
+    controller `add`s each fixed error with its target file and the outcome's
+    `cache_store` / `cache_hit`, then calls `resolve` with the errors of the
+    next run. A patch is confirmed only when its errors are gone and its file
+    shows no error that the run before the fix did not already have.
+    """
+
+    def __init__(self, cache: Optional[FixCache]):
+        self.cache = cache
+        self._stores: Dict[str, Tuple[Tuple, str, Set[str]]] = {}   # cache key -> (entry, file, signatures)
+        self._hits: Dict[str, Tuple[str, Set[str]]] = {}             # cache key -> (file, signatures)
+        self._baseline: Dict[str, Set[str]] = {}                     # file -> signatures of the last run
+
+    def add(self, error: Dict, target_file: str, store: Optional[Tuple] = None, hit: Optional[str] = None):
+        if self.cache is None:
+            return
+        signature = error_signature(error)
+        if store:
+            self._stores.setdefault(store[0], (store, target_file, set()))[2].add(signature)
+        if hit:
+            self._hits.setdefault(hit, (target_file, set()))[1].add(signature)
+
+    def resolve(self, errors: List[Dict], resolve_target: Callable[[Dict], str]):
+        """
+        Stores patches the run confirms and invalidates replayed ones it
+        refutes. `resolve_target(error)` maps an error to its repository file,
+        as it did when the fix was made.
+        """
+        if self.cache is None:
+            return
+        current: Dict[str, Set[str]] = {}
+        for error in errors:
+            current.setdefault(resolve_target(error), set()).add(error_signature(error))
+
+        def refuted(target_file: str, signatures: Set[str]) -> bool:
+            seen = current.get(target_file, set())
+            return bool(signatures & seen or seen - self._baseline.get(target_file, set()))
+
+        for entry, target_file, signatures in self._stores.values():
+            if refuted(target_file, signatures):
+                self.cache.record_unconfirmed()
+            else:
+                self.cache.put(*entry)
+        for key, (target_file, signatures) in self._hits.items():
+            if refuted(target_file, signatures):
+                self.cache.invalidate(key)
+        self._stores.clear()
+        self._hits.clear()
+        self._baseline = current
+
+
+_cache: Optional[FixCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_fix_cache() -> Optional[FixCache]:
+    """The process-wide cache, or None when FIX_CACHE is disabled."""
+    global _cache
+    if not settings.FIX_CACHE:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = FixCache(settings.FIX_CACHE_PATH, settings.FIX_CACHE_MAX_ENTRIES, settings.FIX_CACHE_TTL_SECONDS)
+        return _cache
@@ -1,21 +1,28 @@
 """
 Git Service — clone, branch, commit, push, cleanup.
 Injects GITHUB_TOKEN into the clone URL so pushes authenticate automatically.
+Clones go through a local bare-mirror cache (see services/mirror_cache.py).
 """
 
 import os
 import git
-import shutil
 import logging
 import tempfile
-import stat
-import time
 
 from config import settings
+from services.mirror_cache import MirrorCache
+from services.workspace_pool import Reaper, WorkspacePool
 from utils.branch_naming import format_branch_name
 
 logger = logging.getLogger(__name__)
 
+WORKSPACE_ROOT = os.path.join(tempfile.gettempdir(), "fixtora_hackathon")
+
+# Shared by every GitService instance in this process
+_mirror_cache: MirrorCache | None = None
+_workspace_pool: WorkspacePool | None = None
+_reaper: Reaper | None = None
+
 
 class GitService:
     def _auth_url(self, repo_url: str, user_token: str = None) -> str:
@@ -38,8 +45,7 @@ class GitService:
         return repo_url
 
     def clone(self, repo_url: str, job_id: str, token: str = None) -> str:
-        base_dir = tempfile.gettempdir()
-        target_path = os.path.join(base_dir, "fixtora_hackathon", job_id)
+        target_path = os.path.join(WORKSPACE_ROOT, job_id)
 
         if os.path.exists(target_path):
             self.cleanup(target_path)
@@ -47,9 +53,58 @@ class GitService:
         auth_url = self._auth_url(repo_url, user_token=token)
         # Log original URL (never the token)
         logger.info(f"Git: Cloning {repo_url}")
-        git.Repo.clone_from(auth_url, target_path)
+
+        if settings.GIT_MIRROR_CACHE:
+            try:
+                mirrors = self._mirror_cache()
+                mirror_path = mirrors.sync(repo_url, auth_url)
+                with mirrors.reading(mirror_path):
+                    if settings.WORKSPACE_POOL:
+                        pooled = self._workspace_pool().acquire(mirror_path, auth_url)
+                        if pooled:
+                            return pooled
+                    # Local clone hardlinks objects from the mirror — near-instant
+                    repo = git.Repo.clone_from(mirror_path, target_path)
+                    repo.remote("origin").set_url(auth_url)
+                    repo.close()
+                return target_path
+            except Exception as e:
+                logger.warning(f"Git: Mirror cache unavailable ({type(e).__name__}), cloning directly")
+                if os.path.exists(target_path):
+                    self.cleanup(target_path)
+
+        options = {}
+        if settings.GIT_CLONE_DEPTH > 0:
+            options["depth"] = settings.GIT_CLONE_DEPTH
+        if settings.GIT_CLONE_FILTER:
+            options["filter"] = settings.GIT_CLONE_FILTER
+        git.Repo.clone_from(auth_url, target_path, **options)
         return target_path
 
+    def _mirror_cache(self) -> MirrorCache:
+        global _mirror_cache
+        if _mirror_cache is None:
+            _mirror_cache = MirrorCache(settings.GIT_MIRROR_DIR, settings.GIT_MIRROR_MAX_BYTES)
+        return _mirror_cache
+
+    def _reaper(self) -> Reaper:
+        global _reaper
+        if _reaper is None:
+            _reaper = Reaper(os.path.join(WORKSPACE_ROOT, ".trash"))
+        return _reaper
+
+    def _workspace_pool(self) -> WorkspacePool:
+        global _workspace_pool
+        if _workspace_pool is None:
+            _workspace_pool = WorkspacePool(
+                os.path.join(WORKSPACE_ROOT, "pool"),
+                self._reaper(),
+                per_repo=settings.WORKSPACE_POOL_PER_REPO,
+                max_total=settings.WORKSPACE_POOL_MAX,
+                keep_dirs=settings.WORKSPACE_KEEP_DIRS,
+            )
+        return _workspace_pool
+
     def setup_branch(self, repo_path: str, team: str, leader: str) -> str:
         branch_name = format_branch_name(team, leader)
         repo = git.Repo(repo_path)
@@ -91,32 +146,15 @@ class GitService:
             raise
 
     def cleanup(self, path: str):
+        """Returns a pooled workspace to the pool; anything else goes to the background reaper."""
+        if _workspace_pool is not None and _workspace_pool.owns(path):
+            logger.info(f"Git: Releasing pooled workspace {path}")
+            _workspace_pool.release(path)
+            return
         if not os.path.exists(path):
             return
         logger.info(f"Git: Cleaning up {path}")
-        
-        # Close any git handles to prevent locking on Windows
-        try:
-            repo = git.Repo(path)
-            repo.close()
-        except:
-            pass
-
-        def on_rm_error(func, fpath, exc_info):
-            try:
-                os.chmod(fpath, stat.S_IWRITE)
-                func(fpath)
-            except:
-                pass
-
-        # Robust retry for Windows file locks
-        for i in range(3):
-            try:
-                shutil.rmtree(path, onerror=on_rm_error)
-                if not os.path.exists(path):
-                    return
-            except:
-                time.sleep(0.5)
+        self._reaper().reap(path)
 
     def get_owner_email(self, repo_path: str) -> str | None:
         """Attempts to get the email of the last commit author."""
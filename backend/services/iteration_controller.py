@@ -3,29 +3,124 @@ import time
 import os
 import json
 import re as _re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
+from config import settings
 from agents.repo_agent import RepoAgent
 from agents.error_agent import ErrorAgent
 from agents.fix_agent import FixAgent
 from agents.verify_agent import VerifyAgent
 from services.docker_executor import DockerExecutor
+from services.dependency_cache import DependencyCache
+from services.early_stop import predicates_for
+from services.test_selection import failing_tests, rerun_command
+from services.test_sharding import TestSharder
+from services.error_clustering import cluster_errors
+from services.fix_cache import PendingFixes, get_fix_cache
+from services.symbol_index import SymbolIndex
+from services.test_reports import collect as collect_reports, prepare as prepare_reports, with_report_flags
+from services.mirror_cache import normalize_repo_url
 from services.git_service import GitService
 from services.scoring import calculate_repair_score
 from services.formatter import format_ps3_output  # noqa: F401
 from services.email_service import send_failure_email
+from services.job_store import JobStore
+from services.log_buffer import open_job_log, release_job_log
+from services.job_events import event_bus, status_payload
 
 logger = logging.getLogger(__name__)
 
 class IterationController:
-    def __init__(self, job_id: str):
+    def __init__(self, job_id: str, job_store: JobStore = None):
         self.job_id = job_id
+        self.job_store = job_store
+        self.job_log = open_job_log(job_id)
         self.repo_agent = RepoAgent()
         self.error_agent = ErrorAgent()
         self.fix_agent = FixAgent()
         self.verify_agent = VerifyAgent()
         self.docker_executor = DockerExecutor()
+        self.dependency_cache = DependencyCache()
+        self.test_sharder = TestSharder()
         self.git_service = GitService()
 
+    def _checkpoint(self, job_ref: Dict):
+        """Publishes the current job state to the job store and event stream."""
+        if self.job_store:
+            try:
+                self.job_store.save(job_ref)
+            except Exception as e:
+                logger.warning(f"Job store checkpoint failed: {e}")
+        event_bus.publish(self.job_id, "status", status_payload(job_ref))
+
+    def _log(self, text: str):
+        offset = self.job_log.append(text)
+        next_offset = offset + len(text.encode("utf-8", errors="replace"))
+        event_bus.publish(self.job_id, "log", {"offset": offset, "next_offset": next_offset, "text": text})
+
+    def _add_timeline(self, job_ref: Dict, entry: Dict):
+        job_ref["timeline"].append(entry)
+        event_bus.publish(self.job_id, "timeline", {"index": len(job_ref["timeline"]) - 1, "entry": entry})
+
+    def _add_fix(self, job_ref: Dict, fix: Dict):
+        job_ref["fixes"].append(fix)
+        event_bus.publish(self.job_id, "fix", {"index": len(job_ref["fixes"]) - 1, "fix": fix})
+
+    def _execute(self, stack_info: Dict, repo_path: str, test_command: str = None, on_output=None) -> Dict:
+        """Runs the suite (or `test_command` in its place) through the dependency plan."""
+        image = stack_info.get("docker_image", "python:3.9-slim")
+        run_info = {**stack_info, "test_command": with_report_flags(stack_info, test_command or stack_info.get("test_command", ""))}
+        plan = self.dependency_cache.plan(run_info, repo_path)
+        return self.docker_executor.execute(
+            image, plan["command"],
+            volumes={repo_path: {'bind': '/app', 'mode': 'rw'}, **plan["docker_volumes"]},
+            working_dir='/app',
+            environment=plan["docker_env"],
+            local_environment=plan["local_env"],
+            on_output=on_output,
+            stop_predicates=predicates_for(stack_info),
+            pool_scope=self.job_id,
+        )
+
+    def _run_tests(self, stack_info: Dict, repo_path: str, repo_url: str, test_command: str = None) -> Dict:
+        """Runs tests (sharded for full-suite runs when enabled) and records the failing test IDs."""
+        prepare_reports(repo_path)
+        started = time.time()
+        test_result = None
+        if not test_command:
+            test_result = self.test_sharder.run(
+                stack_info, repo_path,
+                lambda cmd, on_output: self._execute(stack_info, repo_path, cmd, on_output),
+                timings_key=normalize_repo_url(repo_url),
+                on_output=self._log,
+            )
+        if test_result is None:
+            test_result = self._execute(stack_info, repo_path, test_command, on_output=self._log)
+        self._log("\n")
+        if test_result.get("aborted_reason"):
+            self._log(f"Early stop: {test_result['aborted_reason']}\n")
+        test_result["failed_tests"] = failing_tests(test_result["logs"], stack_info, repo_path, since=started)
+        test_result["report_errors"] = collect_reports(stack_info, repo_path, since=started)
+        return test_result
+
+    def _resolve_target(self, err: Dict, repo_path: str, symbol_index: SymbolIndex = None) -> str:
+        """Maps an error to the repository file a fix should touch."""
+        target_file = err["file"]
+
+        # Clean absolute paths from docker (/app/) or local executors (/tmp/...)
+        if target_file.startswith("/app/"):
+            target_file = target_file.replace("/app/", "", 1)
+        elif os.path.isabs(target_file) and target_file.startswith(repo_path):
+            target_file = os.path.relpath(target_file, repo_path)
+
+        sf_match = _re.search(r'source function: (\w+)', err.get("message", ""))
+        source_func = sf_match.group(1) if sf_match else ""
+        if not source_func or not ("test_" in target_file or "_test." in target_file) or symbol_index is None:
+            return target_file
+
+        symbol = symbol_index.definition(source_func)
+        return symbol.file if symbol is not None else target_file
+
     def run_loop(self, repo_url: str, team: str, leader: str, retry_limit: int, job_ref: Dict, api_key: str = None, github_token: str = None):
         start_time = time.time()
         repo_path = None
@@ -42,7 +137,7 @@ class IterationController:
             "AI_VERIFY_KEY": bool(os.getenv("AI_VERIFY_KEY")),
         }
         logger.info(f"ENV CHECK: {env_diag}")
-        job_ref["raw_logs"] += f"ENV CHECK: {env_diag}\n"
+        self._log(f"ENV CHECK: {env_diag}\n")
         
         try:
             # 1. Clone & Branch
@@ -53,46 +148,58 @@ class IterationController:
             # Fetch email as early as possible
             owner_email = self.git_service.get_owner_email(repo_path)
             if owner_email:
-                job_ref["raw_logs"] += f"Detected repository owner: {owner_email}\n"
+                self._log(f"Detected repository owner: {owner_email}\n")
             
             # 2. Analyze (AI Layer 1)
             stack_info = self.repo_agent.analyze(repo_path, api_key=api_key)
             if stack_info.get("ai_used"):
                 ai_success_count += 1
-            job_ref["raw_logs"] += f"Analyzed stack: {stack_info['language']} (AI used: {stack_info.get('ai_used', False)})\n"
+            self._log(f"Analyzed stack: {stack_info['language']} (AI used: {stack_info.get('ai_used', False)})\n")
+            self._checkpoint(job_ref)
             
             # 3. Iterative Loop
+            symbol_index = SymbolIndex(repo_path)   # built on first lookup, updated as fixes land
+            pending_fixes = PendingFixes(get_fix_cache())   # cached once the next run confirms them
             iteration = 1
             annotated_set = set()  # Track file:line combos to avoid duplicate annotations
+            focus_tests: List[str] = []  # Failing test IDs from the previous run
             while True:
                 logger.info(f"Loop: Iteration {iteration}/{retry_limit}")
                 job_ref["iterations_used"] = iteration
-                job_ref["timeline"].append({
+                self._add_timeline(job_ref, {
                     "iteration": iteration,
                     "status": "RUNNING",
                     "timestamp": time.strftime("%H:%M:%S")
                 })
+                self._checkpoint(job_ref)
 
-                # Use stack-detected image & command
-                image = stack_info.get("docker_image", "python:3.9-slim")
-                cmd = stack_info.get("test_command", "pytest")
-                
-                # Execute Tests
-                test_result = self.docker_executor.execute(
-                    image, cmd,
-                    volumes={repo_path: {'bind': '/app', 'mode': 'rw'}},
-                    working_dir='/app'
-                )
-                job_ref["raw_logs"] += f"Iteration {iteration} Logs:\n{test_result['logs']}\n"
+                # Rerun only the tests that failed last time; the full suite
+                # runs again once they pass, as a regression check.
+                subset_cmd = rerun_command(stack_info, focus_tests)
+                if subset_cmd:
+                    self._log(f"Iteration {iteration} Logs (rerunning {len(focus_tests)} failed tests):\n")
+                    test_result = self._run_tests(stack_info, repo_path, repo_url, test_command=subset_cmd)
+                    if test_result["success"] and not test_result.get("infra_error"):
+                        self._log("Previously failing tests pass; running full suite as a regression check.\n")
+                        subset_cmd = None
+                if not subset_cmd:
+                    self._log(f"Iteration {iteration} Logs:\n")
+                    test_result = self._run_tests(stack_info, repo_path, repo_url)
+                focus_tests = test_result["failed_tests"]
 
                 if test_result.get("infra_error"):
+                    self._log(f"{test_result['logs']}\n")
                     job_ref["status"] = "ERROR"
                     break
 
-                # Parse Errors (AI Layer 2)
-                errors, ai_parsed = self.error_agent.parse_logs(test_result["logs"], api_key=api_key)
+                # Parse Errors (structured reports, then AI Layer 2, then regex)
+                errors, ai_parsed = self.error_agent.parse_logs(
+                    test_result["logs"], api_key=api_key, report_errors=test_result.get("report_errors")
+                )
                 if ai_parsed:
                     ai_success_count += 1
+                if test_result["success"] or errors:
+                    pending_fixes.resolve(errors, lambda e: self._resolve_target(e, repo_path, symbol_index))
 
                 if not test_result["success"] and not errors:
                     errors = [{
@@ -103,6 +210,7 @@ class IterationController:
                     }]
 
                 job_ref["failures_detected"] += len(errors)
+                self._checkpoint(job_ref)
                 
                 if test_result["success"] and not errors:
                     job_ref["status"] = "PASSED"
@@ -111,39 +219,19 @@ class IterationController:
                 raw_logs_this_iter = test_result["logs"]
                 fixes_this_iteration = 0
 
-                for err in errors:
-                    target_file = err["file"]
-                    
-                    # Clean absolute paths from docker (/app/) or local executors (/tmp/...)
-                    if target_file.startswith("/app/"):
-                        target_file = target_file.replace("/app/", "", 1)
-                    elif os.path.isabs(target_file) and target_file.startswith(repo_path):
-                        target_file = os.path.relpath(target_file, repo_path)
-                    
-                    source_func = ""
-
-                    sf_match = _re.search(r'source function: (\w+)', err.get("message", ""))
-                    if sf_match:
-                        source_func = sf_match.group(1)
-
-                    if source_func and ("test_" in target_file or "_test." in target_file):
-                        for root_dir, _, dir_files in os.walk(repo_path):
-                            for df in dir_files:
-                                if df.endswith(".py") and not df.startswith("test_") and "_test." not in df:
-                                    candidate = os.path.join(root_dir, df)
-                                    try:
-                                        with open(candidate, "r", encoding="utf-8", errors="replace") as cf:
-                                            if f"def {source_func}" in cf.read():
-                                                target_file = os.path.relpath(candidate, repo_path)
-                                                break
-                                    except Exception:
-                                        pass
+                # Fix one representative per root cause, not every symptom
+                clusters = cluster_errors(errors, lambda e: self._resolve_target(e, repo_path, symbol_index))
+                if len(clusters) < len(errors):
+                    self._log(f"Clustered {len(errors)} errors into {len(clusters)} root causes\n")
+
+                # One prompt, one write and one commit per file
+                by_file: Dict[str, List] = {}
+                for cluster in clusters:
+                    by_file.setdefault(cluster.target_file, []).append(cluster)
 
+                prepared = []
+                for target_file, file_clusters in by_file.items():
                     file_path = os.path.join(repo_path, target_file)
-                    patch_applied = False
-                    
-                    # Dedup Logic: prevent repeating the same annotation without progress
-                    dedup_key = f"{target_file}:{err['line']}"
 
                     original_content = ""
                     if os.path.exists(file_path):
@@ -151,44 +239,75 @@ class IterationController:
                             original_content = f.read()
                         original_content = _re.sub(r'\n+#={10,}.*?\[AI-AGENT FIX REQUIRED.*?\n#+={10,}\n?', '', original_content, flags=_re.DOTALL)
 
-                    resolved_err = {**err, "file": target_file}
-                    new_content, commit_msg, ai_fixed = self.fix_agent.apply_fix(
-                        error=resolved_err,
-                        file_content=original_content,
-                        test_logs=raw_logs_this_iter,
-                        api_key=api_key
+                    resolved_errs = []
+                    for cluster in file_clusters:
+                        err = cluster.representative
+                        resolved_err = {**err, "file": target_file}
+                        if cluster.size > 1:
+                            resolved_err["message"] = f"{err['message']} [{cluster.size - 1} more failures share this cause]"
+                        resolved_errs.append(resolved_err)
+                    representatives = [cluster.representative for cluster in file_clusters]
+                    prepared.append((target_file, file_path, original_content, resolved_errs, representatives))
+
+                # Generate fixes for independent files concurrently (AI calls are
+                # limited per key in ai_client); apply and commit in a fixed order.
+                fix_pool = ThreadPoolExecutor(
+                    max_workers=max(1, min(settings.FIX_CONCURRENCY, len(prepared))), thread_name_prefix="fixora-fix"
+                )
+                futures = [
+                    fix_pool.submit(
+                        self.fix_agent.apply_fixes, target_file, resolved_errs,
+                        file_content=original_content, test_logs=raw_logs_this_iter, api_key=api_key,
+                        symbol_index=symbol_index,
                     )
-                    if ai_fixed:
-                        ai_success_count += 1
+                    for target_file, _, original_content, resolved_errs, _ in prepared
+                ]
+                fix_pool.shutdown(wait=False)
+
+                for (target_file, file_path, original_content, _, representatives), future in zip(prepared, futures):
+                    patch_applied = False
+                    new_content, outcomes = future.result()
+                    ai_fixed_any = any(o["ai_fixed"] for o in outcomes)
+                    ai_success_count += sum(1 for o in outcomes if o["ai_fixed"])
 
                     if os.path.exists(file_path):
-                        safe_to_write = (not ai_fixed) or self.fix_agent.check_diff_limit(original_content, new_content)
+                        safe_to_write = (not ai_fixed_any) or self.fix_agent.check_diff_limit(original_content, new_content)
 
                         if safe_to_write:
                             with open(file_path, "w", encoding="utf-8", errors="replace") as f:
                                 f.write(new_content)
                             patch_applied = True
-                            
+
                             # Log and track progress
-                            if ai_fixed:
-                                fixes_this_iteration += 1 # Real progress
-                            elif dedup_key not in annotated_set:
-                                fixes_this_iteration += 1 # New annotation is progress
-                                annotated_set.add(dedup_key)
-                            
+                            for o in outcomes:
+                                # Dedup Logic: prevent repeating the same annotation without progress
+                                dedup_key = f"{target_file}:{o['error']['line']}"
+                                if o["ai_fixed"]:
+                                    fixes_this_iteration += 1 # Real progress
+                                elif dedup_key not in annotated_set:
+                                    fixes_this_iteration += 1 # New annotation is progress
+                                    annotated_set.add(dedup_key)
+
                         else:
-                            job_ref["raw_logs"] += f"Safety: Rejected oversized AI rewrite for {target_file}\n"
-
-                    self.git_service.commit_fix(repo_path, commit_msg)
-                    job_ref["fixes"].append({
-                        "file": target_file,
-                        "bug_type": err["type"],
-                        "line_number": err["line"],
-                        "commit_message": f"[AI-AGENT] {commit_msg}",
-                        "status": "AI_FIXED" if (patch_applied and ai_fixed) else ("ANNOTATED" if patch_applied else "SKIPPED"),
-                    })
+                            self._log(f"Safety: Rejected oversized AI rewrite for {target_file}\n")
+
+                    self.git_service.commit_fix(repo_path, self.fix_agent.batch_commit_message(target_file, outcomes))
+                    for o in outcomes:
+                        self._add_fix(job_ref, {
+                            "file": target_file,
+                            "bug_type": o["error"]["type"],
+                            "line_number": o["error"]["line"],
+                            "commit_message": f"[AI-AGENT] {o['commit_msg']}",
+                            "status": "AI_FIXED" if (patch_applied and o["ai_fixed"]) else ("ANNOTATED" if patch_applied else "SKIPPED"),
+                        })
+                        if patch_applied:
+                            job_ref["fixes_applied"] += 1
                     if patch_applied:
-                        job_ref["fixes_applied"] += 1
+                        for o, representative in zip(outcomes, representatives):
+                            pending_fixes.add(representative, target_file, store=o["cache_store"], hit=o["cache_hit"])
+                    self._checkpoint(job_ref)
+
+                symbol_index.update(target for target, *_ in prepared)
 
                 if fixes_this_iteration == 0:
                     logger.info("No NEW fixes or unique annotations applied. Breaking loop to prevent infinite cycle.")
@@ -219,10 +338,10 @@ class IterationController:
             )
             try:
                 self.git_service.push(repo_path, branch_name)
-                job_ref["raw_logs"] += f"\nGit: Successfully pushed branch '{branch_name}' to GitHub!\n"
+                self._log(f"\nGit: Successfully pushed branch '{branch_name}' to GitHub!\n")
             except Exception as push_err:
                 logger.error(f"Git push failed: {push_err}")
-                job_ref["raw_logs"] += f"\nGit Push Error: {str(push_err)}\n"
+                self._log(f"\nGit Push Error: {str(push_err)}\n")
                 # Don't crash the whole job — the fixes are still valid
                 if job_ref["status"] not in ("PASSED",):
                     job_ref["status"] = "FINISHED_NO_PUSH"
@@ -274,7 +393,7 @@ class IterationController:
         except Exception as e:
             logger.error(f"Loop failed: {e}")
             job_ref["status"] = "ERROR"
-            job_ref["raw_logs"] += f"\nCritical Error: {str(e)}"
+            self._log(f"\nCritical Error: {str(e)}")
             
             # Reliable Notification Logic
             # 1. Use owner_email if fetched
@@ -290,5 +409,8 @@ class IterationController:
                 )
         finally:
             job_ref["total_time_seconds"] = round(time.time() - start_time, 2)
+            self._checkpoint(job_ref)
+            release_job_log(self.job_id)
+            self.docker_executor.release_scope(self.job_id)
             if repo_path:
                 self.git_service.cleanup(repo_path)
@@ -0,0 +1,184 @@
+"""
+Job Events — push channel for job progress (Server-Sent Events).
+The iteration controller publishes incremental events (status, timeline,
+fix, log) to the in-process `event_bus`; `stream_job_events` turns them into
+an SSE stream so dashboards receive deltas instead of polling the full
+`RunStatusResponse`.
+
+Events can be dropped (a full subscriber queue), so the stream also
+re-syncs from the job store and log file every few seconds.
+Every event carries an index or offset, so duplicates are skipped.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from typing import AsyncIterator, Dict, List, Tuple
+
+from services.job_store import TERMINAL_STATUSES, JobStore
+from services.log_buffer import get_job_log
+
+logger = logging.getLogger(__name__)
+
+STATUS_FIELDS = (
+    "job_id", "repo_url", "branch_name", "failures_detected", "fixes_applied",
+    "iterations_used", "retry_limit", "total_time_seconds", "status", "score",
+)
+SUBSCRIBER_QUEUE_SIZE = 1000
+RESYNC_INTERVAL = 2.0
+KEEPALIVE_INTERVAL = 15.0
+LOG_EVENT_LIMIT = 64 * 1024
+
+
+def status_payload(job: Dict) -> Dict:
+    return {k: job.get(k) for k in STATUS_FIELDS}
+
+
+class _Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event: Tuple[str, Dict]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer — the periodic re-sync will catch it up
+            pass
+
+
+class JobEventBus:
+    def __init__(self):
+        self._subs: Dict[str, List[_Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, job_id: str) -> _Subscription:
+        sub = _Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subs.setdefault(job_id, []).append(sub)
+        return sub
+
+    def unsubscribe(self, job_id: str, sub: _Subscription):
+        with self._lock:
+            subs = self._subs.get(job_id, [])
+            if sub in subs:
+                subs.remove(sub)
+            if not subs:
+                self._subs.pop(job_id, None)
+
+    def publish(self, job_id: str, event: str, data: Dict):
+        """Thread-safe: may be called from scheduler worker threads."""
+        with self._lock:
+            subs = list(self._subs.get(job_id, ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.deliver, (event, data))
+            except RuntimeError:
+                # Subscriber's event loop is closed
+                self.unsubscribe(job_id, sub)
+
+
+event_bus = JobEventBus()
+
+
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_job_events(job_id: str, job_store: JobStore, log_offset: int = 0) -> AsyncIterator[str]:
+    """
+    Yields SSE frames for a job: one `snapshot`, then `status`, `timeline`,
+    `fix` and `log` deltas, and finally `end` once the job is terminal.
+    """
+    sub = event_bus.subscribe(job_id)
+    try:
+        job = job_store.get(job_id)
+        if job is None:
+            return
+        log = get_job_log(job_id)
+        sent_timeline = len(job.get("timeline", []))
+        sent_fixes = len(job.get("fixes", []))
+        last_status = status_payload(job)
+        yield _sse("snapshot", {
+            **last_status,
+            "timeline": job.get("timeline", [])[:sent_timeline],
+            "fixes": job.get("fixes", [])[:sent_fixes],
+            "log_size": log.size,
+        })
+
+        async def drain_log():
+            nonlocal log_offset
+            while True:
+                text, next_offset = log.read(log_offset, LOG_EVENT_LIMIT)
+                if not text:
+                    return
+                yield _sse("log", {"offset": log_offset, "next_offset": next_offset, "text": text})
+                log_offset = next_offset
+
+        async for frame in drain_log():
+            yield frame
+
+        idle = 0.0
+        while True:
+            try:
+                event, data = await asyncio.wait_for(sub.queue.get(), timeout=RESYNC_INTERVAL)
+            except asyncio.TimeoutError:
+                event, data = None, None
+
+            if event == "log":
+                if data["offset"] == log_offset:
+                    yield _sse("log", data)
+                    log_offset = data["next_offset"]
+                elif data["offset"] > log_offset:
+                    async for frame in drain_log():
+                        yield frame
+                idle = 0.0
+                continue
+            if event == "timeline":
+                if data["index"] == sent_timeline:
+                    yield _sse("timeline", data)
+                    sent_timeline += 1
+                idle = 0.0
+                continue
+            if event == "fix":
+                if data["index"] == sent_fixes:
+                    yield _sse("fix", data)
+                    sent_fixes += 1
+                idle = 0.0
+                continue
+            if event == "status" and data != last_status:
+                last_status = data
+                yield _sse("status", data)
+                idle = 0.0
+                if data.get("status") not in TERMINAL_STATUSES:
+                    continue
+
+            # Periodic re-sync from the store (dropped events, terminal state)
+            job = job_store.get(job_id)
+            if job is None:
+                return
+            for entry in job.get("timeline", [])[sent_timeline:]:
+                yield _sse("timeline", {"index": sent_timeline, "entry": entry})
+                sent_timeline += 1
+            for fix in job.get("fixes", [])[sent_fixes:]:
+                yield _sse("fix", {"index": sent_fixes, "fix": fix})
+                sent_fixes += 1
+            async for frame in drain_log():
+                yield frame
+            current = status_payload(job)
+            if current != last_status:
+                last_status = current
+                yield _sse("status", current)
+
+            if current.get("status") in TERMINAL_STATUSES:
+                yield _sse("end", {"status": current["status"]})
+                return
+
+            if event is None:
+                idle += RESYNC_INTERVAL
+                if idle >= KEEPALIVE_INTERVAL:
+                    idle = 0.0
+                    yield ": keepalive\n\n"
+    finally:
+        event_bus.unsubscribe(job_id, sub)
@@ -0,0 +1,114 @@
+"""
+Job Scheduler — bounded worker pool for repair jobs.
+Replaces FastAPI BackgroundTasks so long-running, fully synchronous
+`IterationController.run_loop` calls never run on Starlette's shared threadpool.
+
+Jobs wait in a bounded priority queue (lower number = runs first, FIFO within
+a priority). When the queue is full, `submit` raises `QueueFullError` so the API
+can answer with backpressure (HTTP 429) instead of accepting unbounded work.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+from typing import Callable, Dict, List
+
+from services.job_events import event_bus, status_payload
+from services.job_store import JobStore
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler queue has no free slot."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        super().__init__(f"Job queue is full ({queue_size} waiting)")
+
+
+class JobScheduler:
+    def __init__(self, max_workers: int, max_queue: int, job_store: JobStore = None):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(1, max_queue)
+        self.job_store = job_store
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running: Dict[str, threading.Thread] = {}
+        self._workers: List[threading.Thread] = []
+        self._started = False
+
+    def start(self):
+        """Starts the worker threads (idempotent)."""
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"fixora-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        logger.info(f"Scheduler: Started {self.max_workers} worker(s), queue capacity {self.max_queue}")
+
+    def submit(self, job_id: str, job_ref: Dict, task: Callable[[], None], priority: int = 0) -> int:
+        """
+        Enqueues a job and returns its 1-based queue position.
+        Raises QueueFullError if the queue is at capacity.
+        """
+        self.start()
+        with self._cond:
+            if len(self._heap) >= self.max_queue:
+                raise QueueFullError(len(self._heap))
+            job_ref["status"] = "QUEUED"
+            if self.job_store:
+                self.job_store.create(job_ref)
+            heapq.heappush(self._heap, (priority, next(self._seq), job_id, job_ref, task))
+            self._cond.notify()
+            return self._position_locked(job_id)
+
+    def queue_position(self, job_id: str) -> int | None:
+        """1-based position of a queued job, or None if it is not waiting."""
+        with self._cond:
+            return self._position_locked(job_id)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "workers": self.max_workers,
+                "running": len(self._running),
+                "queued": len(self._heap),
+                "queue_capacity": self.max_queue,
+            }
+
+    def _position_locked(self, job_id: str) -> int | None:
+        for pos, entry in enumerate(sorted(self._heap), start=1):
+            if entry[2] == job_id:
+                return pos
+        return None
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, job_id, job_ref, task = heapq.heappop(self._heap)
+                self._running[job_id] = threading.current_thread()
+                job_ref["status"] = "RUNNING"
+
+            if self.job_store:
+                self.job_store.save(job_ref)
+            event_bus.publish(job_id, "status", status_payload(job_ref))
+            logger.info(f"Scheduler: Job {job_id} -> RUNNING")
+            try:
+                task()
+            except Exception as e:
+                # run_loop handles its own errors; this only guards the worker thread
+                logger.error(f"Scheduler: Job {job_id} crashed: {e}")
+                job_ref["status"] = "ERROR"
+            finally:
+                if self.job_store:
+                    self.job_store.release(job_id)
+                with self._cond:
+                    self._running.pop(job_id, None)
@@ -0,0 +1,226 @@
+"""
+Job Store — pluggable persistence for job state.
+`InMemoryJobStore` keeps the old process-local behaviour; `SQLiteJobStore`
+persists every job in an embedded WAL-mode database, so jobs survive a
+restart and memory stays flat. The API runs a single worker, since
+`JobScheduler` holds the queue in-process.
+
+Running jobs are still mutated in place by `IterationController` through a
+live dict; the controller calls `save()` at checkpoints to publish a snapshot.
+Each save bumps the job's `version`, which `/run-status` uses for ETags
+and long-polling. Finished jobs are evicted once they are older than the
+configured TTL. On startup, jobs that a previous process left QUEUED or
+RUNNING are marked ERROR.
+"""
+
+import abc
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config import settings
+from services.log_buffer import delete_job_log
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"PASSED", "FINISHED", "FINISHED_NO_PUSH", "FAILED", "ERROR"}
+EVICTION_INTERVAL = 60.0
+
+
+class JobStore(abc.ABC):
+    """Interface shared by all job store backends."""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._last_eviction = 0.0
+
+    @abc.abstractmethod
+    def create(self, job: Dict):
+        ...
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        ...
+
+    @abc.abstractmethod
+    def save(self, job: Dict):
+        ...
+
+    def release(self, job_id: str):
+        """Called once a job is done in this process; drops any live reference."""
+
+    @abc.abstractmethod
+    def evict_expired(self) -> List[str]:
+        """Deletes finished jobs older than the TTL. Returns evicted job ids."""
+
+    def _maybe_evict(self):
+        now = time.time()
+        if self.ttl_seconds > 0 and now - self._last_eviction >= EVICTION_INTERVAL:
+            self._last_eviction = now
+            evicted = self.evict_expired()
+            for job_id in evicted:
+                delete_job_log(job_id)
+            if evicted:
+                logger.info(f"JobStore: Evicted {len(evicted)} expired job(s)")
+
+    @staticmethod
+    def _stamp(job: Dict):
+        now = time.time()
+        job.setdefault("created_at", now)
+        job["updated_at"] = now
+        # Monotonic per-job version: every published snapshot gets a new one
+        job["version"] = job.get("version", 0) + 1
+        if job.get("status") in TERMINAL_STATUSES:
+            job.setdefault("finished_at", now)
+
+
+class InMemoryJobStore(JobStore):
+    def __init__(self, ttl_seconds: int):
+        super().__init__(ttl_seconds)
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: Dict):
+        self._stamp(job)
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+        self._maybe_evict()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def save(self, job: Dict):
+        self._stamp(job)
+        with self._lock:
+            self._jobs[job["job_id"]] = job
+
+    def evict_expired(self) -> List[str]:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.get("finished_at") and job["finished_at"] < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return expired
+
+
+class SQLiteJobStore(JobStore):
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id      TEXT PRIMARY KEY,
+            repo_url    TEXT NOT NULL,
+            status      TEXT NOT NULL,
+            created_at  REAL NOT NULL,
+            updated_at  REAL NOT NULL,
+            finished_at REAL,
+            data        TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status     ON jobs(status);
+        CREATE INDEX IF NOT EXISTS idx_jobs_repo_url   ON jobs(repo_url);
+        CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at);
+        CREATE INDEX IF NOT EXISTS idx_jobs_finished   ON jobs(finished_at);
+    """
+
+    def __init__(self, path: str, ttl_seconds: int):
+        super().__init__(ttl_seconds)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        # Jobs currently executing in this process — mutated in place by the controller
+        self._live: Dict[str, Dict] = {}
+        self._live_lock = threading.Lock()
+        with self._conn() as conn:
+            conn.executescript(self.SCHEMA)
+        logger.info(f"JobStore: Using SQLite database at {path}")
+        self._recover_interrupted()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job: Dict):
+        with self._live_lock:
+            self._live[job["job_id"]] = job
+        self.save(job)
+        self._maybe_evict()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._live_lock:
+            live = self._live.get(job_id)
+        if live is not None:
+            return live
+        row = self._conn().execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, job: Dict):
+        self._stamp(job)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs "
+                "(job_id, repo_url, status, created_at, updated_at, finished_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job["job_id"], job.get("repo_url", ""), job.get("status", ""),
+                    job["created_at"], job["updated_at"], job.get("finished_at"),
+                    json.dumps(job, default=str),
+                ),
+            )
+
+    def release(self, job_id: str):
+        with self._live_lock:
+            job = self._live.pop(job_id, None)
+        if job is not None:
+            self.save(job)
+
+    def _recover_interrupted(self):
+        """
+        Jobs left QUEUED or RUNNING by a previous process can never finish. They
+        are marked ERROR so they get a `finished_at`, TTL eviction applies, and
+        status watchers see a terminal state.
+        """
+        placeholders = ", ".join("?" * len(TERMINAL_STATUSES))
+        rows = self._conn().execute(
+            f"SELECT data FROM jobs WHERE status NOT IN ({placeholders})", tuple(TERMINAL_STATUSES)
+        ).fetchall()
+        for (data,) in rows:
+            job = json.loads(data)
+            job["status"] = "ERROR"
+            job.setdefault("timeline", []).append({
+                "iteration": job.get("iterations_used", 0),
+                "status": "ERROR",
+                "message": "Server restarted; job interrupted",
+                "timestamp": time.strftime("%H:%M:%S"),
+            })
+            self.save(job)
+        if rows:
+            logger.warning(f"JobStore: Marked {len(rows)} interrupted job(s) as ERROR after restart")
+
+    def evict_expired(self) -> List[str]:
+        cutoff = time.time() - self.ttl_seconds
+        conn = self._conn()
+        with conn:
+            rows = conn.execute(
+                "SELECT job_id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            ).fetchall()
+            conn.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+        return [r[0] for r in rows]
+
+
+def create_job_store() -> JobStore:
+    """Builds the job store configured via JOB_STORE (sqlite | memory)."""
+    if settings.JOB_STORE == "memory":
+        return InMemoryJobStore(settings.JOB_TTL_SECONDS)
+    return SQLiteJobStore(settings.JOB_DB_PATH, settings.JOB_TTL_SECONDS)
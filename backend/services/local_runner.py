@@ -0,0 +1,342 @@
+"""
+Local Runner — asyncio subprocess execution for the host (non-Docker) fallback.
+Every local run is a coroutine on one background event loop, so many runs
+(shards, concurrent jobs) proceed side by side without a thread per pipe.
+Each command starts in its own session/process group. On timeout, early
+abort or exit, the whole group is killed, so test-runner workers and
+stray servers don't outlive the run.
+
+Output streams into a `BoundedOutput`: the first LOCAL_OUTPUT_HEAD bytes and
+the last LOCAL_OUTPUT_TAIL bytes stay in memory, and the middle is spilled
+to a file under LOG_DIR/spill; spill files older than JOB_TTL_SECONDS are
+swept at most every SPILL_SWEEP_INTERVAL seconds. While the group runs, its
+process tree is sampled from /proc for peak RSS and CPU time (Linux only;
+other platforms report None).
+
+`on_chunk` (the job's log append and event publish) runs on the default
+executor, one chunk at a time per run, so a slow consumer only holds back
+its own run and never the shared loop.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 65536
+SAMPLE_INTERVAL = 0.5
+SCAN_INTERVAL = 5.0   # when only a full /proc scan can find the group
+SPILL_SWEEP_INTERVAL = 600.0
+CHUNK_BACKLOG = 256   # chunks queued for a slow on_chunk before reads pause
+PROC_AVAILABLE = os.path.isdir("/proc/self")
+CHILDREN_AVAILABLE = os.path.exists(f"/proc/self/task/{os.getpid()}/children")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+class BoundedOutput:
+    """Keeps the head and tail of a byte stream in memory and spills the middle to disk."""
+
+    def __init__(self, head_bytes: int, tail_bytes: int, spill_dir: str):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.spill_dir = spill_dir
+        self.spill_path: Optional[str] = None
+        self.total = 0
+        self.spilled = 0
+        self._head = bytearray()
+        self._tail: deque = deque()
+        self._tail_size = 0
+        self._spill = None
+
+    def write(self, data: bytes):
+        self.total += len(data)
+        room = self.head_bytes - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if not data:
+            return
+        self._tail.append(data)
+        self._tail_size += len(data)
+        while self._tail_size > self.tail_bytes:
+            excess = self._tail_size - self.tail_bytes
+            first = self._tail[0]
+            cut = first[:excess]
+            if len(cut) == len(first):
+                self._tail.popleft()
+            else:
+                self._tail[0] = first[excess:]
+            self._tail_size -= len(cut)
+            self._spill_write(cut)
+
+    def text(self) -> str:
+        head = bytes(self._head).decode("utf-8", errors="replace")
+        tail = b"".join(self._tail).decode("utf-8", errors="replace")
+        if not self.spilled:
+            return head + tail
+        where = f", full output in {self.spill_path}" if self.spill_path else ""
+        return f"{head}\n... [{self.spilled} bytes omitted{where}] ...\n{tail}"
+
+    def close(self):
+        if self._spill:
+            self._spill.close()
+            self._spill = None
+
+    def _spill_write(self, data: bytes):
+        self.spilled += len(data)
+        try:
+            if self._spill is None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                self.spill_path = os.path.join(self.spill_dir, f"{uuid.uuid4().hex}.log")
+                self._spill = open(self.spill_path, "wb")
+            self._spill.write(data)
+        except OSError as e:
+            logger.warning(f"LocalRunner: Could not spill output ({e}); dropping middle section")
+            self.spill_path = None
+
+
+class _Usage:
+    def __init__(self):
+        self.peak_rss = 0
+        self.cpu_ticks: Dict[int, int] = {}   # pid -> last seen utime+stime
+
+    @property
+    def cpu_seconds(self) -> float:
+        return round(sum(self.cpu_ticks.values()) / CLOCK_TICKS, 2)
+
+
+class LocalRunner:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self.spill_dir = os.path.join(settings.LOG_DIR, "spill")
+        self._last_sweep = time.time()
+        self._sweep_spill()
+
+    def run(
+        self, command: str, cwd: str, env: dict, timeout: float, on_chunk: Callable[[bytes], bool] = None
+    ) -> Dict:
+        """Blocking wrapper around `run_async`, safe to call from any thread."""
+        future = asyncio.run_coroutine_threadsafe(
+            self.run_async(command, cwd, env, timeout, on_chunk), self._ensure_loop()
+        )
+        return future.result()
+
+    async def run_async(
+        self, command: str, cwd: str, env: dict, timeout: float, on_chunk: Callable[[bytes], bool] = None
+    ) -> Dict:
+        """
+        Runs `command` in a shell. `on_chunk` sees output in order, from an
+        executor thread; returning True aborts the run. Returns exit_code, logs,
+        timed_out, aborted, peak_rss_bytes, cpu_seconds, output_bytes and spill_path.
+        """
+        loop = asyncio.get_running_loop()
+        if time.time() - self._last_sweep > SPILL_SWEEP_INTERVAL:
+            self._last_sweep = time.time()
+            loop.run_in_executor(None, self._sweep_spill)
+        output = BoundedOutput(settings.LOCAL_OUTPUT_HEAD, settings.LOCAL_OUTPUT_TAIL, self.spill_dir)
+        started = time.time()
+        proc = await asyncio.create_subprocess_shell(
+            command,
+            cwd=cwd,
+            env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=(os.name == "posix"),
+        )
+        usage = _Usage()
+        sampler = asyncio.ensure_future(self._sample(proc.pid, usage)) if PROC_AVAILABLE else None
+        chunks: asyncio.Queue = asyncio.Queue(CHUNK_BACKLOG)
+        abort = asyncio.Event()
+        deliver = asyncio.ensure_future(self._deliver(chunks, on_chunk, abort)) if on_chunk else None
+        pump = asyncio.ensure_future(self._pump(proc, output, chunks if on_chunk else None))
+        stop = asyncio.ensure_future(abort.wait())
+        try:
+            done, _ = await asyncio.wait({pump, stop}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            timed_out = not done
+            aborted = stop in done
+        finally:
+            pump.cancel()
+            stop.cancel()
+            self._kill_group(proc)   # also reaps anything that outlived the shell
+            exit_code = await proc.wait()
+            if sampler:
+                sampler.cancel()
+
+        if timed_out:
+            note = f"\nExecution timed out after {timeout}s".encode("utf-8")
+            output.write(note)
+            if deliver:
+                await chunks.put(note)
+        if deliver:
+            await chunks.put(None)
+            await deliver
+        output.close()
+        logs = output.text()
+        result = {
+            "exit_code": -1 if (timed_out or aborted) else exit_code,
+            "logs": logs,
+            "timed_out": timed_out,
+            "aborted": aborted,
+            "peak_rss_bytes": usage.peak_rss if PROC_AVAILABLE else None,
+            "cpu_seconds": usage.cpu_seconds if PROC_AVAILABLE else None,
+            "output_bytes": output.total,
+            "spill_path": output.spill_path,
+        }
+        rss = f"{usage.peak_rss / (1024 * 1024):.0f} MB" if PROC_AVAILABLE else "n/a"
+        logger.info(
+            f"LocalRunner: exit {result['exit_code']} in {time.time() - started:.1f}s "
+            f"(peak RSS {rss}, CPU {result['cpu_seconds']}s, {output.total} bytes output)"
+        )
+        return result
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    async def _pump(self, proc, output: BoundedOutput, chunks: Optional[asyncio.Queue]):
+        """Copies output until EOF, queueing each chunk for `_deliver`."""
+        while True:
+            try:
+                chunk = await asyncio.wait_for(proc.stdout.read(READ_SIZE), 1.0)
+            except asyncio.TimeoutError:
+                # The shell is gone but a background child still holds the pipe open
+                if proc.returncode is not None:
+                    return
+                continue
+            if not chunk:
+                return
+            output.write(chunk)
+            if chunks is not None:
+                await chunks.put(chunk)
+
+    async def _deliver(self, chunks: asyncio.Queue, on_chunk: Callable[[bytes], bool], abort: asyncio.Event):
+        """Hands queued chunks to `on_chunk` in order, off the loop. Sets `abort` when it asks to stop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                return
+            if abort.is_set():
+                continue   # the run is being killed; drop what it printed meanwhile
+            try:
+                if await loop.run_in_executor(None, on_chunk, chunk):
+                    abort.set()
+            except Exception as e:
+                logger.warning(f"LocalRunner: Output callback failed: {e}")
+
+    async def _sample(self, pgid: int, usage: _Usage):
+        known: Dict[int, str] = {}
+        while True:
+            rss = 0
+            members = self._tree_members(pgid, known) if CHILDREN_AVAILABLE else self._group_members(pgid)
+            for pid, stat in members.items():
+                usage.cpu_ticks[pid] = int(stat[11]) + int(stat[12])   # utime + stime
+                rss += int(stat[21]) * PAGE_SIZE
+            usage.peak_rss = max(usage.peak_rss, rss)
+            await asyncio.sleep(SAMPLE_INTERVAL if CHILDREN_AVAILABLE else SCAN_INTERVAL)
+
+    def _tree_members(self, root: int, known: Dict[int, str]) -> Dict[int, List[str]]:
+        """
+        Stats of the run's process tree: the root and its descendants via
+        /proc/<pid>/task/*/children, plus members seen earlier that have been
+        orphaned since. The cost follows the run's own processes, not the host's.
+        `known` maps pid -> start time and is updated in place.
+        """
+        stats: Dict[int, List[str]] = {}
+        # (pid, expected start time); known pids are re-checked so a reused pid isn't counted
+        pending = [(root, None)] + [(pid, started) for pid, started in known.items() if pid != root]
+        while pending:
+            pid, started = pending.pop()
+            if pid in stats:
+                continue
+            stat = self._read_stat(pid)
+            if stat is None or (started is not None and stat[19] != started):
+                continue
+            stats[pid] = stat
+            pending.extend((child, None) for child in self._children(pid))
+        known.clear()
+        known.update({pid: stat[19] for pid, stat in stats.items()})
+        return stats
+
+    def _children(self, pid: int) -> List[int]:
+        children = []
+        try:
+            tasks = os.listdir(f"/proc/{pid}/task")
+        except OSError:
+            return children
+        for tid in tasks:
+            try:
+                with open(f"/proc/{pid}/task/{tid}/children", "rb") as fh:
+                    children.extend(int(c) for c in fh.read().split())
+            except (OSError, ValueError):
+                continue
+        return children
+
+    def _group_members(self, pgid: int) -> Dict[int, List[str]]:
+        """Fallback for kernels without /proc/<pid>/task/*/children: scans every process."""
+        members = {}
+        for name in os.listdir("/proc"):
+            if name.isdigit():
+                stat = self._read_stat(int(name))
+                if stat is not None and int(stat[2]) == pgid:
+                    members[int(name)] = stat
+        return members
+
+    def _read_stat(self, pid: int):
+        """Fields of /proc/<pid>/stat after the command name (index 0 = state)."""
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as fh:
+                raw = fh.read().decode("ascii", errors="replace")
+        except OSError:
+            return None
+        return raw[raw.rfind(")") + 2:].split()
+
+    def _kill_group(self, proc):
+        try:
+            if os.name == "posix":
+                os.killpg(proc.pid, signal.SIGKILL)
+            elif proc.returncode is None:
+                proc.kill()
+        except (OSError, ProcessLookupError):
+            pass
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="fixora-local-runner", daemon=True).start()
+            return self._loop
+
+    def _sweep_spill(self):
+        """Drops spill files older than the job TTL."""
+        if not os.path.isdir(self.spill_dir):
+            return
+        cutoff = time.time() - settings.JOB_TTL_SECONDS
+        for name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+_runner: Optional[LocalRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_local_runner() -> LocalRunner:
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = LocalRunner()
+        return _runner
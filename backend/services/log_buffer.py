@@ -0,0 +1,164 @@
+"""
+Job Log Buffer — append-only, chunked log storage per job.
+Replaces `job_ref["raw_logs"] += ...` string concatenation.
+
+Every append is written through to `<LOG_DIR>/<job_id>.log` and kept in an
+in-memory chunk list capped at LOG_MEMORY_LIMIT bytes. Older chunks are
+dropped from memory once they are on disk, so memory stays bounded however
+chatty the test suite is. Offsets are byte offsets into the full log, which
+lets pollers fetch only new bytes (`read(offset)`), and lets other API
+workers read the same log straight from disk.
+"""
+
+import logging
+import os
+import threading
+from collections import deque
+from typing import Dict, Iterator, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+READ_LIMIT_DEFAULT = 1024 * 1024
+
+
+def _log_dir() -> str:
+    path = settings.LOG_DIR
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class JobLog:
+    def __init__(self, job_id: str, memory_limit: int = None, writable: bool = True):
+        self.job_id = job_id
+        self.path = os.path.join(_log_dir(), f"{job_id}.log")
+        self.memory_limit = memory_limit if memory_limit is not None else settings.LOG_MEMORY_LIMIT
+        self.writable = writable
+        self._lock = threading.Lock()
+        self._chunks: deque = deque()   # (start_offset, bytes)
+        self._mem_bytes = 0
+        self._size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self._fh = open(self.path, "ab") if writable else None
+
+    @property
+    def size(self) -> int:
+        if self.writable:
+            return self._size
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def append(self, text: str) -> int:
+        """Appends text and returns the byte offset it starts at."""
+        if not text:
+            return self.size
+        data = text.encode("utf-8", errors="replace")
+        with self._lock:
+            if not self._fh:
+                raise RuntimeError(f"Log for job {self.job_id} is read-only")
+            start = self._size
+            self._fh.write(data)
+            self._fh.flush()
+            self._size += len(data)
+            self._chunks.append((start, data))
+            self._mem_bytes += len(data)
+            # Spill: everything is already on disk, so just forget the oldest chunks
+            while self._mem_bytes > self.memory_limit and len(self._chunks) > 1:
+                _, old = self._chunks.popleft()
+                self._mem_bytes -= len(old)
+            return start
+
+    def read(self, offset: int = 0, limit: int = READ_LIMIT_DEFAULT) -> Tuple[str, int]:
+        """Returns (text, next_offset) for up to `limit` bytes starting at `offset`."""
+        offset = max(0, offset)
+        with self._lock:
+            size = self.size
+            end = min(size, offset + max(0, limit))
+            if offset >= end:
+                return "", min(offset, size)
+            data = self._read_memory(offset, end)
+        if data is None:
+            data = self._read_disk(offset, end)
+        return data.decode("utf-8", errors="replace"), offset + len(data)
+
+    def tail(self, max_bytes: int) -> str:
+        """Returns (roughly) the last `max_bytes` of the log."""
+        size = self.size
+        text, _ = self.read(max(0, size - max_bytes), max_bytes)
+        return text
+
+    def iter_lines(self) -> Iterator[str]:
+        """Streams the full log line by line from disk without loading it whole."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8", errors="replace") as fh:
+            for line in fh:
+                yield line.rstrip("\n")
+
+    def close(self):
+        with self._lock:
+            if self._fh:
+                self._fh.close()
+                self._fh = None
+            self.writable = False
+            self._chunks.clear()
+            self._mem_bytes = 0
+
+    def _read_memory(self, start: int, end: int) -> bytes | None:
+        if not self._chunks or start < self._chunks[0][0]:
+            return None
+        parts = []
+        for chunk_start, data in self._chunks:
+            chunk_end = chunk_start + len(data)
+            if chunk_end <= start:
+                continue
+            if chunk_start >= end:
+                break
+            parts.append(data[max(0, start - chunk_start):end - chunk_start])
+        return b"".join(parts)
+
+    def _read_disk(self, start: int, end: int) -> bytes:
+        with open(self.path, "rb") as fh:
+            fh.seek(start)
+            return fh.read(end - start)
+
+
+# ── Registry of logs being written in this process ──────────────────────────
+
+_open_logs: Dict[str, JobLog] = {}
+_registry_lock = threading.Lock()
+
+
+def open_job_log(job_id: str) -> JobLog:
+    """Returns the writable log for a job owned by this process (creating it)."""
+    with _registry_lock:
+        log = _open_logs.get(job_id)
+        if log is None:
+            log = JobLog(job_id)
+            _open_logs[job_id] = log
+        return log
+
+
+def get_job_log(job_id: str) -> JobLog:
+    """Returns the live log if this process owns it, else a read-only view of the file."""
+    with _registry_lock:
+        log = _open_logs.get(job_id)
+    return log or JobLog(job_id, writable=False)
+
+
+def release_job_log(job_id: str):
+    """Closes the writer and frees its memory; the file remains readable."""
+    with _registry_lock:
+        log = _open_logs.pop(job_id, None)
+    if log:
+        log.close()
+
+
+def delete_job_log(job_id: str):
+    release_job_log(job_id)
+    path = os.path.join(_log_dir(), f"{job_id}.log")
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"JobLog: Could not delete {path}: {e}")
@@ -0,0 +1,149 @@
+"""
+Log Condenser — failure-aware windowing of test logs for AI prompts.
+`ErrorAgent._ai_parse` used to send `logs[:4000]`, which on real projects is
+mostly pip/npm install noise, while the tracebacks at the end were cut off.
+`condense` scores every line, grows a small context window around each
+failure signal (tracebacks, `E   ` lines, FAILED/ERROR markers, compiler
+errors, the pytest short summary), and keeps the best regions in log order
+within a token budget.
+
+Inside the kept regions, repeated lines (recursion frames, retried errors)
+collapse to a single line with a count. Runs of library frames
+(site-packages, node_modules, JDK/JUnit internals) collapse to one marker.
+Logs that already fit the budget are returned unchanged.
+"""
+
+import re
+from typing import List, Tuple
+
+from services.log_parser import iter_lines
+
+CHARS_PER_TOKEN = 4
+CONTEXT_BEFORE = 2
+CONTEXT_AFTER = 4
+MAX_LINE_CHARS = 400
+MAX_REGION_LINES = 40
+
+SIGNALS: List[Tuple[re.Pattern, int]] = [
+    (re.compile(r"Traceback \(most recent call last\)"), 6),
+    (re.compile(r"^E\s{2,}"), 5),
+    (re.compile(r"^(?:FAILED|ERROR)\b|\b(?:FAILED|FAIL)\s+\S+"), 5),
+    (re.compile(r"short test summary info|^=+ (?:FAILURES|ERRORS) =+"), 6),
+    (re.compile(r"\b\w*(?:Error|Exception)\b:"), 4),
+    (re.compile(r'File "[^"]+", line \d+'), 3),
+    (re.compile(r"\.py:\d+: \w+"), 4),
+    (re.compile(r"\.(?:js|ts|jsx|tsx|java|kt):\d+(?::\d+)?"), 3),
+    (re.compile(r"^\s*●|Test suite failed to run"), 5),
+    (re.compile(r"> Task :\S+ FAILED|BUILD FAILURE|^\[ERROR\]|\berror(?: TS\d+)?:"), 5),
+    (re.compile(r"\bassert\b|AssertionError|Expected|Received"), 2),
+    (re.compile(r"^=+ .*\b(?:failed|passed|error)\b.* =+$"), 4),
+]
+NOISE = re.compile(
+    r"^(?:Requirement already satisfied|Collecting |Downloading |Installing collected|Successfully installed|"
+    r"Using cached|  Downloading|npm (?:WARN|notice)|added \d+ packages|Download(?:ing|ed) https?://)"
+    r"|\bPASSED\b|^\s*✓"
+)
+LIBRARY_FRAME = re.compile(
+    r"(?:site-packages|dist-packages|node_modules|/usr/lib/python|<frozen |node:internal)"
+    r"|^\s+at (?:java\.|javax\.|jdk\.|sun\.|org\.junit\.|org\.gradle\.|org\.apache\.maven\.)"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def condense(logs: str, max_tokens: int) -> str:
+    """Returns the most failure-relevant parts of `logs` within roughly `max_tokens`."""
+    if estimate_tokens(logs) <= max_tokens:
+        return logs
+    lines = [line[:MAX_LINE_CHARS] for line in iter_lines(logs)]
+    scores = [_score(line) for line in lines]
+
+    regions = _regions(scores)
+    budget = max_tokens * CHARS_PER_TOKEN
+    # Best regions first; ties favour later regions, where summaries live
+    ranked = sorted(regions, key=lambda r: (r[2], r[0]), reverse=True)
+    chosen: List[Tuple[int, int, str]] = []
+    used = 0
+    for start, end, _ in ranked:
+        text = _render(lines[start:end])
+        if used + len(text) > budget:
+            room = budget - used
+            if room < 200:
+                continue
+            text = text[:room]
+        chosen.append((start, end, text))
+        used += len(text) + 40
+        if used >= budget:
+            break
+
+    if not chosen:
+        return "\n".join(lines)[-budget:]
+
+    out = []
+    cursor = 0
+    for start, end, text in sorted(chosen):
+        if start > cursor:
+            out.append(f"... [{start - cursor} lines omitted] ...")
+        out.append(text)
+        cursor = end
+    if cursor < len(lines):
+        out.append(f"... [{len(lines) - cursor} lines omitted] ...")
+    return "\n".join(out)
+
+
+def _score(line: str) -> int:
+    if not line.strip() or NOISE.search(line):
+        return 0
+    return sum(weight for pattern, weight in SIGNALS if pattern.search(line))
+
+
+def _regions(scores: List[int]) -> List[Tuple[int, int, int]]:
+    """Merges context windows around every scoring line into (start, end, score) regions."""
+    regions: List[List[int]] = []
+    for i, score in enumerate(scores):
+        if score <= 0:
+            continue
+        start, end = max(0, i - CONTEXT_BEFORE), min(len(scores), i + CONTEXT_AFTER + 1)
+        if regions and start <= regions[-1][1] and end - regions[-1][0] <= MAX_REGION_LINES:
+            regions[-1][1] = max(regions[-1][1], end)
+        else:
+            regions.append([start, end])
+    return [(s, e, sum(scores[s:e])) for s, e in regions]
+
+
+def _render(lines: List[str]) -> str:
+    """Collapses repeated lines and runs of library frames."""
+    out: List[str] = []
+    previous, repeats, library = None, 0, 0
+
+    def flush():
+        nonlocal repeats, library
+        if repeats:
+            out.append(f"    [previous line repeated {repeats} more times]")
+            repeats = 0
+        if library:
+            out.append(f"    [{library} library frame lines omitted]")
+            library = 0
+
+    in_library_frame = False
+    for line in lines:
+        if line == previous:
+            repeats += 1
+            continue
+        # The source line printed under a library `File "..."` frame belongs to it
+        is_code = in_library_frame and line.startswith("    ") and not line.lstrip().startswith(("File ", "at "))
+        if is_code or (LIBRARY_FRAME.search(line) and not NOISE.search(line)):
+            if repeats:
+                flush()
+            library += 1
+            previous = line
+            in_library_frame = not is_code
+            continue
+        in_library_frame = False
+        flush()
+        out.append(line)
+        previous = line
+    flush()
+    return "\n".join(out)
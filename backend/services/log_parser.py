@@ -0,0 +1,213 @@
+"""
+Log Parser — single-pass, line-oriented error extraction for test logs.
+This replaces the multi-scan regex parser in `ErrorAgent._regex_parse`. A
+`LogParser` is fed one line at a time and recognises, in a single pass:
+
+  python     `File "x.py", line N` frames followed within three lines by a
+             SyntaxError / ImportError / TypeError / NameError (...)
+  js         `path.js:line:col` locations, including Node stack frames
+             (frames inside node_modules are skipped)
+  assertion  pytest `x.py:N: AssertionError` lines. The assert expression
+             and the `+ where ... = func(` hint come from the current `___`
+             block, or from up to 200 characters after the match
+  gradle     `> Task :name FAILED`
+
+All patterns are compiled once at import. The parser holds only a few lines
+of state plus the results, so memory stays bounded on 100 MB logs. Results
+come out in the legacy category order (python, js, assertion, gradle), and
+each category is capped at MAX_ERRORS_PER_CATEGORY.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional
+import re
+
+MAX_ERRORS_PER_CATEGORY = 1000
+TRACEBACK_WINDOW = 3       # lines between a `File` frame and its exception
+ASSERT_LOOKAHEAD = 200     # characters read past an assertion line
+
+PY_FRAME = re.compile(r'File "([^"]+)", line (\d+)')
+PY_EXCEPTION = re.compile(r'.*((?:SyntaxError|IndentationError|ImportError|ModuleNotFoundError|TypeError|NameError): .*)')
+JS_LOCATION = re.compile(r'([./\w-]+\.(?:js|ts|jsx|tsx)):(\d+):\d+')
+PY_ASSERTION = re.compile(r'([^:\n\s]+\.py):(\d+): Assertion\w*Error')
+ASSERT_EXPR = re.compile(r'assert (.+)')
+WHERE_CALL = re.compile(r'\+\s+where .+ = (\w+)\(')
+GRADLE_TASK = re.compile(r'> Task :(\S+) FAILED')
+BLOCK_SEPARATOR = "___"
+
+
+def classify_error(msg: str) -> str:
+    msg = msg.upper()
+    if "SYNTAX" in msg:        return "SYNTAX"
+    if "INDENTATION" in msg:   return "INDENTATION"
+    if "IMPORT" in msg or "MODULE" in msg: return "IMPORT"
+    if "TYPE" in msg or "NAME" in msg:     return "TYPE_ERROR"
+    return "LOGIC"
+
+
+class _PendingAssertion:
+    __slots__ = ("file", "line", "assert_detail", "source_func", "budget")
+
+    def __init__(self, file: str, line: int, assert_detail: str, source_func: str, budget: int):
+        self.file = file
+        self.line = line
+        self.assert_detail = assert_detail
+        self.source_func = source_func
+        self.budget = budget
+
+
+class LogParser:
+    def __init__(self):
+        self.python: List[Dict] = []
+        self.js: List[Dict] = []
+        self.assertions: List[Dict] = []
+        self.gradle: List[Dict] = []
+        self._frame: Optional[tuple] = None          # (file, line, lines since frame)
+        self._block_assert = ""                      # first `assert ...` in the current ___ block
+        self._block_where = ""                       # first `+ where ... = func(` in the block
+        self._pending: List[_PendingAssertion] = []
+
+    def feed(self, line: str):
+        line = line.rstrip("\n")
+        self._python(line)
+        if ".js:" in line or ".ts:" in line or ".jsx:" in line or ".tsx:" in line:
+            self._js(line)
+        self._assertion(line)
+        if "> Task :" in line:
+            for m in GRADLE_TASK.finditer(line):
+                self._add(self.gradle, {
+                    "file": m.group(1),
+                    "line": 0,
+                    "type": "LOGIC",
+                    "message": f"Gradle task failed: :{m.group(1)}",
+                })
+
+    def finish(self) -> List[Dict]:
+        for pending in self._pending:
+            self._emit_assertion(pending)
+        self._pending = []
+        return self.python + self.js + self.assertions + self.gradle
+
+    # ── Recognisers ──────────────────────────────────────────────────────────
+
+    def _python(self, line: str):
+        if self._frame is not None:
+            file, lineno, seen = self._frame
+            m = PY_EXCEPTION.match(line) if ("Error: " in line) else None
+            if m:
+                self._add(self.python, {
+                    "file": file,
+                    "line": lineno,
+                    "type": classify_error(m.group(1)),
+                    "message": m.group(1).strip(),
+                })
+                self._frame = None
+                return
+            self._frame = (file, lineno, seen + 1) if seen + 1 < TRACEBACK_WINDOW else None
+        if 'File "' in line:
+            m = PY_FRAME.search(line)
+            if m:
+                self._frame = (m.group(1), int(m.group(2)), 0)
+
+    def _js(self, line: str):
+        for m in JS_LOCATION.finditer(line):
+            if "node_modules/" in m.group(1):
+                continue
+            self._add(self.js, {
+                "file": m.group(1),
+                "line": int(m.group(2)),
+                "type": "SYNTAX",
+                "message": "JS/TS syntax or compilation error detected",
+            })
+
+    def _assertion(self, line: str):
+        # Lines after an assertion may still supply its assert / where details
+        if self._pending:
+            self._extend_pending(line)
+
+        if BLOCK_SEPARATOR in line:
+            tail = line[line.rfind(BLOCK_SEPARATOR):]
+            self._block_assert = self._first(ASSERT_EXPR, tail, group=0)
+            self._block_where = self._first(WHERE_CALL, tail)
+        else:
+            if not self._block_assert and "assert " in line:
+                self._block_assert = self._first(ASSERT_EXPR, line, group=0)
+            if not self._block_where and "where " in line:
+                self._block_where = self._first(WHERE_CALL, line)
+
+        if "Assertion" not in line:
+            return
+        for m in PY_ASSERTION.finditer(line):
+            rest = line[m.end():]
+            pending = _PendingAssertion(
+                m.group(1).strip(), int(m.group(2)), self._block_assert, self._block_where, ASSERT_LOOKAHEAD
+            )
+            self._scan_lookahead(pending, rest)
+            if pending.budget > 0 and not (pending.assert_detail and pending.source_func):
+                self._pending.append(pending)
+            else:
+                self._emit_assertion(pending)
+
+    def _extend_pending(self, line: str):
+        still = []
+        for pending in self._pending:
+            self._scan_lookahead(pending, "\n" + line)
+            if pending.budget > 0 and not (pending.assert_detail and pending.source_func):
+                still.append(pending)
+            else:
+                self._emit_assertion(pending)
+        self._pending = still
+
+    def _scan_lookahead(self, pending: _PendingAssertion, text: str):
+        window = text[:pending.budget]
+        pending.budget -= len(window)
+        if not pending.assert_detail:
+            pending.assert_detail = self._first(ASSERT_EXPR, window, group=0)
+        if not pending.source_func:
+            pending.source_func = self._first(WHERE_CALL, window)
+
+    def _emit_assertion(self, pending: _PendingAssertion):
+        message = f"Assertion failed: {pending.assert_detail}"
+        if pending.source_func:
+            message += f" (source function: {pending.source_func})"
+        self._add(self.assertions, {
+            "file": pending.file,
+            "line": pending.line,
+            "type": "LOGIC",
+            "message": message,
+        })
+
+    # ── Helpers ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _first(pattern, text: str, group: int = 1) -> str:
+        m = pattern.search(text)
+        return m.group(group).strip() if m else ""
+
+    @staticmethod
+    def _add(bucket: List[Dict], error: Dict):
+        if len(bucket) < MAX_ERRORS_PER_CATEGORY:
+            bucket.append(error)
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """Yields lines of `text` without materialising a list of them."""
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end < 0:
+            if start < len(text):
+                yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+def parse_lines(lines: Iterable[str]) -> List[Dict]:
+    parser = LogParser()
+    for line in lines:
+        parser.feed(line)
+    return parser.finish()
+
+
+def parse_text(logs: str) -> List[Dict]:
+    return parse_lines(iter_lines(logs))
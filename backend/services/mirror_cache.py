@@ -0,0 +1,211 @@
+"""
+Mirror Cache — local bare mirrors of remote repositories.
+`GitService.clone` syncs the mirror with an incremental fetch and then clones
+the job workspace from it locally. Local clones hardlink the object files, so
+a repeat repository costs one small fetch instead of a full network clone.
+Workspaces keep working even if their mirror is evicted later.
+
+Mirrors are keyed by normalized URL (no credentials, case-insensitive host,
+no trailing `.git`). Tokens are passed to git on the command line per fetch
+and are never written into the mirror's config. The cache is capped at
+GIT_MIRROR_MAX_BYTES; the least recently used mirrors are evicted first.
+Each mirror has a `<mirror>.lock` file: syncs and eviction take it exclusively,
+readers (`reading()`) shared, so a mirror is never deleted mid-clone. A failed
+refresh only rebuilds the mirror when it is actually corrupt.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+import git
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LAST_USED_MARKER = "FIXORA_LAST_USED"
+SIZE_MARKER = "FIXORA_SIZE"
+FETCH_REFSPECS = ("+refs/heads/*:refs/heads/*", "+refs/tags/*:refs/tags/*")
+
+
+def normalize_repo_url(repo_url: str) -> str:
+    """Canonical form used as the cache key: credentials stripped, host lowercased, no .git."""
+    url = repo_url.strip().rstrip("/")
+    if url.endswith(".git"):
+        url = url[:-4]
+    parts = urlsplit(url)
+    if parts.scheme and parts.hostname:
+        host = parts.hostname.lower()
+        if parts.port:
+            host = f"{host}:{parts.port}"
+        return f"{parts.scheme.lower()}://{host}{parts.path}"
+    return url
+
+
+def _redact(text: str, secret_url: str) -> str:
+    """Removes an authenticated URL's credentials from git error output."""
+    creds = urlsplit(secret_url).password or urlsplit(secret_url).username
+    return text.replace(creds, "***") if creds else text
+
+
+class MirrorCache:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def mirror_path(self, repo_url: str) -> str:
+        normalized = normalize_repo_url(repo_url)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", normalized.split("/")[-1])[:40] or "repo"
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.root, f"{slug}-{digest}.git")
+
+    def sync(self, repo_url: str, auth_url: str) -> str:
+        """Creates or incrementally updates the mirror for `repo_url`; returns its path."""
+        path = self.mirror_path(repo_url)
+        with self._locked(path):
+            try:
+                self._fetch(path, auth_url)
+            except git.GitCommandError as e:
+                # Auth and network failures leave a valid mirror behind: keep it for the next job
+                if not os.path.exists(os.path.join(path, LAST_USED_MARKER)) or not self._corrupt(path):
+                    raise
+                logger.warning(f"MirrorCache: Refresh failed on a corrupt mirror ({_redact(str(e), auth_url)[:200]}), rebuilding")
+                shutil.rmtree(path, ignore_errors=True)
+                self._fetch(path, auth_url)
+            self._touch(path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: str = None) -> List[str]:
+        """Deletes least recently used mirrors until the cache fits GIT_MIRROR_MAX_BYTES."""
+        mirrors: List[Tuple[float, int, str]] = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            marker = os.path.join(path, LAST_USED_MARKER)
+            if os.path.isdir(path) and os.path.exists(marker):
+                mirrors.append((os.path.getmtime(marker), self._size(path), path))
+
+        total = sum(size for _, size, _ in mirrors)
+        evicted = []
+        for _, size, path in sorted(mirrors):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            with self._locked(path, blocking=False) as acquired:
+                if not acquired:
+                    continue  # being synced or read right now, here or in another process
+                shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted.append(path)
+            logger.info(f"MirrorCache: Evicted {os.path.basename(path)} ({size // (1024 * 1024)} MB)")
+        return evicted
+
+    @contextmanager
+    def reading(self, path: str):
+        """Held while a workspace clones or fetches from the mirror, so eviction can't delete it underneath."""
+        if fcntl is None:
+            with self._thread_lock(path):
+                yield
+            return
+        with open(f"{path}.lock", "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _corrupt(self, path: str) -> bool:
+        """True when the mirror itself is damaged (no HEAD, or fsck finds missing objects)."""
+        if not os.path.exists(os.path.join(path, "HEAD")):
+            return True
+        try:
+            git.Git(path).fsck("--connectivity-only", "--no-dangling", "--no-progress")
+        except git.GitCommandError:
+            return True
+        return False
+
+    def _fetch(self, path: str, auth_url: str):
+        fresh = not os.path.exists(os.path.join(path, "HEAD"))
+        if fresh:
+            os.makedirs(path, exist_ok=True)
+            git.Repo.init(path, bare=True)
+        g = git.Git(path)
+
+        # Point the mirror's HEAD at the remote default branch so clones check it out
+        head = g.ls_remote("--symref", auth_url, "HEAD")
+        match = re.search(r"^ref:\s+(refs/heads/\S+)\s+HEAD", head, re.MULTILINE)
+        started = time.time()
+        g.fetch("--prune", "--quiet", auth_url, *FETCH_REFSPECS)
+        if match:
+            g.symbolic_ref("HEAD", match.group(1))
+        logger.info(f"MirrorCache: {'Created' if fresh else 'Refreshed'} {os.path.basename(path)} in {time.time() - started:.1f}s")
+
+    def _touch(self, path: str):
+        marker = os.path.join(path, LAST_USED_MARKER)
+        with open(marker, "a"):
+            pass
+        os.utime(marker, None)
+        size = sum(
+            os.path.getsize(os.path.join(dirpath, f))
+            for dirpath, _, files in os.walk(path) for f in files
+        )
+        with open(os.path.join(path, SIZE_MARKER), "w") as fh:
+            fh.write(str(size))
+
+    def _size(self, path: str) -> int:
+        try:
+            with open(os.path.join(path, SIZE_MARKER)) as fh:
+                return int(fh.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _thread_lock(self, path: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    @contextmanager
+    def _locked(self, path: str, blocking: bool = True):
+        """
+        Exclusive access to one mirror across threads and (where supported)
+        processes. Yields False instead of waiting when `blocking` is off and
+        the mirror is busy.
+        """
+        lock = self._thread_lock(path)
+        if not lock.acquire(blocking=blocking):
+            yield False
+            return
+        try:
+            if fcntl is None:
+                yield True
+                return
+            # The lock file is never deleted: a waiter on an unlinked inode would
+            # lock a different file than the next opener
+            with open(f"{path}.lock", "a") as fh:
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    yield False
+                    return
+                try:
+                    yield True
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+        finally:
+            lock.release()
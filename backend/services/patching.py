@@ -0,0 +1,216 @@
+"""
+Patching — parse and apply AI-generated edits instead of full-file rewrites.
+The fix prompt asks the model for SEARCH/REPLACE blocks:
+
+    <<<<<<< SEARCH
+    lines copied from the file
+    =======
+    replacement lines
+    >>>>>>> REPLACE
+
+Unified diffs (`@@` hunks) are accepted as well. Output tokens therefore
+scale with the size of the change, not the size of the file.
+
+Each hunk is located in the file with progressively looser matching: exact
+lines, then trailing-whitespace-insensitive, then indentation-insensitive
+(the replacement is re-indented by the same offset), then a fuzzy
+difflib match above FUZZY_THRESHOLD. The first tier that matches decides,
+and it must match exactly once: a SEARCH block found in two places, or a
+fuzzy match with a rival within FUZZY_MARGIN elsewhere, is ambiguous. A hunk
+that is ambiguous or can't be placed raises PatchError, and the caller falls
+back to annotation.
+"""
+
+import difflib
+import re
+from typing import List, Optional, Tuple
+
+FUZZY_THRESHOLD = 0.85
+FUZZY_MARGIN = 0.05
+MATCH_TIERS = 4   # exact, trailing whitespace, indentation, fuzzy
+
+SEARCH_REPLACE = re.compile(
+    r"^<{5,9} SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} REPLACE[^\n]*$",
+    re.MULTILINE | re.DOTALL,
+)
+HUNK_HEADER = re.compile(r"^@@ .* @@")
+
+
+class PatchError(Exception):
+    pass
+
+
+class Hunk:
+    def __init__(self, search: List[str], replace: List[str]):
+        self.search = search
+        self.replace = replace
+
+
+def parse_patch(text: str) -> List[Hunk]:
+    """Extracts SEARCH/REPLACE blocks, or failing that unified-diff hunks. Returns [] if neither is present."""
+    hunks = [
+        Hunk(_block_lines(search), _block_lines(replace))
+        for search, replace in SEARCH_REPLACE.findall(text or "")
+    ]
+    return hunks or _parse_unified(text or "")
+
+
+def apply_patch(content: str, hunks: List[Hunk], fuzzy: bool = True) -> str:
+    """
+    Applies hunks in order; raises PatchError if any of them can't be located
+    or matches more than one place. With `fuzzy=False` only exact matches count.
+    """
+    trailing_newline = content.endswith("\n") or not content
+    lines = content.splitlines()
+    for i, hunk in enumerate(hunks):
+        search, replace = _trim_blank_edges(hunk.search, hunk.replace)
+        if not search:
+            lines = lines + replace   # pure insertion: append
+            continue
+        matches = _locate(lines, search) if fuzzy else _matches(lines, search, 0)
+        if not matches:
+            raise PatchError(f"hunk {i + 1} does not match the file")
+        if len(matches) > 1:
+            raise PatchError(f"hunk {i + 1} matches {len(matches)} places; its SEARCH lines need more context")
+        start, end, indent = matches[0]
+        lines = lines[:start] + [_reindent(l, indent) for l in replace] + lines[end:]
+    patched = "\n".join(lines)
+    return patched + "\n" if trailing_newline and patched else patched
+
+
+def count_matches(content: str, hunk: Hunk, tier: int) -> int:
+    """How many places `hunk` matches `content` at `tier` (0 exact, 1 trailing whitespace, 2 indentation, 3 fuzzy)."""
+    search, _ = _trim_blank_edges(hunk.search, hunk.replace)
+    return len(_matches(content.splitlines(), search, tier))
+
+
+def diff_hunks(original: str, modified: str, context: int = 3) -> List[Hunk]:
+    """The hunks that turn `original` into `modified`, with `context` unchanged lines around each."""
+    before, after = original.splitlines(), modified.splitlines()
+    matcher = difflib.SequenceMatcher(None, before, after, autojunk=False)
+    return [
+        Hunk(before[group[0][1]:group[-1][2]], after[group[0][3]:group[-1][4]])
+        for group in matcher.get_grouped_opcodes(context)
+    ]
+
+
+def format_patch(hunks: List[Hunk]) -> str:
+    """Renders hunks as SEARCH/REPLACE blocks, the format `parse_patch` reads."""
+    blocks = []
+    for hunk in hunks:
+        blocks.append("\n".join(
+            ["<<<<<<< SEARCH", *hunk.search, "=======", *hunk.replace, ">>>>>>> REPLACE"]
+        ))
+    return "\n".join(blocks) + "\n" if blocks else ""
+
+
+# ── Internals ────────────────────────────────────────────────────────────────
+
+def _block_lines(block: str) -> List[str]:
+    return block[:-1].split("\n") if block.endswith("\n") else (block.split("\n") if block else [])
+
+
+def _trim_blank_edges(search: List[str], replace: List[str]) -> Tuple[List[str], List[str]]:
+    """Drops blank lines at the edges of `search`, and the same blank lines from `replace`."""
+    search, replace = list(search), list(replace)
+    while search and not search[0].strip():
+        search.pop(0)
+        if replace and not replace[0].strip():
+            replace.pop(0)
+    while search and not search[-1].strip():
+        search.pop()
+        if replace and not replace[-1].strip():
+            replace.pop()
+    return search, replace
+
+
+def _parse_unified(text: str) -> List[Hunk]:
+    hunks: List[Hunk] = []
+    search: Optional[List[str]] = None
+    replace: List[str] = []
+    for line in text.splitlines():
+        if HUNK_HEADER.match(line):
+            if search is not None:
+                hunks.append(Hunk(search, replace))
+            search, replace = [], []
+            continue
+        if search is None or line.startswith(("--- ", "+++ ", "```")):
+            continue
+        if line.startswith("\\"):
+            continue   # "\ No newline at end of file"
+        tag, body = (line[0], line[1:]) if line else (" ", "")
+        if tag == "-":
+            search.append(body)
+        elif tag == "+":
+            replace.append(body)
+        elif tag == " ":
+            search.append(body)
+            replace.append(body)
+    if search is not None:
+        hunks.append(Hunk(search, replace))
+    return [h for h in hunks if h.search or h.replace]
+
+
+def _locate(lines: List[str], search: List[str]) -> List[Tuple[int, int, str]]:
+    """The matches for `search` at the strictest tier that has any, or []."""
+    for tier in range(MATCH_TIERS):
+        matches = _matches(lines, search, tier)
+        if matches:
+            return matches
+    return []
+
+
+def _matches(lines: List[str], search: List[str], tier: int) -> List[Tuple[int, int, str]]:
+    """Every (start, end, indent_change) where `search` matches `lines` at `tier`."""
+    n = len(search)
+    if not n or n > len(lines):
+        return []
+    if tier < 3:
+        normalize = (lambda s: s, str.rstrip, str.strip)[tier]
+        target = [normalize(s) for s in search]
+        found = [
+            i for i in range(len(lines) - n + 1)
+            if normalize(lines[i]) == target[0] and [normalize(l) for l in lines[i:i + n]] == target
+        ]
+        return [(i, i + n, _indent_change(search, lines[i:i + n]) if tier == 2 else "") for i in found]
+
+    # Fuzzy: the best window, plus any window elsewhere that scores nearly as well
+    scored = []
+    joined = "\n".join(s.strip() for s in search)
+    for i in range(len(lines) - n + 1):
+        window = "\n".join(l.strip() for l in lines[i:i + n])
+        matcher = difflib.SequenceMatcher(None, window, joined, autojunk=False)
+        if matcher.real_quick_ratio() < FUZZY_THRESHOLD or matcher.quick_ratio() < FUZZY_THRESHOLD:
+            continue
+        ratio = matcher.ratio()
+        if ratio >= FUZZY_THRESHOLD:
+            scored.append((ratio, i))
+    if not scored:
+        return []
+    best_ratio, best = max(scored)
+    rivals = [i for ratio, i in scored if abs(i - best) >= n and ratio >= best_ratio - FUZZY_MARGIN]
+    return [(i, i + n, _indent_change(search, lines[i:i + n])) for i in [best] + rivals]
+
+
+def _indent_change(search: List[str], found: List[str]) -> str:
+    """Indentation to add (positive) or a `-N` marker to remove, taken from the first non-blank line."""
+    for s, f in zip(search, found):
+        if s.strip() and f.strip():
+            s_indent = len(s) - len(s.lstrip())
+            f_indent = len(f) - len(f.lstrip())
+            if f_indent > s_indent:
+                return f[:f_indent - s_indent]
+            if f_indent < s_indent:
+                return f"-{s_indent - f_indent}"
+            return ""
+    return ""
+
+
+def _reindent(line: str, indent: str) -> str:
+    if not indent or not line.strip():
+        return line
+    if indent.startswith("-"):
+        remove = int(indent[1:])
+        lead = len(line) - len(line.lstrip())
+        return line[min(remove, lead):]
+    return indent + line
@@ -0,0 +1,232 @@
+"""
+Rate Limiter — process-wide, per-key budgets for AI calls.
+`call_ai` used to fire as soon as a concurrency slot was free and give up on
+the first HTTP 429. Every agent then fell back to annotation, so jobs sharing
+a key lost their AI fixes exactly when load peaked. Each API key (held only as
+a digest) now gets a `KeyLimiter` with:
+
+  - a requests-per-minute token bucket (AI_RPM_PER_KEY)
+  - a tokens-per-minute bucket (AI_TPM_PER_KEY). It is charged with an
+    estimate up front and settled with the response's usage afterwards
+  - the concurrency cap (AI_MAX_CONCURRENCY_PER_KEY)
+
+Callers queue FIFO until all three allow them through, for at most
+AI_RATE_WAIT_MAX seconds. After that, `RateLimitTimeout` is raised. Retries
+use jittered exponential backoff. A `Retry-After` from the server wins over
+the computed delay, and a 429 pauses the whole key so that concurrent callers
+back off together. Wait times, throttling and retries are exposed on
+`/metrics`.
+"""
+
+import email.utils
+import hashlib
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from config import settings
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller waited AI_RATE_WAIT_MAX seconds without getting through."""
+
+    def __init__(self, waited: float):
+        self.waited = waited
+        super().__init__(f"AI rate limit: no capacity after {waited:.1f}s")
+
+
+class TokenBucket:
+    """Refills continuously at `per_minute / 60` per second, up to `per_minute`."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(1.0, float(per_minute))
+        self.tokens = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until `amount` is available (assumes refill() was just called)."""
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+
+class Reservation:
+    def __init__(self, limiter: "KeyLimiter", tokens: int, waited: float):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.waited = waited
+        self._released = False
+
+    def settle(self, actual_tokens: Optional[int]):
+        """Charges the real token usage instead of the estimate (None keeps the estimate)."""
+        if actual_tokens is not None:
+            self.limiter.adjust(self.tokens - actual_tokens)
+            self.tokens = actual_tokens
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.limiter.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class KeyLimiter:
+    def __init__(self, rpm: int, tpm: int, concurrency: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = max(1, concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+        self._queue: deque = deque()
+        self._tickets = itertools.count()
+
+    def acquire(self, tokens: int, max_wait: float) -> Reservation:
+        """Blocks FIFO until a request slot, `tokens` of TPM budget and a concurrency slot are free."""
+        started = time.monotonic()
+        with self._cond:
+            ticket = next(self._tickets)
+            self._queue.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_locked(now, tokens) if self._queue[0] == ticket else 0.5
+                    if wait <= 0:
+                        self.requests.tokens -= 1
+                        self.tokens.tokens -= min(tokens, self.tokens.capacity)
+                        self.in_flight += 1
+                        return Reservation(self, tokens, now - started)
+                    remaining = max_wait - (now - started)
+                    if remaining <= 0:
+                        raise RateLimitTimeout(now - started)
+                    self._cond.wait(min(wait, remaining))
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def adjust(self, refund_tokens: int):
+        with self._cond:
+            self.tokens.refill(time.monotonic())
+            self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens + refund_tokens)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        with self._cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def _wait_locked(self, now: float, tokens: int) -> float:
+        if self.in_flight >= self.concurrency:
+            return 0.5   # woken by release()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return max(self.paused_until - now, self.requests.wait_for(1), self.tokens.wait_for(tokens))
+
+
+class RateLimiter:
+    def __init__(self):
+        self._limiters: Dict[str, KeyLimiter] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0, "throttled": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0,
+            "timeouts": 0, "retries": 0, "rate_limited_responses": 0,
+        }
+
+    def acquire(self, api_key: str, tokens: int) -> Reservation:
+        """A reservation for one request; release it (or use it as a context manager) when the call ends."""
+        limiter = self._for_key(api_key)
+        try:
+            reservation = limiter.acquire(tokens, settings.AI_RATE_WAIT_MAX)
+        except RateLimitTimeout:
+            self._count("timeouts")
+            raise
+        with self._lock:
+            self._stats["requests"] += 1
+            if reservation.waited > 0.001:
+                self._stats["throttled"] += 1
+            self._stats["wait_seconds_total"] += reservation.waited
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], reservation.waited)
+        return reservation
+
+    def backoff(self, api_key: str, attempt: int, retry_after: Optional[str] = None, rate_limited: bool = False) -> float:
+        """
+        Delay before retry number `attempt` (0-based): full-jitter exponential,
+        or the server's Retry-After when it sent one. A 429 pauses the key.
+        """
+        cap = settings.AI_BACKOFF_MAX
+        delay = random.uniform(0, min(cap, settings.AI_BACKOFF_BASE * (2 ** attempt)))
+        server_delay = parse_retry_after(retry_after)
+        if server_delay is not None:
+            delay = min(cap, server_delay) + random.uniform(0, 0.25 * settings.AI_BACKOFF_BASE)
+        self._count("retries")
+        if rate_limited:
+            self._count("rate_limited_responses")
+            self._for_key(api_key).pause(delay)
+        return delay
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["keys"] = len(self._limiters)
+        stats["wait_seconds_avg"] = round(stats["wait_seconds_total"] / stats["requests"], 3) if stats["requests"] else 0.0
+        stats["wait_seconds_total"] = round(stats["wait_seconds_total"], 3)
+        stats["wait_seconds_max"] = round(stats["wait_seconds_max"], 3)
+        return stats
+
+    def _for_key(self, api_key: str) -> KeyLimiter:
+        # Keyed by a digest so the key itself is never stored
+        digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        with self._lock:
+            if digest not in self._limiters:
+                self._limiters[digest] = KeyLimiter(
+                    settings.AI_RPM_PER_KEY, settings.AI_TPM_PER_KEY, settings.AI_MAX_CONCURRENCY_PER_KEY
+                )
+            return self._limiters[digest]
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time()) if when else None
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
@@ -0,0 +1,74 @@
+"""
+Status Snapshots — versioned, cached `/run-status` responses.
+A job's `version` (bumped by the job store on every save) plus its log size
+identify a snapshot. The validated and serialized `RunStatusResponse` is
+cached per snapshot, so polling an idle job skips pydantic validation and
+JSON encoding. The same key is sent as the ETag, which lets clients get a
+304, and `wait_for_version` turns a poll into a long-poll.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from models.schemas import RunStatusResponse
+from services.job_events import event_bus
+from services.job_store import TERMINAL_STATUSES, JobStore
+
+CACHE_MAX_ENTRIES = 1024
+LONG_POLL_MAX_SECONDS = 30.0
+LONG_POLL_RECHECK = 2.0
+
+
+def snapshot_etag(job: Dict, log_size: int) -> str:
+    return f'W/"{job.get("version", 0)}-{log_size}"'
+
+
+class StatusSnapshotCache:
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, job_id: str, etag: str, build: Callable[[], Dict]) -> bytes:
+        """Returns the serialized snapshot for `etag`, rendering it on a miss."""
+        with self._lock:
+            cached = self._entries.get(job_id)
+            if cached and cached[0] == etag:
+                self._entries.move_to_end(job_id)
+                return cached[1]
+
+        body = RunStatusResponse.model_validate(build()).model_dump_json().encode("utf-8")
+        with self._lock:
+            self._entries[job_id] = (etag, body)
+            self._entries.move_to_end(job_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+
+async def wait_for_job_version(job_store: JobStore, job_id: str, version: int, timeout: float) -> Optional[Dict]:
+    """
+    Waits until the job's version exceeds `version`, the job is terminal or
+    `timeout` elapses, then returns the current job (None if it vanished).
+    Wakes on status events and re-checks the store periodically.
+    """
+    timeout = max(0.0, min(timeout, LONG_POLL_MAX_SECONDS))
+    deadline = time.monotonic() + timeout
+    sub = event_bus.subscribe(job_id)
+    try:
+        while True:
+            job = job_store.get(job_id)
+            if job is None or job.get("version", 0) > version or job.get("status") in TERMINAL_STATUSES:
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return job
+            try:
+                await asyncio.wait_for(sub.queue.get(), timeout=min(remaining, LONG_POLL_RECHECK))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        event_bus.unsubscribe(job_id, sub)
@@ -0,0 +1,225 @@
+"""
+Symbol Index — per-job map of Python definitions to files and line spans.
+When an assertion names a `source function`, the controller used to walk the
+whole repository and read every non-test `.py` file, once per error and per
+iteration. `SymbolIndex` parses the repository once, on first use. It
+records every function, method and class as (name, kind, file, start, end,
+signature). After that, lookups are dictionary hits.
+
+Parsing fans out over a long-lived process pool for repositories of
+PARALLEL_MIN_FILES or more files. `start_parse_pool()` forks its workers at
+API startup, before any job threads exist; forking later would copy locks
+held by those threads into the children. Spawned workers are not an option
+either, since they re-import the entry script (`python main.py`). Smaller
+repositories, or processes that never started the pool, parse inline. Files that don't parse (the syntax error being fixed, say) fall back
+to a line scan for `def`/`class`. After a fix rewrites files, the controller
+calls `update()` for just those paths. `FixAgent` uses the same index for the
+signatures of symbols defined in other files.
+"""
+
+import ast
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+from services.code_context import python_signature
+
+logger = logging.getLogger(__name__)
+
+PARALLEL_MIN_FILES = 64
+MAX_FILE_BYTES = 2 * 1024 * 1024
+SKIP_DIRS = {".git", ".fixora", "node_modules", "__pycache__", ".venv", "venv", "env", ".tox", "site-packages", "build", "dist"}
+DEF_LINE = re.compile(r"^[ \t]*(?:async[ \t]+)?(def|class)[ \t]+(\w+)", re.MULTILINE)
+
+
+class Symbol:
+    __slots__ = ("name", "kind", "file", "start", "end", "signature")
+
+    def __init__(self, name: str, kind: str, file: str, start: int, end: int, signature: str):
+        self.name = name
+        self.kind = kind
+        self.file = file
+        self.start = start
+        self.end = end
+        self.signature = signature
+
+    @property
+    def is_test(self) -> bool:
+        return is_test_file(self.file)
+
+
+def is_test_file(path: str) -> bool:
+    base = os.path.basename(path)
+    return base.startswith("test_") or "_test." in base
+
+
+class SymbolIndex:
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self._by_name: Dict[str, List[Symbol]] = {}
+        self._by_file: Dict[str, List[Symbol]] = {}
+        self._built = False
+        self._lock = threading.RLock()
+
+    def definitions(self, name: str, include_tests: bool = False) -> List[Symbol]:
+        """Every definition of `name`, in path order."""
+        self._ensure_built()
+        with self._lock:
+            found = list(self._by_name.get(name, []))
+        return [s for s in found if include_tests or not s.is_test]
+
+    def definition(self, name: str) -> Optional[Symbol]:
+        """The first non-test definition of `name`, or None."""
+        found = self.definitions(name)
+        return found[0] if found else None
+
+    def update(self, paths: Iterable[str]):
+        """Re-indexes files (repo-relative) after they changed; deleted files drop out."""
+        with self._lock:
+            if not self._built:
+                return   # the first query will index the current tree anyway
+            for rel in paths:
+                if not rel.endswith(".py"):
+                    continue
+                full = os.path.join(self.repo_path, rel)
+                entries = _parse_file(full) if os.path.exists(full) else []
+                self._replace(rel, entries)
+            self._resort()
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return sum(len(v) for v in self._by_file.values())
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _ensure_built(self):
+        with self._lock:
+            if not self._built:
+                self._build()
+                self._built = True
+
+    def _build(self):
+        files = sorted(self._python_files())
+        full_paths = [os.path.join(self.repo_path, f) for f in files]
+        results = None
+        if len(files) >= PARALLEL_MIN_FILES:
+            results = self._parse_parallel(full_paths)
+        if results is None:
+            results = [_parse_file(p) for p in full_paths]
+        for rel, entries in zip(files, results):
+            self._replace(rel, entries)
+        self._resort()
+        logger.info(f"SymbolIndex: Indexed {self.size} symbols in {len(files)} files")
+
+    def _parse_parallel(self, paths: List[str]) -> Optional[List[List[Tuple]]]:
+        global _pool
+        pool = _pool
+        if pool is None:
+            return None
+        workers = settings.SYMBOL_INDEX_WORKERS or os.cpu_count() or 1
+        try:
+            return list(pool.map(_parse_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+        except Exception as e:
+            logger.warning(f"SymbolIndex: Parallel parse failed ({type(e).__name__}); parsing inline")
+            if isinstance(e, BrokenProcessPool):
+                with _pool_lock:
+                    if _pool is pool:
+                        _pool = None
+            return None
+
+    def _python_files(self) -> List[str]:
+        found = []
+        for root, dirs, files in os.walk(self.repo_path):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            for name in files:
+                if name.endswith(".py"):
+                    found.append(os.path.relpath(os.path.join(root, name), self.repo_path))
+        return found
+
+    def _replace(self, rel: str, entries: List[Tuple]):
+        for old in self._by_file.pop(rel, []):
+            bucket = self._by_name.get(old.name, [])
+            if old in bucket:
+                bucket.remove(old)
+            if not bucket:
+                self._by_name.pop(old.name, None)
+        symbols = [Symbol(name, kind, rel, start, end, sig) for name, kind, start, end, sig in entries]
+        if symbols:
+            self._by_file[rel] = symbols
+        for symbol in symbols:
+            self._by_name.setdefault(symbol.name, []).append(symbol)
+
+    def _resort(self):
+        for bucket in self._by_name.values():
+            bucket.sort(key=lambda s: (s.file, s.start))
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def start_parse_pool() -> bool:
+    """
+    Forks the parser workers (SYMBOL_INDEX_WORKERS, default one per CPU).
+    Call once at startup while the process is still single-threaded.
+    Returns False when parsing stays inline.
+    """
+    global _pool
+    workers = settings.SYMBOL_INDEX_WORKERS or os.cpu_count() or 1
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return False
+    with _pool_lock:
+        if _pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+            pool.submit(_parse_file, "").result()   # forks every worker now rather than on first use
+            _pool = pool
+            logger.info(f"SymbolIndex: Started {workers} parser worker(s)")
+    return True
+
+
+def shutdown_parse_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_file(path: str) -> List[Tuple[str, str, int, int, str]]:
+    """(name, kind, start, end, signature) for every def/class in one file. Runs in pool workers."""
+    try:
+        if os.path.getsize(path) > MAX_FILE_BYTES:
+            return []
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            source = f.read()
+    except OSError:
+        return []
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return [
+            (m.group(2), "class" if m.group(1) == "class" else "function",
+             source.count("\n", 0, m.start()) + 1, source.count("\n", 0, m.start()) + 1, m.group(0).strip())
+            for m in DEF_LINE.finditer(source)
+        ]
+
+    entries = []
+
+    def visit(node: ast.AST, owner: str):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                kind = "class" if isinstance(child, ast.ClassDef) else "function"
+                entries.append((child.name, kind, child.lineno, child.end_lineno, python_signature(child, owner)))
+                visit(child, child.name if kind == "class" else "")
+            else:
+                visit(child, owner)
+
+    visit(tree, "")
+    return entries
@@ -0,0 +1,251 @@
+"""
+Test Reports — machine-readable test results ahead of log scraping.
+`with_report_flags` asks the runner for a structured report in
+`.fixora/reports/`: pytest `--junitxml`, jest `--json --outputFile`. Gradle
+and Maven already write surefire-style XML. `collect` then reads every report
+written by the current run and returns ErrorDetail dicts directly, so
+`ErrorAgent` only falls back to the AI / regex parsers when a run produced
+no report (compile errors, unknown runners).
+
+JUnit XML is read with `iterparse` and each <testcase> is cleared once it is
+handled, so reports with thousands of tests stay cheap. `.fixora/` is added
+to the workspace's `.git/info/exclude` so reports never end up in fix commits.
+"""
+
+import glob
+import json
+import logging
+import os
+import re
+import uuid
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+from services.dependency_cache import unwrap_shell
+
+logger = logging.getLogger(__name__)
+
+REPORT_DIR = ".fixora/reports"
+MAX_REPORTED_ERRORS = 200
+JUNIT_REPORT_GLOBS = {
+    "python": [f"{REPORT_DIR}/pytest-*.xml"],
+    "java_gradle": ["**/build/test-results/**/TEST-*.xml"],
+    "java_maven": ["**/target/surefire-reports/TEST-*.xml"],
+}
+JEST_REPORT_GLOB = f"{REPORT_DIR}/jest-*.json"
+
+PY_FRAME = re.compile(r"^([^\s:][^:\n]*\.py):(\d+): (\w+(?:Error|Exception|Exit)?)", re.MULTILINE)
+PY_FILE_LINE = re.compile(r'File "([^"]+)", line (\d+)')
+PY_RAISED = re.compile(r"^E?\s*(\w+(?:Error|Exception)): (.*)$", re.MULTILINE)
+PY_WHERE = re.compile(r"\+\s+where .+ = (\w+)\(")
+JAVA_FRAME = re.compile(r"at ([\w.$]+)\.[\w$<>]+\(([\w$]+\.(?:java|kt)):(\d+)\)")
+JAVA_FRAMEWORK = ("java.", "javax.", "jdk.", "sun.", "org.junit.", "org.opentest4j.", "org.gradle.",
+                  "org.apache.maven.", "junit.", "org.assertj.", "org.hamcrest.", "org.mockito.")
+JS_FRAME = re.compile(r"\(?((?:/[^\s():]+|[\w.][^\s():]*)\.[cm]?[jt]sx?):(\d+):\d+\)?")
+
+
+def prepare(repo_path: str):
+    """Clears reports from earlier runs and keeps `.fixora/` out of git."""
+    report_dir = os.path.join(repo_path, REPORT_DIR)
+    os.makedirs(report_dir, exist_ok=True)
+    for name in os.listdir(report_dir):
+        try:
+            os.remove(os.path.join(report_dir, name))
+        except OSError:
+            pass
+    exclude = os.path.join(repo_path, ".git", "info", "exclude")
+    try:
+        existing = open(exclude, encoding="utf-8").read() if os.path.exists(exclude) else ""
+        if ".fixora/" not in existing.splitlines():
+            os.makedirs(os.path.dirname(exclude), exist_ok=True)
+            with open(exclude, "a", encoding="utf-8") as fh:
+                fh.write(("" if existing.endswith("\n") or not existing else "\n") + ".fixora/\n")
+    except OSError as e:
+        logger.warning(f"TestReports: Could not update {exclude}: {e}")
+
+
+def with_report_flags(stack_info: Dict, command: str) -> str:
+    """Appends the flags that make the runner write a report; unknown runners are left alone."""
+    command = unwrap_shell(command)
+    if re.search(r"[;|]", command) or command.strip() == ":":
+        return command
+    name = uuid.uuid4().hex[:12]
+    language = stack_info.get("language", "")
+    if language == "python" and re.search(r"\bpytest\b", command):
+        return f"{command} --junitxml={REPORT_DIR}/pytest-{name}.xml"
+    if language == "javascript" and ("jest" in command or stack_info.get("test_framework") == "jest"):
+        flags = f"--json --outputFile={REPORT_DIR}/jest-{name}.json"
+        if re.match(r"(npm|yarn)( run)? test\b", command.split("&&")[-1].strip()) and " -- " not in f"{command} ":
+            return f"{command} -- {flags}"
+        return f"{command} {flags}"
+    return command
+
+
+def collect(stack_info: Dict, repo_path: str, since: float = 0.0) -> Optional[List[Dict]]:
+    """
+    Returns ErrorDetail dicts for every failed test in reports written since `since`,
+    or None when the run left no report behind.
+    """
+    language = stack_info.get("language", "")
+    paths = []
+    for pattern in JUNIT_REPORT_GLOBS.get(language, []):
+        paths += [("junit", p) for p in glob.glob(os.path.join(repo_path, pattern), recursive=True)]
+    if language == "javascript":
+        paths += [("jest", p) for p in glob.glob(os.path.join(repo_path, JEST_REPORT_GLOB))]
+
+    errors: List[Dict] = []
+    found = False
+    for kind, path in sorted(paths):
+        try:
+            if os.path.getmtime(path) < since:
+                continue
+            if kind == "junit":
+                errors += _parse_junit(path, repo_path, language)
+            else:
+                errors += _parse_jest(path, repo_path)
+            found = True
+        except (OSError, ET.ParseError, ValueError) as e:
+            logger.warning(f"TestReports: Skipping unreadable report {path}: {e}")
+    if not found:
+        return None
+    logger.info(f"TestReports: {len(errors)} failures from {len(paths)} report(s)")
+    return errors[:MAX_REPORTED_ERRORS]
+
+
+# ── JUnit XML ────────────────────────────────────────────────────────────────
+
+def _parse_junit(path: str, repo_path: str, language: str) -> List[Dict]:
+    errors = []
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag != "testcase":
+            continue
+        problem = elem.find("failure")
+        if problem is None:
+            problem = elem.find("error")
+        if problem is not None:
+            detail = (_python_case if language == "python" else _java_case)(elem, problem, repo_path)
+            if detail:
+                errors.append(detail)
+        elem.clear()
+    return errors
+
+
+def _python_case(case, problem, repo_path: str) -> Optional[Dict]:
+    text = problem.text or ""
+    message = (problem.get("message") or "").strip()
+    raised = PY_RAISED.findall(text)
+    located = PY_FILE_LINE.findall(text)
+    frames = PY_FRAME.findall(text)
+
+    if raised and raised[-1][0] in ("SyntaxError", "IndentationError") and located:
+        # Collection error: the offending file is in the `File "...", line N` frame
+        (file, line), (exc, detail) = located[-1], raised[-1]
+        message = f"{exc}: {detail.strip()}"
+    elif frames:
+        file, line, exc = frames[-1]
+    else:
+        file = case.get("file") or case.get("classname", "").replace(".", "/") + ".py"
+        line, exc = case.get("line") or 0, problem.get("type") or ""
+
+    first_line = message.splitlines()[0] if message else exc
+    kind = _classify(exc or first_line)
+    if kind == "LOGIC" and ("assert" in message or "AssertionError" in exc):
+        message = f"Assertion failed: {first_line}"
+        where = PY_WHERE.search(text)
+        if where:
+            message += f" (source function: {where.group(1)})"
+    elif exc and not first_line.startswith(exc):
+        message = f"{exc}: {first_line}"
+    else:
+        message = first_line
+    return {"file": _relative(file, repo_path), "line": int(line), "type": kind, "message": message[:500]}
+
+
+def _java_case(case, problem, repo_path: str) -> Optional[Dict]:
+    text = problem.text or ""
+    exc = problem.get("type") or ""
+    raw = (problem.get("message") or exc).strip()
+    message = raw.splitlines()[0] if raw else ""
+    file, line = "", 0
+    for cls, filename, lineno in JAVA_FRAME.findall(text):
+        if not cls.startswith(JAVA_FRAMEWORK):
+            file, line = _java_source(cls, filename, repo_path), int(lineno)
+            break
+    if not file:
+        cls = case.get("classname", "")
+        file = _java_source(cls, cls.split(".")[-1] + ".java", repo_path)
+    return {
+        "file": file,
+        "line": line,
+        "type": _classify(exc),
+        "message": f"{case.get('classname', '')}.{case.get('name', '')}: {message}"[:500],
+    }
+
+
+def _java_source(cls: str, filename: str, repo_path: str) -> str:
+    package = cls.split("$")[0].rsplit(".", 1)[0] if "." in cls else ""
+    rel = "/".join(package.split(".") + [filename]) if package else filename
+    matches = glob.glob(os.path.join(repo_path, "**", rel), recursive=True)
+    return _relative(matches[0], repo_path) if matches else rel
+
+
+# ── Jest JSON ────────────────────────────────────────────────────────────────
+
+def _parse_jest(path: str, repo_path: str) -> List[Dict]:
+    with open(path, encoding="utf-8", errors="replace") as fh:
+        report = json.load(fh)
+    errors = []
+    for suite in report.get("testResults", []):
+        suite_file = _relative(suite.get("name", ""), repo_path)
+        failed = [a for a in suite.get("assertionResults", []) if a.get("status") == "failed"]
+        if not failed and suite.get("status") == "failed":
+            # Suite failed to run at all (syntax / import errors)
+            text = suite.get("message") or ""
+            file, line = _js_location(text, repo_path) or (suite_file, 0)
+            errors.append({"file": file, "line": line, "type": _classify(text), "message": _first_line(text)})
+            continue
+        for assertion in failed:
+            text = "\n".join(assertion.get("failureMessages") or [])
+            file, line = _js_location(text, repo_path) or (suite_file, (assertion.get("location") or {}).get("line", 0))
+            errors.append({
+                "file": file,
+                "line": int(line or 0),
+                "type": _classify(text) if "Error:" in _first_line(text) and "expect(" not in text else "LOGIC",
+                "message": f"{assertion.get('fullName', '')}: {_first_line(text)}"[:500],
+            })
+    return errors
+
+
+def _js_location(text: str, repo_path: str):
+    for file, line in JS_FRAME.findall(text):
+        if "node_modules" not in file and not file.startswith("node:"):
+            return _relative(file, repo_path), int(line)
+    return None
+
+
+# ── Helpers ──────────────────────────────────────────────────────────────────
+
+def _relative(path: str, repo_path: str) -> str:
+    path = path.replace("\\", "/")
+    root = repo_path.replace("\\", "/").rstrip("/") + "/"
+    if path.startswith("/app/"):
+        return path[len("/app/"):]
+    if path.startswith(root):
+        return path[len(root):]
+    return path
+
+
+def _first_line(text: str) -> str:
+    for line in re.sub(r"\x1b\[[0-9;]*m", "", text).splitlines():
+        if line.strip():
+            return line.strip()[:300]
+    return ""
+
+
+def _classify(text: str) -> str:
+    text = text.upper()
+    if "SYNTAX" in text:       return "SYNTAX"
+    if "INDENTATION" in text:  return "INDENTATION"
+    if "IMPORT" in text or "MODULE" in text or "CLASSNOTFOUND" in text or "NOCLASSDEF" in text: return "IMPORT"
+    if "TYPEERROR" in text or "NAMEERROR" in text or "CLASSCAST" in text: return "TYPE_ERROR"
+    return "LOGIC"
@@ -0,0 +1,98 @@
+"""
+Test Selection — failing-test extraction and targeted rerun commands.
+After a run, `failing_tests` collects the IDs of the tests that failed:
+pytest node IDs from the short summary, jest test files from `FAIL` lines,
+and `Class#method` pairs from JUnit XML reports (Gradle / Maven). The XML
+reports are read only if they were written by the current run.
+`rerun_command` turns those IDs into a command that reruns only those tests.
+The controller uses it for the next iteration and runs the full suite again
+once the subset passes.
+"""
+
+import glob
+import logging
+import os
+import re
+import shlex
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+from services.dependency_cache import unwrap_shell
+
+logger = logging.getLogger(__name__)
+
+MAX_SELECTED_TESTS = 200
+
+PYTEST_FAILED = re.compile(r"^(?:FAILED|ERROR) (\S+::\S+?)(?: - .*)?$", re.MULTILINE)
+PYTEST_VERBOSE_FAILED = re.compile(r"^(\S+::\S+) (?:FAILED|ERROR)\b", re.MULTILINE)
+JEST_FAILED = re.compile(r"^\s*FAIL\s+(\S+\.[cm]?[jt]sx?)\b", re.MULTILINE)
+
+JUNIT_REPORT_GLOBS = {
+    "java_gradle": ["**/build/test-results/**/TEST-*.xml"],
+    "java_maven": ["**/target/surefire-reports/TEST-*.xml"],
+}
+
+
+def failing_tests(logs: str, stack_info: Dict, repo_path: str = None, since: float = 0.0) -> List[str]:
+    """Returns the IDs of the tests that failed in this run, de-duplicated in order."""
+    language = stack_info.get("language", "")
+    if language == "python":
+        found = PYTEST_FAILED.findall(logs) + PYTEST_VERBOSE_FAILED.findall(logs)
+    elif language == "javascript":
+        found = JEST_FAILED.findall(logs)
+    elif language in JUNIT_REPORT_GLOBS and repo_path:
+        found = _junit_failures(repo_path, JUNIT_REPORT_GLOBS[language], since)
+    else:
+        found = []
+    return list(dict.fromkeys(found))
+
+
+def rerun_command(stack_info: Dict, test_ids: List[str], max_tests: int = MAX_SELECTED_TESTS) -> Optional[str]:
+    """
+    Builds a command running only `test_ids`, or None when the stack (or a
+    compound test command) can't be narrowed safely.
+    """
+    test_cmd = unwrap_shell(stack_info.get("test_command") or "")
+    if not test_ids or not test_cmd or len(test_ids) > max_tests:
+        return None
+    # Arguments appended to `a && b` reach `b`; pipes and `;` make that ambiguous
+    if re.search(r"[;|]", test_cmd):
+        return None
+
+    language = stack_info.get("language", "")
+    quoted = " ".join(shlex.quote(t) for t in test_ids)
+    if language == "python":
+        return f"{test_cmd} {quoted}"
+    if language == "javascript":
+        if test_cmd.startswith(("npm test", "npm run test", "yarn test")) and " -- " not in f"{test_cmd} ":
+            return f"{test_cmd} -- {quoted}"
+        return f"{test_cmd} {quoted}"
+    if language == "java_gradle":
+        return test_cmd + "".join(f" --tests {shlex.quote(t.replace('#', '.'))}" for t in test_ids)
+    if language == "java_maven":
+        selector = ",".join(test_ids)
+        return (
+            f"{test_cmd} -Dtest={shlex.quote(selector)}"
+            " -DfailIfNoTests=false -Dsurefire.failIfNoSpecifiedTests=false"
+        )
+    return None
+
+
+def _junit_failures(repo_path: str, patterns: List[str], since: float) -> List[str]:
+    found = []
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(repo_path, pattern), recursive=True):
+            try:
+                if os.path.getmtime(path) < since:
+                    continue  # stale report from an earlier run
+                root = ET.parse(path).getroot()
+            except (OSError, ET.ParseError) as e:
+                logger.warning(f"TestSelection: Skipping unreadable report {path}: {e}")
+                continue
+            for case in root.iter("testcase"):
+                if case.find("failure") is not None or case.find("error") is not None:
+                    classname = case.get("classname", "")
+                    name = re.sub(r"\(.*\)$", "", case.get("name", ""))
+                    if classname and name:
+                        found.append(f"{classname}#{name}")
+    return found
@@ -0,0 +1,190 @@
+"""
+Test Sharding — split large suites across concurrent containers/processes.
+`TestSharder.run` discovers the suite's test files (pytest modules, jest
+specs) and splits them into shards with longest-processing-time-first
+packing. Packing uses per-file durations remembered from earlier runs of the
+same repository. It runs the dependency install once, runs the shards
+concurrently (each through the normal executor, so each gets its own pooled
+container or local process), and merges the results into the same
+{success, exit_code, logs} shape a single run produces.
+
+Durations are stored as JSON under TEST_TIMINGS_DIR. Pytest shards report
+real per-file times via `--durations=0`. For other runners the shard's wall
+time is split across its files in proportion to their estimates. Stacks
+that can't be split by file (Gradle/Maven, syntax-check commands) return
+None, and the caller runs the suite unsharded.
+"""
+
+import fnmatch
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from config import settings
+from services.test_selection import rerun_command
+
+logger = logging.getLogger(__name__)
+
+MIN_FILES_PER_SHARD = 2
+MAX_FILES_PER_SHARD = 2000
+DEFAULT_DURATION = 1.0
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv", "build", "dist", "target", ".fixora"}
+TEST_FILE_PATTERNS = {
+    "python": ["test_*.py", "*_test.py"],
+    "javascript": ["*.test.js", "*.test.jsx", "*.test.ts", "*.test.tsx", "*.spec.js", "*.spec.jsx", "*.spec.ts", "*.spec.tsx"],
+}
+PYTEST_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)s (?:setup|call|teardown)\s+([^\s:]+)::", re.MULTILINE)
+
+RunCommand = Callable[[str, Optional[Callable[[str], None]]], Dict]
+
+
+def partition(files: List[str], durations: Dict[str, float], shards: int) -> List[List[str]]:
+    """Longest-processing-time-first packing of files into `shards` balanced groups."""
+    known = sorted(durations[f] for f in files if f in durations)
+    fallback = known[len(known) // 2] if known else DEFAULT_DURATION
+    weighted = sorted(((durations.get(f, fallback), f) for f in files), reverse=True)
+
+    heap = [(0.0, i) for i in range(shards)]
+    groups: List[List[str]] = [[] for _ in range(shards)]
+    for cost, path in weighted:
+        load, i = heapq.heappop(heap)
+        groups[i].append(path)
+        heapq.heappush(heap, (load + cost, i))
+    return [sorted(g) for g in groups if g]
+
+
+class TestSharder:
+    def __init__(self, timings_dir: str = None):
+        self.timings_dir = timings_dir or settings.TEST_TIMINGS_DIR
+        self._lock = threading.Lock()
+
+    def shard_count(self, files: List[str]) -> int:
+        cores = os.cpu_count() or 1
+        return max(1, min(settings.TEST_SHARDS, cores, len(files) // MIN_FILES_PER_SHARD))
+
+    def discover(self, stack_info: Dict, repo_path: str) -> List[str]:
+        """Test files relative to the repository root (where test commands run)."""
+        patterns = TEST_FILE_PATTERNS.get(stack_info.get("language", ""))
+        if not patterns:
+            return []
+        root = os.path.join(repo_path, stack_info.get("project_root", "."))
+        found = []
+        for dirpath, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            for name in files:
+                if any(fnmatch.fnmatch(name, p) for p in patterns):
+                    found.append(os.path.relpath(os.path.join(dirpath, name), repo_path).replace(os.sep, "/"))
+        return sorted(found)
+
+    def run(
+        self,
+        stack_info: Dict,
+        repo_path: str,
+        run_command: RunCommand,
+        timings_key: str,
+        on_output: Callable[[str], None] = None,
+    ) -> Optional[Dict]:
+        """
+        Runs the suite in shards. `run_command(test_command, on_output)` executes one
+        command through the dependency plan and executor. Returns None when the
+        suite should run unsharded.
+        """
+        if settings.TEST_SHARDS <= 1:
+            return None
+        files = self.discover(stack_info, repo_path)
+        count = self.shard_count(files)
+        if count <= 1:
+            return None
+        durations = self._load(timings_key)
+        groups = partition(files, durations, count)
+        commands = [rerun_command(stack_info, group, max_tests=MAX_FILES_PER_SHARD) for group in groups]
+        if not all(commands):
+            return None
+        if stack_info.get("language") == "python":
+            commands = [f"{c} --durations=0" for c in commands]
+
+        # Install once up front, so the shards don't race on the dependency marker
+        setup = run_command(":", on_output)
+        if not setup["success"] or setup.get("infra_error"):
+            return setup
+
+        logger.info(f"TestSharder: Running {len(files)} test files in {len(groups)} shards")
+        if on_output:
+            on_output(f"Running {len(files)} test files in {len(groups)} parallel shards...\n")
+
+        def run_shard(index: int) -> Dict:
+            started = time.time()
+            result = run_command(commands[index], None)
+            result["elapsed"] = time.time() - started
+            if on_output:
+                on_output(
+                    f"── Shard {index + 1}/{len(groups)} ({len(groups[index])} files, "
+                    f"{result['elapsed']:.1f}s, exit {result['exit_code']}) ──\n{result['logs']}\n"
+                )
+            return result
+
+        with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="fixora-shard") as pool:
+            results = list(pool.map(run_shard, range(len(groups))))
+
+        self._record(timings_key, groups, results, durations)
+        return self._merge(groups, results)
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _merge(self, groups: List[List[str]], results: List[Dict]) -> Dict:
+        failed = [r for r in results if not r["success"]]
+        logs = "\n".join(
+            f"── Shard {i + 1}/{len(groups)}: {' '.join(group)} ──\n{r['logs']}"
+            for i, (group, r) in enumerate(zip(groups, results))
+        )
+        return {
+            "success": not failed,
+            "exit_code": failed[0]["exit_code"] if failed else 0,
+            "logs": logs,
+            "infra_error": any(r.get("infra_error") for r in results),
+            "aborted_reason": next((r["aborted_reason"] for r in results if r.get("aborted_reason")), None),
+        }
+
+    def _record(self, timings_key: str, groups: List[List[str]], results: List[Dict], previous: Dict[str, float]):
+        measured: Dict[str, float] = {}
+        for group, result in zip(groups, results):
+            if result.get("aborted_reason") or result.get("infra_error"):
+                continue
+            per_file: Dict[str, float] = {}
+            for seconds, path in PYTEST_DURATION.findall(result["logs"]):
+                per_file[path] = per_file.get(path, 0.0) + float(seconds)
+            if not per_file:
+                # No per-test timings: split wall time by the previous estimates
+                estimates = {f: previous.get(f, DEFAULT_DURATION) for f in group}
+                total = sum(estimates.values()) or 1.0
+                per_file = {f: result["elapsed"] * est / total for f, est in estimates.items()}
+            measured.update({f: t for f, t in per_file.items() if f in group})
+
+        with self._lock:
+            durations = self._load(timings_key)
+            for path, seconds in measured.items():
+                old = durations.get(path)
+                durations[path] = round(seconds if old is None else (old + seconds) / 2, 3)
+            os.makedirs(self.timings_dir, exist_ok=True)
+            tmp = f"{self._path(timings_key)}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(durations, fh, sort_keys=True)
+            os.replace(tmp, self._path(timings_key))
+
+    def _load(self, timings_key: str) -> Dict[str, float]:
+        try:
+            with open(self._path(timings_key), encoding="utf-8") as fh:
+                return {k: float(v) for k, v in json.load(fh).items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _path(self, timings_key: str) -> str:
+        digest = hashlib.sha1(timings_key.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.timings_dir, f"{digest}.json")
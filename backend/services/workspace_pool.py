@@ -0,0 +1,224 @@
+"""
+Workspace Pool — reusable per-repository checkouts plus a background reaper.
+Instead of cloning into a fresh directory and `rmtree`-ing it after every job,
+a leased workspace is recycled with
+`git fetch <mirror> && git checkout -f -B <default> && git clean -fdx`,
+keeping dependency directories (WORKSPACE_KEEP_DIRS) so installs stay warm.
+
+Any deletion that is still needed (throwaway workspaces, evicted or broken
+pool entries) is handed to `Reaper`. The reaper renames the directory into a
+trash folder at once and deletes it on a daemon thread, so filesystem
+teardown never sits on a job's critical path.
+"""
+
+import logging
+import os
+import queue
+import shutil
+import stat
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import git
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process leasing only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LAST_USED_MARKER = "FIXORA_LAST_USED"
+
+
+def remove_tree(path: str):
+    """rmtree with chmod-on-error and retries for Windows file locks."""
+    if not os.path.exists(path):
+        return
+
+    # Close any git handles to prevent locking on Windows
+    try:
+        repo = git.Repo(path)
+        repo.close()
+    except:
+        pass
+
+    def on_rm_error(func, fpath, exc_info):
+        try:
+            os.chmod(fpath, stat.S_IWRITE)
+            func(fpath)
+        except:
+            pass
+
+    # Robust retry for Windows file locks
+    for i in range(3):
+        try:
+            shutil.rmtree(path, onerror=on_rm_error)
+            if not os.path.exists(path):
+                return
+        except:
+            time.sleep(0.5)
+
+
+class Reaper:
+    """Deletes directories off the critical path on a daemon thread."""
+
+    def __init__(self, trash_dir: str):
+        self.trash_dir = trash_dir
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        os.makedirs(trash_dir, exist_ok=True)
+        # Anything left over from a previous process is garbage
+        for name in os.listdir(trash_dir):
+            self._queue.put(os.path.join(trash_dir, name))
+        if not self._queue.empty():
+            self._ensure_thread()
+
+    def reap(self, path: str):
+        if not os.path.exists(path):
+            return
+        target = path
+        try:
+            target = os.path.join(self.trash_dir, uuid.uuid4().hex)
+            os.rename(path, target)
+        except OSError:
+            # Cross-device or locked (Windows) — delete in place later
+            target = path
+        self._ensure_thread()
+        self._queue.put(target)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="fixora-reaper", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            started = time.time()
+            remove_tree(path)
+            logger.info(f"Reaper: Removed {path} in {time.time() - started:.1f}s")
+
+
+class WorkspacePool:
+    def __init__(self, root: str, reaper: Reaper, per_repo: int, max_total: int, keep_dirs: List[str]):
+        self.root = root
+        self.reaper = reaper
+        self.per_repo = max(1, per_repo)
+        self.max_total = max(1, max_total)
+        self.keep_dirs = keep_dirs
+        self._leases: Dict[str, object] = {}   # path -> lock file handle (or True)
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def owns(self, path: str) -> bool:
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.root)
+
+    def acquire(self, mirror_path: str, auth_url: str) -> Optional[str]:
+        """
+        Leases a workspace for the mirror's repository, reset to its default
+        branch. Returns None when every pooled slot for the repo is busy.
+        """
+        key = os.path.basename(mirror_path)[:-len(".git")] if mirror_path.endswith(".git") else os.path.basename(mirror_path)
+        for slot in range(self.per_repo):
+            path = os.path.join(self.root, f"{key}-{slot}")
+            if not self._try_lease(path):
+                continue
+            try:
+                if os.path.exists(os.path.join(path, ".git")):
+                    started = time.time()
+                    self._reset(path, mirror_path, auth_url)
+                    logger.info(f"WorkspacePool: Recycled {os.path.basename(path)} in {time.time() - started:.2f}s")
+                else:
+                    self._create(path, mirror_path, auth_url)
+            except Exception as e:
+                logger.warning(f"WorkspacePool: Could not prepare {os.path.basename(path)} ({type(e).__name__}), rebuilding")
+                try:
+                    self.reaper.reap(path)
+                    self._create(path, mirror_path, auth_url)
+                except Exception:
+                    self.release(path)
+                    raise
+            self._touch(path)
+            self._evict_idle()
+            return path
+        return None
+
+    def release(self, path: str):
+        with self._lock:
+            handle = self._leases.pop(path, None)
+        if handle is not None and handle is not True:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+            finally:
+                handle.close()
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _try_lease(self, path: str) -> bool:
+        with self._lock:
+            if path in self._leases:
+                return False
+            handle = True
+            if fcntl is not None:
+                handle = open(f"{path}.lease", "w")
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    handle.close()
+                    return False  # leased by another process
+            self._leases[path] = handle
+            return True
+
+    def _create(self, path: str, mirror_path: str, auth_url: str):
+        repo = git.Repo.clone_from(mirror_path, path)
+        repo.remote("origin").set_url(auth_url)
+        repo.close()
+
+    def _reset(self, path: str, mirror_path: str, auth_url: str):
+        repo = git.Repo(path)
+        g = repo.git
+        try:
+            g.remote("set-url", "origin", auth_url)
+            g.fetch("--prune", "--quiet", mirror_path, "+refs/heads/*:refs/remotes/origin/*")
+            default_ref = git.Git(mirror_path).symbolic_ref("HEAD")   # refs/heads/<default>
+            default = default_ref.split("refs/heads/", 1)[-1]
+            g.checkout("-f", "-B", default, f"origin/{default}")
+            g.clean("-fdx", *[f"--exclude={d}" for d in self.keep_dirs])
+            # Drop branches left behind by earlier jobs
+            stale = [b for b in g.for_each_ref("refs/heads", format="%(refname:short)").splitlines() if b and b != default]
+            if stale:
+                g.branch("-D", *stale)
+        finally:
+            repo.close()
+
+    def _touch(self, path: str):
+        marker = f"{path}.{LAST_USED_MARKER}"
+        with open(marker, "a"):
+            pass
+        os.utime(marker, None)
+
+    def _evict_idle(self):
+        """Keeps the pool at WORKSPACE_POOL_MAX entries by reaping the least recently used idle ones."""
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            marker = f"{path}.{LAST_USED_MARKER}"
+            if os.path.isdir(path) and os.path.exists(marker):
+                entries.append((os.path.getmtime(marker), path))
+        excess = len(entries) - self.max_total
+        for _, path in sorted(entries):
+            if excess <= 0:
+                break
+            if not self._try_lease(path):
+                continue
+            try:
+                self.reaper.reap(path)
+                os.remove(f"{path}.{LAST_USED_MARKER}")
+                excess -= 1
+            finally:
+                self.release(path)
@@ -0,0 +1,6 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FIXORA_DATA_DIR", tempfile.mkdtemp(prefix="fixora-tests-"))
@@ -0,0 +1,82 @@
+import pytest
+
+from services.code_context import WHOLE_FILE_LINES, build_context
+from services.patching import Hunk, PatchError
+
+
+def filler(count, prefix="pad"):
+    return "".join(f"\n\ndef {prefix}_{i}(x):\n    return x + {i}\n" for i in range(count))
+
+
+HEADER = "import math\n\n\ndef helper(value):\n    return value * 2\n"
+BODY = (
+    "\n\ndef area(r):\n    total = 0\n    return math.pi * r ** 2 + helper(total)\n"
+    "\n\ndef perimeter(r):\n    total = 0\n    return 2 * math.pi * r\n"
+)
+SOURCE = HEADER + filler(40) + BODY + filler(20, "tail")
+
+
+def line_of(text, content=SOURCE):
+    return content.splitlines().index(text) + 1
+
+
+def test_small_files_are_sent_whole():
+    context = build_context("m.py", HEADER, [5])
+    assert context.whole_file and "FULL FILE CONTENT" in context.render()
+
+
+def test_python_unit_and_referenced_signatures():
+    assert len(SOURCE.splitlines()) > WHOLE_FILE_LINES
+    context = build_context("m.py", SOURCE, [line_of("    return math.pi * r ** 2 + helper(total)")])
+    [unit] = context.units
+    assert unit.label == "function area"
+    assert context.unit_text(unit).startswith("def area(r):")
+    assert "import math" in context.signatures
+    assert any(s.startswith("def helper(value)") for s in context.signatures)
+
+
+def test_overlapping_units_merge():
+    line = line_of("    return math.pi * r ** 2 + helper(total)")
+    context = build_context("m.py", SOURCE, [line, line - 1])
+    assert len(context.units) == 1
+
+
+def test_apply_splices_the_unit_back():
+    context = build_context("m.py", SOURCE, [line_of("    return 2 * math.pi * r")])
+    patched = context.apply([Hunk(["    return 2 * math.pi * r"], ["    return math.tau * r"])])
+    assert patched == SOURCE.replace("    return 2 * math.pi * r", "    return math.tau * r")
+
+
+def test_hunk_outside_the_units_is_rejected():
+    context = build_context("m.py", SOURCE, [line_of("    return 2 * math.pi * r")])
+    with pytest.raises(PatchError, match="does not match any code unit"):
+        context.apply([Hunk(["    return value * 2"], ["    return value * 3"])])
+
+
+def test_hunk_matching_two_units_is_rejected():
+    lines = [line_of("    return math.pi * r ** 2 + helper(total)"), line_of("    return 2 * math.pi * r")]
+    context = build_context("m.py", SOURCE, lines)
+    assert len(context.units) == 2
+    with pytest.raises(PatchError, match="matches 2 code units"):
+        context.apply([Hunk(["    total = 0"], ["    total = 1"])])
+
+
+def test_exact_match_in_one_unit_beats_fuzzy_in_another():
+    content = SOURCE.replace("    return 2 * math.pi * r\n", "    return 2 * math.pi * r\n\n\ndef diameter(r):\n    return 2 * math.pi * rr\n")
+    lines = [line_of("    return 2 * math.pi * r", content), line_of("    return 2 * math.pi * rr", content)]
+    context = build_context("m.py", content, lines)
+    assert len(context.units) == 2
+    hunk = Hunk(["    return 2 * math.pi * rr"], ["    return math.tau * r"])
+    patched = context.apply([hunk])
+    assert patched == content.replace("    return 2 * math.pi * rr", "    return math.tau * r")
+
+
+def test_brace_language_unit():
+    js = "const util = require('util');\n" + "".join(
+        f"\nfunction pad{i}(x) {{\n  return x + {i};\n}}\n" for i in range(60)
+    ) + "\nfunction area(r) {\n  if (r < 0) {\n    return 0;\n  }\n  return util.pi * r;\n}\n"
+    lines = js.splitlines()
+    context = build_context("m.js", js, [lines.index("    return 0;") + 1])
+    [unit] = context.units
+    assert unit.label == "function area"
+    assert context.unit_text(unit).rstrip().endswith("return util.pi * r;\n}")
@@ -0,0 +1,118 @@
+from unittest import mock
+
+import pytest
+
+import services.container_pool as container_pool
+import services.docker_executor as docker_executor
+from services.docker_executor import DockerExecutor
+
+
+def fake_client(output=(b"1 passed\n",), exit_code=0):
+    client = mock.MagicMock()
+    container = client.containers.run.return_value
+    container.id = "c1"
+    container.status = "running"
+    container.logs.return_value = iter(output)
+    container.wait.return_value = {"StatusCode": exit_code}
+    client.api.exec_create.return_value = {"Id": "e1"}
+    client.api.exec_start.side_effect = lambda *a, **kw: iter(output)
+    client.api.exec_inspect.return_value = {"ExitCode": exit_code}
+    return client
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    client = fake_client()
+    monkeypatch.setattr(docker_executor.docker, "from_env", lambda: client)
+    monkeypatch.setattr(container_pool, "_pool", None)
+    # A Docker run must never reach the host
+    monkeypatch.setattr(docker_executor, "get_local_runner", mock.Mock(side_effect=AssertionError("ran locally")))
+    return DockerExecutor()
+
+
+def test_normalize_command_unwraps_sh_c(executor):
+    assert executor._normalize_command("sh -c 'pip install -e . && pytest -q'") == [
+        "sh", "-c", "pip install -e . && pytest -q"
+    ]
+    assert executor._normalize_command("pytest -q") == "pytest -q"
+
+
+def test_pooled_run_execs_in_container(executor):
+    result = executor.execute("python:3.12", "sh -c 'pytest -q'", {"/w": {"bind": "/app", "mode": "rw"}}, "/app")
+
+    assert result["success"] and result["logs"] == "1 passed\n"
+    api = executor.client.api
+    api.exec_create.assert_called_once()
+    assert api.exec_create.call_args.args == ("c1", ["sh", "-c", "pytest -q"])
+    api.exec_start.assert_called_once_with("e1", stream=True)
+
+
+def test_one_off_run_uses_container(executor, monkeypatch):
+    monkeypatch.setenv("DOCKER_POOL_SIZE", "0")
+    result = executor.execute("python:3.12", "sh -c 'pytest -q'", {}, "/app")
+
+    assert result["success"] and result["logs"] == "1 passed\n"
+    run = executor.client.containers.run
+    run.assert_called_once()
+    assert run.call_args.kwargs["command"] == ["sh", "-c", "pytest -q"]
+    executor.client.api.exec_create.assert_not_called()
+
+
+def test_pooled_cycle_with_dependency_volumes(executor, tmp_path):
+    from services.dependency_cache import DependencyCache
+
+    (tmp_path / "requirements.txt").write_text("pytest\n")
+    stack = {"language": "python", "docker_image": "python:3.12",
+             "install_command": "pip install -r requirements.txt", "test_command": "pytest -q"}
+    plan = DependencyCache().plan(stack, str(tmp_path))
+    volumes = {str(tmp_path): {"bind": "/app", "mode": "rw"}, **plan["docker_volumes"]}
+    client = executor.client
+    container = client.containers.run.return_value
+
+    for _ in range(2):
+        result = executor.execute(
+            "python:3.12", plan["command"], volumes, "/app", environment=plan["docker_env"], pool_scope="job-1"
+        )
+        assert result["success"]
+
+    # One warm container, started with the workspace and the dependency volume mounted
+    client.containers.run.assert_called_once()
+    run_kwargs = client.containers.run.call_args.kwargs
+    assert run_kwargs["command"] == container_pool.IDLE_COMMAND
+    assert run_kwargs["volumes"] == volumes
+    assert any(v["bind"] == "/deps" for v in run_kwargs["volumes"].values())
+    # The second lease health-checked the returned container before reusing it
+    container.reload.assert_called_once()
+    assert client.api.exec_create.call_count == 2
+    create_kwargs = client.api.exec_create.call_args.kwargs
+    assert create_kwargs["environment"] == plan["docker_env"] and create_kwargs["workdir"] == "/app"
+
+    pool = executor._pool()
+    assert [c for idle in pool._idle.values() for c, _ in idle] == [container]
+    # Another job never gets this container
+    assert pool.acquire("python:3.12", volumes, "/app", "job-2") is container
+    assert client.containers.run.call_count == 2
+
+    executor.release_scope("job-1")
+    assert pool._idle == {}
+    container.remove.assert_called_with(force=True)
+
+
+def test_pooled_early_stop_kills_container(executor):
+    from services.early_stop import predicates_for
+
+    output = [b"____ ERROR collecting tests/test_m.py ____\n"] + [b"E   line\n"] * 70 + [b"never reached\n"]
+    executor.client.api.exec_start.side_effect = lambda *a, **kw: iter(output)
+    container = executor.client.containers.run.return_value
+
+    result = executor.execute(
+        "python:3.12", "pytest -q", {}, "/app",
+        stop_predicates=predicates_for({"language": "python"}), pool_scope="job-1",
+    )
+
+    assert result["aborted_reason"] == "Collection error seen" and not result["success"]
+    assert "never reached" not in result["logs"]
+    container.kill.assert_called_once()
+    container.remove.assert_called_once_with(force=True)
+    assert executor._pool()._idle == {}
+    executor.client.api.exec_inspect.assert_not_called()
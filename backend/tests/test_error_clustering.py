@@ -0,0 +1,37 @@
+from services.error_clustering import cluster_errors, message_template
+
+
+def strip_app(error):
+    path = error["file"]
+    return path[len("/app/"):] if path.startswith("/app/") else path
+
+
+def name_error(path, line):
+    return {"file": path, "line": line, "type": "NameError", "message": "name 'x' is not defined"}
+
+
+def test_message_template_masks_literals():
+    assert message_template("assert 3 == 5 at 0xdeadbeef in 'a/b.py'") == "assert <num> == <num> at <addr> in <str>"
+
+
+def test_duplicates_collapse_into_one_cluster():
+    errors = [name_error("src/m.py", 3), name_error("src/m.py", 3)]
+    clusters = cluster_errors(errors, strip_app)
+    assert [c.size for c in clusters] == [2]
+
+
+def test_distinct_lines_stay_apart_for_absolute_paths():
+    for path in ("/app/src/m.py", "/tmp/fixtora_hackathon/job/src/m.py", "src/m.py"):
+        errors = [name_error(path, 3), name_error(path, 40)]
+        clusters = cluster_errors(errors, lambda e: "src/m.py")
+        assert [c.size for c in clusters] == [1, 1], path
+
+
+def test_source_function_groups_across_tests():
+    errors = [
+        {"file": "/app/tests/test_m.py", "line": line, "type": "AssertionError",
+         "message": f"assert {line} == 0 (source function: helper)"}
+        for line in (10, 20, 30)
+    ]
+    clusters = cluster_errors(errors, lambda e: "src/m.py")
+    assert len(clusters) == 1 and clusters[0].size == 3 and clusters[0].target_file == "src/m.py"
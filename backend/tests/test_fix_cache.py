@@ -0,0 +1,118 @@
+import pytest
+
+from services.fix_cache import FixCache, PendingFixes, error_signature, fix_key
+
+SOURCE = "def add(a, b):\n    return a - b\n\n\ndef mul(a, b):\n    return a * b\n"
+
+
+def error(message, file="src/calc.py", line=2, type_="LOGIC"):
+    return {"file": file, "line": line, "type": type_, "message": message}
+
+
+def target(e):
+    return e["file"][len("/app/"):] if e["file"].startswith("/app/") else e["file"]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FixCache(str(tmp_path / "fixes.db"), max_entries=100, ttl_seconds=3600)
+
+
+def test_fix_key_ignores_path_line_and_literals():
+    a = error("assert -1 == 5")
+    b = error("assert -2 == 7", file="lib/calc.py")
+    assert fix_key([a], SOURCE) == fix_key([b], SOURCE)
+    assert fix_key([a], SOURCE) != fix_key([a], SOURCE.replace("a - b", "a - b  # x"))
+    assert fix_key([a, error("other", line=6)], SOURCE) == fix_key([error("other", line=6), a], SOURCE)
+
+
+def test_signature_ignores_location():
+    assert error_signature(error("x is 3", line=2)) == error_signature(error("x is 4", file="/app/m.py", line=9))
+
+
+def pending_with_fix(cache, fixed, before):
+    pending = PendingFixes(cache)
+    pending.resolve(before, target)
+    key = fix_key([fixed], SOURCE)
+    pending.add(fixed, "src/calc.py", store=(key, "PATCH", {}))
+    return pending, key
+
+
+def test_fix_is_stored_once_its_error_is_gone(cache):
+    fixed = error("assert -1 == 5")
+    unrelated = error("division by zero", file="src/other.py", type_="ZeroDivisionError")
+    pending, key = pending_with_fix(cache, fixed, [fixed, unrelated])
+    assert cache.get(key) is None
+
+    pending.resolve([unrelated], target)
+    assert cache.get(key)["patch"] == "PATCH"
+
+
+def test_fix_is_not_stored_while_its_error_remains(cache):
+    fixed = error("assert -1 == 5")
+    pending, key = pending_with_fix(cache, fixed, [fixed])
+
+    pending.resolve([error("assert -3 == 5", file="/app/src/calc.py", line=4)], target)
+    assert cache.get(key) is None and cache.stats()["unconfirmed"] == 1
+
+
+def test_fix_that_swaps_in_a_new_failure_is_not_stored(cache):
+    fixed = error("assert -1 == 5")
+    still_failing = error("name 'y' is not defined", line=6, type_="NameError")
+    pending, key = pending_with_fix(cache, fixed, [fixed, still_failing])
+
+    replacement = error("unsupported operand type(s) for +", type_="TypeError")
+    pending.resolve([still_failing, replacement], target)
+    assert cache.get(key) is None and cache.stats()["unconfirmed"] == 1
+
+
+def test_preexisting_failure_in_the_file_does_not_block_storing(cache):
+    fixed = error("assert -1 == 5")
+    still_failing = error("name 'y' is not defined", line=6, type_="NameError")
+    pending, key = pending_with_fix(cache, fixed, [fixed, still_failing])
+
+    pending.resolve([still_failing], target)
+    assert cache.get(key) is not None
+
+
+def test_replayed_fix_is_invalidated_when_refuted(cache):
+    fixed = error("assert -1 == 5")
+    key = fix_key([fixed], SOURCE)
+    cache.put(key, "PATCH", {})
+    pending = PendingFixes(cache)
+    pending.resolve([fixed], target)
+    pending.add(fixed, "src/calc.py", hit=key)
+
+    pending.resolve([error("boom", type_="TypeError")], target)
+    assert cache.get(key) is None and cache.stats()["invalidated"] == 1
+
+
+def test_disabled_cache_is_a_no_op():
+    pending = PendingFixes(None)
+    pending.add(error("x"), "src/calc.py", store=("k", "PATCH", {}))
+    pending.resolve([], target)
+
+
+def test_fix_agent_stores_after_confirmation_and_replays(cache, monkeypatch):
+    import agents.fix_agent as fix_agent
+
+    calls = []
+    reply = "<<<<<<< SEARCH\n    return a - b\n=======\n    return a + b\n>>>>>>> REPLACE\nDESCRIPTION[0]: fix add\n"
+    monkeypatch.setattr(fix_agent, "call_ai", lambda key, prompt, **kw: calls.append(prompt) or reply)
+    monkeypatch.setattr(fix_agent, "get_fix_cache", lambda: cache)
+    fixed = error("assert -1 == 5")
+    pending = PendingFixes(cache)
+    pending.resolve([fixed], target)
+
+    def run():
+        content, [outcome] = fix_agent.FixAgent().apply_fixes("src/calc.py", [fixed], SOURCE, "", "key")
+        pending.add(fixed, "src/calc.py", store=outcome["cache_store"], hit=outcome["cache_hit"])
+        return content, outcome
+
+    content, outcome = run()
+    assert "return a + b" in content and outcome["ai_fixed"] and outcome["cache_hit"] is None
+    assert cache.stats()["entries"] == 0   # nothing cached before a test run confirms it
+
+    pending.resolve([], target)
+    content, outcome = run()
+    assert len(calls) == 1 and outcome["cache_hit"] and "return a + b" in content
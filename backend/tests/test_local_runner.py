@@ -0,0 +1,62 @@
+import os
+import threading
+import time
+
+import services.local_runner as local_runner
+from services.local_runner import LocalRunner
+
+
+def test_run_streams_output_in_order():
+    seen = []
+    result = LocalRunner().run("for i in 1 2 3; do echo $i; done", os.getcwd(), dict(os.environ), 10,
+                               on_chunk=lambda c: seen.append(c) and False)
+    assert result["exit_code"] == 0 and result["logs"] == "1\n2\n3\n"
+    assert b"".join(seen) == b"1\n2\n3\n"
+
+
+def test_on_chunk_abort_kills_the_run():
+    result = LocalRunner().run("echo stop; sleep 30", os.getcwd(), dict(os.environ), 20,
+                               on_chunk=lambda c: b"stop" in c)
+    assert result["aborted"] and result["exit_code"] == -1
+
+
+def test_timeout_note_reaches_on_chunk():
+    seen = []
+    result = LocalRunner().run("sleep 30", os.getcwd(), dict(os.environ), 0.5, on_chunk=seen.append)
+    assert result["timed_out"] and b"timed out" in b"".join(seen)
+
+
+def test_slow_consumer_does_not_stall_other_runs():
+    runner = LocalRunner()
+    release = threading.Event()
+    fast = {}
+
+    def slow_chunk(chunk):
+        release.wait(10)
+
+    slow = threading.Thread(target=runner.run, args=("echo slow", os.getcwd(), dict(os.environ), 20, slow_chunk))
+    slow.start()
+    time.sleep(0.3)
+    started = time.time()
+    fast.update(runner.run("echo fast", os.getcwd(), dict(os.environ), 10, on_chunk=lambda c: False))
+    elapsed = time.time() - started
+    release.set()
+    slow.join(10)
+    assert fast["logs"] == "fast\n" and elapsed < 5
+
+
+def test_spill_files_are_swept_while_running(tmp_path, monkeypatch):
+    runner = LocalRunner()
+    runner.spill_dir = str(tmp_path)
+    old = tmp_path / "old.log"
+    old.write_text("x")
+    stale = time.time() - local_runner.settings.JOB_TTL_SECONDS - 60
+    os.utime(old, (stale, stale))
+    monkeypatch.setattr(local_runner, "SPILL_SWEEP_INTERVAL", 0)
+
+    runner.run("true", os.getcwd(), dict(os.environ), 10)
+    for _ in range(50):
+        if not old.exists():
+            break
+        time.sleep(0.05)
+    assert not old.exists()
@@ -0,0 +1,93 @@
+import pytest
+
+from services.patching import (
+    Hunk, PatchError, apply_patch, count_matches, diff_hunks, format_patch, parse_patch,
+)
+
+SOURCE = """\
+def add(a, b):
+    return a - b
+
+
+def mul(a, b):
+    return a * b
+"""
+
+
+def block(search, replace):
+    return f"<<<<<<< SEARCH\n{search}=======\n{replace}>>>>>>> REPLACE\n"
+
+
+def test_parse_search_replace_blocks():
+    hunks = parse_patch("Here you go:\n" + block("    return a - b\n", "    return a + b\n") + "DESCRIPTION[0]: x\n")
+    assert len(hunks) == 1
+    assert hunks[0].search == ["    return a - b"] and hunks[0].replace == ["    return a + b"]
+
+
+def test_parse_unified_diff():
+    diff = "--- a/calc.py\n+++ b/calc.py\n@@ -1,2 +1,2 @@\n def add(a, b):\n-    return a - b\n+    return a + b\n"
+    [hunk] = parse_patch(diff)
+    assert hunk.search == ["def add(a, b):", "    return a - b"]
+    assert hunk.replace == ["def add(a, b):", "    return a + b"]
+
+
+def test_exact_match():
+    patched = apply_patch(SOURCE, parse_patch(block("    return a - b\n", "    return a + b\n")))
+    assert patched == SOURCE.replace("a - b", "a + b")
+
+
+def test_trailing_whitespace_tier():
+    patched = apply_patch(SOURCE, [Hunk(["    return a - b   "], ["    return a + b"])])
+    assert "return a + b" in patched
+
+
+def test_indentation_tier_reindents_the_replacement():
+    patched = apply_patch(SOURCE, [Hunk(["return a - b"], ["total = a + b", "return total"])])
+    assert "    total = a + b\n    return total\n" in patched
+
+
+def test_fuzzy_tier_and_its_opt_out():
+    hunk = Hunk(["def add(a, b):", "    return a-b"], ["def add(a, b):", "    return a + b"])
+    assert "return a + b" in apply_patch(SOURCE, [hunk])
+    with pytest.raises(PatchError):
+        apply_patch(SOURCE, [hunk], fuzzy=False)
+
+
+def test_strictest_tier_decides():
+    content = "x = 1\n    x = 1\n"
+    # The exact match on line 1 wins over the indentation-insensitive one on line 2
+    assert apply_patch(content, [Hunk(["x = 1"], ["x = 2"])]) == "x = 2\n    x = 1\n"
+    assert count_matches(content, Hunk(["x = 1"], []), 0) == 1
+    assert count_matches(content, Hunk(["x = 1"], []), 2) == 2
+
+
+def test_ambiguous_search_is_rejected():
+    content = "total = 0\nprint(total)\ntotal = 0\n"
+    with pytest.raises(PatchError, match="matches 2 places"):
+        apply_patch(content, [Hunk(["total = 0"], ["total = 1"])])
+    # More context makes it unique
+    assert apply_patch(content, [Hunk(["print(total)", "total = 0"], ["print(total)", "total = 1"])]) == \
+        "total = 0\nprint(total)\ntotal = 1\n"
+
+
+def test_ambiguous_fuzzy_match_is_rejected():
+    content = "def f():\n    return compute(1, 2)\n\n\ndef g():\n    return compute(1, 3)\n"
+    with pytest.raises(PatchError, match="places"):
+        apply_patch(content, [Hunk(["return compute(1, 4)"], ["return compute(1, 5)"])])
+
+
+def test_unmatched_hunk_is_rejected():
+    with pytest.raises(PatchError, match="does not match"):
+        apply_patch(SOURCE, [Hunk(["return something_else()"], ["pass"])])
+
+
+def test_pure_insertion_appends():
+    assert apply_patch(SOURCE, [Hunk([], ["", "", "def sub(a, b):", "    return a - b"])]).endswith(
+        "def sub(a, b):\n    return a - b\n"
+    )
+
+
+def test_diff_round_trip():
+    modified = SOURCE.replace("a - b", "a + b").replace("a * b", "a * b * 1")
+    hunks = diff_hunks(SOURCE, modified, context=1)
+    assert apply_patch(SOURCE, parse_patch(format_patch(hunks)), fuzzy=False) == modified
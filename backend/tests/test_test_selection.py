@@ -0,0 +1,67 @@
+import os
+import time
+
+from services.test_selection import failing_tests, rerun_command
+
+PYTEST_LOGS = """\
+tests/test_calc.py::test_add FAILED
+=========================== short test summary info ============================
+FAILED tests/test_calc.py::test_add - assert -1 == 3
+FAILED tests/test_calc.py::test_sub[1-2] - assert 0
+ERROR tests/test_db.py::test_conn - ConnectionError
+"""
+
+JUNIT = """<testsuite name="CalcTest">
+  <testcase classname="com.acme.CalcTest" name="adds()"><failure message="x"/></testcase>
+  <testcase classname="com.acme.CalcTest" name="subtracts()"/>
+  <testcase classname="com.acme.DbTest" name="connects"><error message="y"/></testcase>
+</testsuite>
+"""
+
+
+def test_pytest_failures_are_deduplicated_in_order():
+    assert failing_tests(PYTEST_LOGS, {"language": "python"}) == [
+        "tests/test_calc.py::test_add", "tests/test_calc.py::test_sub[1-2]", "tests/test_db.py::test_conn",
+    ]
+
+
+def test_jest_failures_are_test_files():
+    logs = " PASS  src/a.test.js\n FAIL  src/b.test.ts (5 s)\n FAIL src/c.spec.jsx\n"
+    assert failing_tests(logs, {"language": "javascript"}) == ["src/b.test.ts", "src/c.spec.jsx"]
+
+
+def test_junit_reports_from_this_run_only(tmp_path):
+    reports = tmp_path / "build" / "test-results" / "test"
+    reports.mkdir(parents=True)
+    fresh = reports / "TEST-CalcTest.xml"
+    fresh.write_text(JUNIT)
+    stale = reports / "TEST-Old.xml"
+    stale.write_text(JUNIT.replace("com.acme", "com.old"))
+    os.utime(stale, (time.time() - 3600, time.time() - 3600))
+
+    found = failing_tests("", {"language": "java_gradle"}, str(tmp_path), since=time.time() - 60)
+    assert found == ["com.acme.CalcTest#adds", "com.acme.DbTest#connects"]
+
+
+def test_rerun_command_per_stack():
+    ids = ["tests/test_calc.py::test_sub[1-2]"]
+    assert rerun_command({"language": "python", "test_command": "sh -c 'pytest -q'"}, ids) == \
+        "pytest -q 'tests/test_calc.py::test_sub[1-2]'"
+    assert rerun_command({"language": "javascript", "test_command": "npm test"}, ["src/b.test.ts"]) == \
+        "npm test -- src/b.test.ts"
+    assert rerun_command({"language": "javascript", "test_command": "npx jest"}, ["src/b.test.ts"]) == \
+        "npx jest src/b.test.ts"
+    assert rerun_command({"language": "java_gradle", "test_command": "./gradlew test"}, ["a.B#c"]) == \
+        "./gradlew test --tests a.B.c"
+    assert rerun_command({"language": "java_maven", "test_command": "mvn test"}, ["a.B#c", "a.D#e"]) == (
+        "mvn test -Dtest='a.B#c,a.D#e' -DfailIfNoTests=false -Dsurefire.failIfNoSpecifiedTests=false"
+    )
+
+
+def test_rerun_command_falls_back_to_full_suite():
+    python = {"language": "python", "test_command": "pytest"}
+    assert rerun_command(python, []) is None
+    assert rerun_command(python, [f"t.py::test_{i}" for i in range(3)], max_tests=2) is None
+    assert rerun_command({"language": "python", "test_command": "pytest; echo done"}, ["t.py::a"]) is None
+    assert rerun_command({"language": "python", "test_command": "pytest | tee out"}, ["t.py::a"]) is None
+    assert rerun_command({"language": "unknown", "test_command": "make test"}, ["x"]) is None
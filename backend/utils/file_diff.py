@@ -8,9 +8,12 @@ def calculate_file_diff_percentage(original: str, modified: str) -> float:
     orig_lines = original.splitlines()
     mod_lines = modified.splitlines()
     
-    diff = list(difflib.unified_diff(orig_lines, mod_lines))
-    # Simple heuristic: number of changed lines relative to total
-    changed_lines = len([l for l in diff if l.startswith('+') or l.startswith('-')])
+    # A replaced line counts once, not as one removal plus one addition
+    matcher = difflib.SequenceMatcher(None, orig_lines, mod_lines, autojunk=False)
+    changed_lines = sum(
+        max(i2 - i1, j2 - j1)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"
+    )
     
     if len(orig_lines) == 0: return 0.0
     return (changed_lines / len(orig_lines)) * 100
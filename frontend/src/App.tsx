@@ -95,6 +95,7 @@ function App() {
 
   useEffect(() => {
     let interval: NodeJS.Timeout;
+    let closeStream: (() => void) | undefined;
     if (jobId) {
       const fetchStatus = async () => {
         try {
@@ -107,10 +108,21 @@ function App() {
           console.error("Polling error", e);
         }
       };
-      fetchStatus();
-      interval = setInterval(fetchStatus, 2000);
+      const startPolling = () => {
+        fetchStatus();
+        interval = setInterval(fetchStatus, 2000);
+      };
+      // Prefer the push stream; fall back to polling if it is unavailable
+      if (typeof EventSource !== 'undefined') {
+        closeStream = api.streamStatus(jobId, setStatus, startPolling);
+      } else {
+        startPolling();
+      }
     }
-    return () => clearInterval(interval);
+    return () => {
+      clearInterval(interval);
+      closeStream?.();
+    };
   }, [jobId]);
 
   return (
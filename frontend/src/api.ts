@@ -5,6 +5,7 @@ export interface RunAgentRequest {
     retry_limit: number;
     api_key?: string;
     github_token?: string;
+    priority?: number;
 }
 
 export interface FixResult {
@@ -35,7 +36,18 @@ export interface RunStatusResponse {
     fixes: FixResult[];
     timeline: TimelineEvent[];
     notification?: { type: 'WARNING' | 'ERROR'; title: string; message: string };
+    queue_position?: number | null;
     raw_logs: string;
+    log_size?: number;
+    version?: number;
+}
+
+export interface LogChunkResponse {
+    job_id: string;
+    offset: number;
+    next_offset: number;
+    size: number;
+    text: string;
 }
 
 // Strip any trailing slash the user might have accidentally included in the Vercel dashboard
@@ -43,7 +55,7 @@ const rawApiUrl = import.meta.env.VITE_API_URL || '';
 const API_BASE = rawApiUrl.endsWith('/') ? rawApiUrl.slice(0, -1) : rawApiUrl;
 
 export const api = {
-    runAgent: async (data: RunAgentRequest): Promise<{ job_id: string }> => {
+    runAgent: async (data: RunAgentRequest): Promise<{ job_id: string; queue_position?: number }> => {
         // Strip out the hardcoded `/api/` prefix to match the FastAPI routing directly
         const url = API_BASE ? `${API_BASE}/run-agent` : '/run-agent';
         const res = await fetch(url, {
@@ -51,6 +63,7 @@ export const api = {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(data),
         });
+        if (res.status === 429) throw new Error('Engine is at capacity. Please retry in a moment.');
         if (!res.ok) throw new Error('Failed to start deployment sequence. Verify Railway backend is online.');
         return res.json();
     },
@@ -60,5 +73,66 @@ export const api = {
         const res = await fetch(url);
         if (!res.ok) throw new Error('Failed to fetch telemetry status.');
         return res.json();
+    },
+
+    /**
+     * Subscribes to the job's Server-Sent Events stream and folds the deltas
+     * into a RunStatusResponse. Returns a function that closes the stream.
+     * `onError` fires if the stream breaks, so callers can fall back to polling.
+     */
+    streamStatus: (
+        jobId: string,
+        onUpdate: (status: RunStatusResponse) => void,
+        onError: () => void,
+    ): (() => void) => {
+        const path = `/run-events/${jobId}`;
+        const source = new EventSource(API_BASE ? `${API_BASE}${path}` : path);
+        let state: RunStatusResponse | null = null;
+        let finished = false;
+
+        const apply = (patch: (s: RunStatusResponse) => RunStatusResponse) => {
+            if (!state) return;
+            state = patch(state);
+            onUpdate(state);
+        };
+
+        source.addEventListener('snapshot', (e) => {
+            const data = JSON.parse((e as MessageEvent).data);
+            state = { ...data, raw_logs: '' };
+            onUpdate(state!);
+        });
+        source.addEventListener('status', (e) => {
+            const data = JSON.parse((e as MessageEvent).data);
+            apply(s => ({ ...s, ...data }));
+        });
+        source.addEventListener('timeline', (e) => {
+            const { entry } = JSON.parse((e as MessageEvent).data);
+            apply(s => ({ ...s, timeline: [...s.timeline, entry] }));
+        });
+        source.addEventListener('fix', (e) => {
+            const { fix } = JSON.parse((e as MessageEvent).data);
+            apply(s => ({ ...s, fixes: [...s.fixes, fix] }));
+        });
+        source.addEventListener('log', (e) => {
+            const { text, next_offset } = JSON.parse((e as MessageEvent).data);
+            apply(s => ({ ...s, raw_logs: s.raw_logs + text, log_size: next_offset }));
+        });
+        source.addEventListener('end', () => {
+            finished = true;
+            source.close();
+        });
+        source.onerror = () => {
+            if (finished) return;
+            source.close();
+            onError();
+        };
+        return () => source.close();
+    },
+
+    getLogs: async (jobId: string, offset: number): Promise<LogChunkResponse> => {
+        const path = `/run-status/${jobId}/logs?offset=${offset}`;
+        const res = await fetch(API_BASE ? `${API_BASE}${path}` : path);
+        if (!res.ok) throw new Error('Failed to fetch telemetry logs.');
+        return res.json();
     }
 };